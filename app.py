@@ -6,6 +6,7 @@ import os
 
 from flask import (
     Flask,
+    Response,
     render_template,
     request,
     jsonify,
@@ -13,13 +14,16 @@ from flask import (
     redirect,
     url_for,
     flash,
+    stream_with_context,
 )
 from functools import wraps
 from datetime import datetime, timedelta
 import logging
 
 # Uvoz modela in storitev
-from services import BankService
+from model import statistika_bazena
+from services import BankService, naslednja_stran
+import izpisek
 
 app = Flask(__name__)
 app.secret_key = os.environ.get("SECRET_KEY", "slovenia-bank-dev-secret-key")
@@ -116,31 +120,21 @@ def dashboard():
     """Glavna nadzorna plošča uporabnika"""
     user_id = session["user_id"]
 
-    # Pridobi podatke o stranki
-    stranka = bank.get_stranka(user_id)
-    if not stranka:
+    # Stranka, računi z limiti in zadnje transakcije v stalnem številu poizvedb
+    podatki = bank.get_dashboard(user_id, limit=10)
+    if not podatki:
         flash("Stranka ni najdena.", "danger")
         return redirect(url_for("logout"))
 
-    # Pridobi vse račune stranke
-    racuni = bank.get_racuni_stranke(user_id)
-    for r in racuni:
-        rem_nakazila, rem_dvigi = bank.get_remaining_daily_limit(r["IBAN"])
-        r["preostanek_nakazil"] = rem_nakazila
-        r["preostanek_dvigov"] = rem_dvigi
-
     # Izračunaj skupno stanje
-    total_balance = sum(r["stanje"] for r in racuni)
-
-    # Pridobi zadnje transakcije
-    recent_transactions = bank.get_recent_transactions(user_id, limit=10)
+    total_balance = sum(r["stanje"] for r in podatki["racuni"])
 
     return render_template(
         "dashboard.html",
-        stranka=stranka,
-        racuni=racuni,
+        stranka=podatki["stranka"],
+        racuni=podatki["racuni"],
         total_balance=total_balance,
-        recent_transactions=recent_transactions,
+        recent_transactions=podatki["recent_transactions"],
     )
 
 
@@ -149,12 +143,9 @@ def dashboard():
 def accounts():
     """Stran z vsemi računi"""
     user_id = session["user_id"]
+    # Računi skupaj s paketom (ključ "paket") v eni poizvedbi
     racuni = bank.get_racuni_stranke(user_id)
 
-    # Za vsak račun pridobi tudi paket
-    for racun in racuni:
-        racun["paket"] = bank.get_paket_za_racun(racun["IBAN"])
-
     return render_template("accounts.html", racuni=racuni)
 
 
@@ -170,12 +161,55 @@ def account_detail(iban):
         flash("Nimate dostopa do tega računa.", "danger")
         return redirect(url_for("accounts"))
 
-    # Pridobi transakcije za ta račun
-    transactions = bank.get_transactions_for_account(iban)
+    # Pridobi stran transakcij za ta račun
+    po = request.args.get("po")
+    try:
+        transactions = bank.get_transactions_for_account(iban, limit=50, po=po)
+    except ValueError:
+        flash("Neveljavna stran transakcij.", "danger")
+        return redirect(url_for("account_detail", iban=iban))
     paket = bank.get_paket_za_racun(iban)
 
     return render_template(
-        "account_detail.html", racun=racun, transactions=transactions, paket=paket
+        "account_detail.html",
+        racun=racun,
+        transactions=transactions,
+        paket=paket,
+        po=po,
+        naslednja=naslednja_stran(transactions, 50),
+    )
+
+
+@app.route("/account/<iban>/statement")
+@login_required
+def account_statement(iban):
+    """Izpisek računa za obdobje (CSV ali PDF), poslan sproti med branjem iz baze"""
+    user_id = session["user_id"]
+
+    racun = bank.get_racun(iban)
+    if not racun or racun["id_lastnik"] != user_id:
+        flash("Nimate dostopa do tega računa.", "danger")
+        return redirect(url_for("accounts"))
+
+    oblika = request.args.get("oblika", "csv")
+    if oblika not in ("csv", "pdf"):
+        flash("Neveljavna oblika izpiska.", "danger")
+        return redirect(url_for("account_detail", iban=iban))
+    try:
+        podatki = bank.get_izpisek(iban, request.args.get("od"), request.args.get("do"))
+    except ValueError as e:
+        flash(str(e), "danger")
+        return redirect(url_for("account_detail", iban=iban))
+
+    ime = f"izpisek_{podatki['iban']}_{podatki['od']}_{podatki['do']}.{oblika}"
+    if oblika == "pdf":
+        vsebina, mimetype = izpisek.v_pdf(podatki), "application/pdf"
+    else:
+        vsebina, mimetype = izpisek.v_csv(podatki), "text/csv"
+    return Response(
+        stream_with_context(vsebina),
+        mimetype=mimetype,
+        headers={"Content-Disposition": f"attachment; filename={ime}"},
     )
 
 
@@ -280,12 +314,9 @@ def packages():
     available_packages = bank.get_all_paketi()
 
     user_id = session["user_id"]
+    # Računi skupaj s trenutnimi paketi (ključ "paket")
     racuni = bank.get_racuni_stranke(user_id)
 
-    # Dodaj informacije o trenutnih paketih
-    for racun in racuni:
-        racun["paket"] = bank.get_paket_za_racun(racun["IBAN"])
-
     return render_template(
         "packages.html", available_packages=available_packages, racuni=racuni
     )
@@ -302,9 +333,21 @@ def admin_dashboard():
 @app.route("/admin/customers")
 @admin_required
 def admin_customers():
-    """Seznam vseh strank"""
-    stranke = bank.get_all_stranke()
-    return render_template("admin/customers.html", stranke=stranke)
+    """Seznam strank z iskanjem, po straneh"""
+    iskanje = request.args.get("q", "").strip()
+    po = request.args.get("po")
+    try:
+        stranke = bank.search_stranke(iskanje, limit=50, po=po)
+    except ValueError:
+        flash("Neveljavna stran strank.", "danger")
+        return redirect(url_for("admin_customers", q=iskanje or None))
+    return render_template(
+        "admin/customers.html",
+        stranke=stranke,
+        iskanje=iskanje,
+        po=po,
+        naslednja=naslednja_stran(stranke, 50, ("priimek", "ime", "id_stranke")),
+    )
 
 
 @app.route("/admin/customers/<int:id_stranke>")
@@ -402,9 +445,62 @@ def admin_edit_customer(id_stranke):
 @app.route("/admin/transactions")
 @admin_required
 def admin_transactions():
-    """Seznam vseh transakcij"""
-    transactions = bank.get_all_transactions(limit=100)
-    return render_template("admin/transactions.html", transactions=transactions)
+    """Seznam vseh transakcij (po straneh)"""
+    po = request.args.get("po")
+    try:
+        transactions = bank.get_all_transactions(limit=100, po=po)
+    except ValueError:
+        flash("Neveljavna stran transakcij.", "danger")
+        return redirect(url_for("admin_transactions"))
+    return render_template(
+        "admin/transactions.html",
+        transactions=transactions,
+        po=po,
+        naslednja=naslednja_stran(transactions, 100),
+    )
+
+
+@app.route("/admin/transactions/search")
+@admin_required
+def admin_transactions_search():
+    """Iskanje transakcij po opisu, računu, tipu, znesku in datumu"""
+    filtri = {
+        kljuc: request.args.get(kljuc, "").strip()
+        for kljuc in ("q", "iban", "tip", "znesek_od", "znesek_do", "od", "do")
+    }
+    filtri = {kljuc: vrednost for kljuc, vrednost in filtri.items() if vrednost}
+    po = request.args.get("po")
+
+    try:
+        znesek_od = round(float(filtri["znesek_od"]) * 100) if "znesek_od" in filtri else None
+        znesek_do = round(float(filtri["znesek_do"]) * 100) if "znesek_do" in filtri else None
+    except ValueError:
+        flash("❌ Napačen format zneska", "danger")
+        return redirect(url_for("admin_transactions"))
+
+    try:
+        transactions = bank.search_transactions(
+            iskanje=filtri.get("q", ""),
+            iban=filtri.get("iban"),
+            tip=filtri.get("tip"),
+            znesek_od=znesek_od,
+            znesek_do=znesek_do,
+            od=filtri.get("od"),
+            do=filtri.get("do"),
+            limit=100,
+            po=po,
+        )
+    except ValueError as e:
+        flash(f"❌ {e}", "danger")
+        return redirect(url_for("admin_transactions"))
+
+    return render_template(
+        "admin/transactions.html",
+        transactions=transactions,
+        filtri=filtri,
+        po=po,
+        naslednja=naslednja_stran(transactions, 100),
+    )
 
 
 # ==================== ADMIN - RAČUNI ====================
@@ -415,11 +511,8 @@ def admin_transactions():
 def admin_accounts():
     """Seznam vseh računov"""
     racuni = bank.get_all_racuni()
-    stranke = bank.get_all_stranke()
     paketi = bank.get_all_paketi()
-    return render_template(
-        "admin/accounts.html", racuni=racuni, stranke=stranke, paketi=paketi
-    )
+    return render_template("admin/accounts.html", racuni=racuni, paketi=paketi)
 
 
 @app.route("/admin/accounts/add", methods=["POST"])
@@ -582,6 +675,35 @@ def api_account_balance(iban):
     return jsonify({"balance": racun["stanje"]})
 
 
+@app.route("/api/admin/customers/search")
+@admin_required
+def api_admin_customers_search():
+    """API endpoint za iskanje strank med tipkanjem"""
+    iskanje = request.args.get("q", "").strip()
+    if not iskanje:
+        return jsonify([])
+    limit = max(1, min(request.args.get("limit", 10, type=int), 50))
+    stranke = bank.search_stranke(iskanje, limit=limit)
+    return jsonify(
+        [
+            {
+                "id_stranke": s["id_stranke"],
+                "ime": s["ime"],
+                "priimek": s["priimek"],
+                "naslov": s["naslov"],
+            }
+            for s in stranke
+        ]
+    )
+
+
+@app.route("/api/admin/pool")
+@admin_required
+def api_admin_pool():
+    """API endpoint za spremljanje bazena povezav"""
+    return jsonify(statistika_bazena())
+
+
 # Template filters
 @app.template_filter("centi_v_eure")
 def centi_v_eure(centi):
@@ -0,0 +1,775 @@
+"""
+Meritve zmogljivosti bančnega sistema
+
+Vsaka meritev v začasni mapi ustvari svojo bazo `Banka.db`, jo napolni z
+umetnimi podatki in izpiše čase izvajanja.
+
+Uporaba:
+    python benchmark.py dnevni-limit [--velikosti 1000 10000 100000]
+    python benchmark.py profili [--profili web batch reporting]
+    python benchmark.py zadnje-transakcije [--velikosti 100000 1000000 10000000]
+    python benchmark.py brisanje-stranke [--racuni 50] [--transakcije 1000000]
+    python benchmark.py izpisek [--velikosti 10000 100000 1000000]
+    python benchmark.py nalaganje [--transakcije 1000000] [--paket 50000]
+    python benchmark.py storitve [--stranke 10000] [--transakcije 200000] [--shrani-osnovo]
+"""
+
+import argparse
+import csv
+import json
+import os
+import platform
+import random
+import statistics
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import tracemalloc
+from collections import Counter
+from datetime import datetime, timedelta, timezone
+
+import izpisek
+import model
+from services import BankService, dnevno_okno
+
+IBAN_POSILJA = "SI56191000000123438"
+IBAN_PREJEMA = "SI56263300012039086"
+
+
+def pripravi_bazo():
+    """
+    Ustvari prazno bazo v začasni mapi z enim paketom, stranko in dvema računoma.
+    """
+    os.chdir(tempfile.mkdtemp(prefix="banka_bench_"))
+    with model.get_connection():
+        with model.Kazalec() as cur:
+            model.ustvari_tabele(cur=cur)
+            cur.execute(
+                "INSERT INTO stranka (id_stranke, ime, priimek, naslov, datum_rojstva) "
+                "VALUES (1, 'Marko', 'Novak', 'Dunajska 1', '1990-01-01')"
+            )
+            cur.execute(
+                "INSERT INTO paket (id_paket, tip, cena, osnovni_limit, dnevni_limit) "
+                "VALUES (1, 'Business', 1999, NULL, 100000000)"
+            )
+            cur.executemany(
+                "INSERT INTO racun (IBAN, id_lastnik, id_paket, stanje) "
+                "VALUES (?, 1, 1, 1000000000)",
+                [(IBAN_POSILJA,), (IBAN_PREJEMA,)],
+            )
+
+
+def dodaj_zgodovino(cur, iban, stevilo, dni=730):
+    """
+    Dodaj `stevilo` starih nakazil in dvigov z računa, razporejenih čez zadnjih
+    `dni` dni (brez današnjega dne).
+    """
+    zdaj = datetime.now(timezone.utc)
+    paket = []
+    for _ in range(stevilo):
+        cas = zdaj - timedelta(days=random.randint(1, dni), seconds=random.randint(0, 86399))
+        cas = cas.strftime("%Y-%m-%d %H:%M:%S")
+        if random.random() < 0.7:
+            paket.append((iban, IBAN_PREJEMA, "nakazilo", random.randint(100, 10000), cas))
+        else:
+            paket.append((iban, None, "dvig", random.randint(100, 10000), cas))
+        if len(paket) >= 10000:
+            cur.executemany(
+                "INSERT INTO transakcija (posilja, prejema, tip, znesek, cas) VALUES (?, ?, ?, ?, ?)",
+                paket,
+            )
+            paket = []
+    if paket:
+        cur.executemany(
+            "INSERT INTO transakcija (posilja, prejema, tip, znesek, cas) VALUES (?, ?, ?, ?, ?)",
+            paket,
+        )
+
+
+def izmeri(funkcija, ponovitve):
+    """Izvede funkcijo `ponovitve`-krat in vrne seznam časov v milisekundah."""
+    casi = []
+    for _ in range(ponovitve):
+        zacetek = time.perf_counter()
+        funkcija()
+        casi.append((time.perf_counter() - zacetek) * 1000)
+    return casi
+
+
+def percentil(casi, p):
+    """Vrne p-ti percentil (0-100) seznama časov."""
+    urejeni = sorted(casi)
+    indeks = min(len(urejeni) - 1, int(round(p / 100 * (len(urejeni) - 1))))
+    return urejeni[indeks]
+
+
+def bench_dnevni_limit(args):
+    """
+    Preverjanje dnevnega limita pri naraščajoči zgodovini računa.
+
+    Primerja polodprt časovni interval (`dnevno_okno`) s starim pogojem
+    `DATE(cas) = DATE('now')`, ki mora prebrati vso zgodovino računa.
+    """
+    pripravi_bazo()
+    bank = BankService()
+    bank.create_transfer(IBAN_POSILJA, IBAN_PREJEMA, 100, "današnje nakazilo")
+
+    def star_pogoj():
+        with model.Kazalec() as cur:
+            cur.execute(
+                """
+                SELECT COALESCE(SUM(znesek), 0) FROM transakcija
+                WHERE posilja = ? AND tip = 'nakazilo' AND DATE(cas) = DATE('now')
+            """,
+                (IBAN_POSILJA,),
+            )
+            return cur.fetchone()[0]
+
+    def nov_pogoj():
+        with model.Kazalec() as cur:
+            return bank._porabljeno_danes(cur, IBAN_POSILJA, "nakazilo")
+
+    print(f"Današnji interval: {dnevno_okno()}")
+    print(
+        f"\n{'Zgodovina':>12} {'DATE(cas) p50':>15} {'interval p50':>14} "
+        f"{'limit p50':>11} {'limit p95':>11}"
+    )
+    print("-" * 67)
+
+    trenutno = 0
+    for velikost in sorted(args.velikosti):
+        with model.get_connection():
+            with model.Kazalec() as cur:
+                dodaj_zgodovino(cur, IBAN_POSILJA, velikost - trenutno)
+        trenutno = velikost
+
+        assert star_pogoj() == nov_pogoj()
+        star = izmeri(star_pogoj, args.ponovitve)
+        nov = izmeri(nov_pogoj, args.ponovitve)
+        limit = izmeri(lambda: bank.get_remaining_daily_limit(IBAN_POSILJA), args.ponovitve)
+        print(
+            f"{velikost:>12} {statistics.median(star):>12.3f} ms {statistics.median(nov):>11.3f} ms "
+            f"{percentil(limit, 50):>8.3f} ms {percentil(limit, 95):>8.3f} ms"
+        )
+
+
+def dodaj_promet(cur, stevilo, racuni, dni=730, prvi=0):
+    """
+    Dodaj `stevilo` nakazil med `racuni` računi (SI56 + zaporedna številka od
+    `prvi` naprej), razporejenih čez zadnjih `dni` dni. Vrstice ustvari SQLite sam.
+    """
+    cur.execute(
+        """
+        WITH RECURSIVE n(i) AS (SELECT 1 UNION ALL SELECT i + 1 FROM n WHERE i < :stevilo)
+        INSERT INTO transakcija (posilja, prejema, tip, znesek, cas)
+        SELECT printf('SI56%015d', :prvi + i % :racuni),
+               printf('SI56%015d', :prvi + (i % :racuni + 1 + (i / :racuni) % (:racuni - 1)) % :racuni),
+               'nakazilo',
+               1 + abs(random()) % 10000,
+               DATETIME('now', printf('-%d seconds', 86400 + abs(random()) % (:dni * 86400)))
+        FROM n
+    """,
+        {"stevilo": stevilo, "racuni": racuni, "dni": dni - 1, "prvi": prvi},
+    )
+
+
+def bench_zadnje_transakcije(args):
+    """
+    Zadnje transakcije stranke pri naraščajočem prometu banke.
+
+    Stranka ima stalno zgodovino (`--aktivnost`), promet drugih računov pa
+    raste do `--velikosti`. Primerja prvotno poizvedbo (dva LEFT JOIN-a in OR),
+    pogoj z IN/OR in zlivanje indeksnih razponov po računih stranke.
+    """
+    model.nastavi_profil("batch")
+    pripravi_bazo()
+    with model.get_connection():
+        with model.Kazalec() as cur:
+            cur.execute(
+                "INSERT INTO stranka (id_stranke, ime, priimek, naslov, datum_rojstva) "
+                "VALUES (2, 'Ana', 'Kovač', 'Slovenska 2', '1985-02-02')"
+            )
+            cur.executemany(
+                "INSERT INTO racun (IBAN, id_lastnik, id_paket, stanje) VALUES (?, 2, 1, 0)",
+                [(f"SI56{i:015d}",) for i in range(args.racuni)],
+            )
+            dodaj_zgodovino(cur, IBAN_POSILJA, args.aktivnost)
+    model.nastavi_profil("web")
+    bank = BankService()
+
+    def prvotna():
+        with model.Kazalec() as cur:
+            cur.execute(
+                """
+                SELECT t.id_transakcije, t.posilja, t.prejema, t.tip, t.znesek, t.cas, t.opis
+                FROM transakcija t
+                LEFT JOIN racun r1 ON t.posilja = r1.IBAN
+                LEFT JOIN racun r2 ON t.prejema = r2.IBAN
+                WHERE r1.id_lastnik = ? OR r2.id_lastnik = ?
+                ORDER BY t.cas DESC, t.id_transakcije DESC
+                LIMIT ?
+            """,
+                (1, 1, args.limit),
+            )
+            return [row[0] for row in cur.fetchall()]
+
+    def in_or():
+        with model.Kazalec() as cur:
+            cur.execute(
+                """
+                SELECT t.id_transakcije, t.posilja, t.prejema, t.tip, t.znesek, t.cas, t.opis
+                FROM transakcija t
+                WHERE t.posilja IN (SELECT IBAN FROM racun WHERE id_lastnik = ?)
+                   OR t.prejema IN (SELECT IBAN FROM racun WHERE id_lastnik = ?)
+                ORDER BY t.cas DESC, t.id_transakcije DESC
+                LIMIT ?
+            """,
+                (1, 1, args.limit),
+            )
+            return [row[0] for row in cur.fetchall()]
+
+    def zlivanje():
+        return [t["id_transakcije"] for t in bank.get_recent_transactions(1, limit=args.limit)]
+
+    print(f"Transakcij stranke: {args.aktivnost}, računov drugih strank: {args.racuni}")
+    print(
+        f"\n{'Transakcij':>12} {'prvotna p50':>13} {'IN/OR p50':>11} "
+        f"{'zlivanje p50':>14} {'zlivanje p95':>14}"
+    )
+    print("-" * 68)
+
+    trenutno = args.aktivnost
+    for velikost in sorted(args.velikosti):
+        if velikost > trenutno:
+            model.nastavi_profil("batch")
+            with model.get_connection():
+                with model.Kazalec() as cur:
+                    dodaj_promet(cur, velikost - trenutno, args.racuni)
+            model.nastavi_profil("web")
+            trenutno = velikost
+
+        assert prvotna() == in_or() == zlivanje()
+        stara = izmeri(prvotna, args.ponovitve_stare)
+        vmesna = izmeri(in_or, args.ponovitve)
+        nova = izmeri(zlivanje, args.ponovitve)
+        print(
+            f"{trenutno:>12} {statistics.median(stara):>10.3f} ms {statistics.median(vmesna):>8.3f} ms "
+            f"{percentil(nova, 50):>11.3f} ms {percentil(nova, 95):>11.3f} ms"
+        )
+
+
+def bench_brisanje_stranke(args):
+    """
+    Brisanje poslovne stranke z `--racuni` računi in `--transakcije` transakcijami
+    med njimi, ob `--ostale` transakcijah drugih strank.
+
+    Isto bazo izbriše na dva načina: s prejšnjo zanko (en DELETE na račun) in z
+    `BankService.delete_stranka` (en DELETE z IN podpoizvedbama). Izpiše čas, ko
+    je baza zaklenjena za pisanje, in preveri, da ostanejo iste vrstice.
+    """
+    model.nastavi_profil("batch")
+    pripravi_bazo()
+    with model.get_connection():
+        with model.Kazalec() as cur:
+            cur.executemany(
+                "INSERT INTO stranka (id_stranke, ime, priimek, naslov, datum_rojstva) "
+                "VALUES (?, ?, 'd.o.o.', 'Slovenska 2', '2000-01-01')",
+                [(2, "Podjetje"), (3, "Druga")],
+            )
+            cur.executemany(
+                "INSERT INTO racun (IBAN, id_lastnik, id_paket, stanje) VALUES (?, ?, 1, 0)",
+                [(f"SI56{i:015d}", 2 if i < args.racuni else 3) for i in range(args.racuni + 1000)],
+            )
+            dodaj_promet(cur, args.transakcije, args.racuni)
+            dodaj_promet(cur, args.ostale, 1000, prvi=args.racuni)
+    model.nastavi_profil("web")
+    izvor = os.path.abspath("Banka.db")
+    print(
+        f"Stranka: {args.racuni} računov, {args.transakcije} transakcij; "
+        f"ostalih transakcij: {args.ostale}"
+    )
+
+    def kopija():
+        """Kopija pripravljene baze v novi mapi (povezave bazena se ne delijo)."""
+        os.chdir(tempfile.mkdtemp(prefix="banka_bench_"))
+        with model.dbapi.connect(izvor) as vir, model.dbapi.connect("Banka.db") as cilj:
+            vir.backup(cilj)
+
+    def preostanek():
+        with model.Kazalec() as cur:
+            cur.execute("SELECT COUNT(*), COALESCE(SUM(id_transakcije), 0) FROM transakcija")
+            return cur.fetchone()
+
+    def zanka():
+        with model.PisalniKazalec() as cur:
+            cur.execute("SELECT IBAN FROM racun WHERE id_lastnik = 2")
+            for (iban,) in cur.fetchall():
+                cur.execute("DELETE FROM transakcija WHERE posilja = ? OR prejema = ?", (iban, iban))
+            cur.execute(
+                "DELETE FROM dnevna_poraba WHERE IBAN IN (SELECT IBAN FROM racun WHERE id_lastnik = 2)"
+            )
+            cur.execute("DELETE FROM racun WHERE id_lastnik = 2")
+            cur.execute("DELETE FROM uporabnik WHERE id_stranke = 2")
+            cur.execute("DELETE FROM stranka WHERE id_stranke = 2")
+
+    rezultati = {}
+    for ime, funkcija in (("zanka po računih", zanka), ("delete_stranka", lambda: BankService().delete_stranka(2))):
+        kopija()
+        (cas,) = izmeri(funkcija, 1)
+        rezultati[ime] = preostanek()
+        print(f"{ime:<18} {cas:>10.0f} ms")
+
+    assert len(set(rezultati.values())) == 1
+    print(f"Ostalo transakcij: {rezultati['delete_stranka'][0]}")
+
+
+def bench_izpisek(args):
+    """
+    Izvoz izpiska računa s čedalje več transakcijami (`--velikosti`).
+
+    Izpisek se izvozi v CSV in PDF tako, kot ga pošlje Flask (dele sproti
+    zavrže); izpiše čas in največjo porabo pomnilnika (tracemalloc), ki naj
+    ne bi rasla z dolžino izpiska.
+    """
+    model.nastavi_profil("batch")
+    pripravi_bazo()
+    bank = BankService()
+    print(f"{'transakcij':>12} {'oblika':>6} {'čas':>10} {'velikost':>10} {'pomnilnik':>10}")
+    print("-" * 52)
+
+    trenutno = 0
+    for velikost in sorted(args.velikosti):
+        with model.get_connection():
+            with model.Kazalec() as cur:
+                dodaj_zgodovino(cur, IBAN_POSILJA, velikost - trenutno)
+        trenutno = velikost
+
+        for oblika, funkcija in (("csv", izpisek.v_csv), ("pdf", izpisek.v_pdf)):
+            podatki = bank.get_izpisek(IBAN_POSILJA, "2000-01-01")
+            tracemalloc.start()
+            zacetek = time.perf_counter()
+            bajtov = sum(len(del_izpiska) for del_izpiska in funkcija(podatki))
+            cas = time.perf_counter() - zacetek
+            _, najvec = tracemalloc.get_traced_memory()
+            tracemalloc.stop()
+            print(
+                f"{velikost:>12} {oblika:>6} {cas:>8.2f} s {bajtov / 2**20:>7.1f} MB "
+                f"{najvec / 2**10:>7.0f} kB"
+            )
+
+
+def bench_nalaganje(args):
+    """
+    Nalaganje `--transakcije` transakcij iz CSV datoteke.
+
+    Primerja vstavljanje vrstico za vrstico v eni transakciji (prejšnji
+    `Transakcija.uvozi_podatke`) s paketnim `Transakcija.nalozi`, vsakič v
+    svežo bazo s tisoč računi.
+    """
+    os.chdir(tempfile.mkdtemp(prefix="banka_bench_"))
+    racuni = [f"SI56{i:015d}" for i in range(1000)]
+    zdaj = datetime.now(timezone.utc)
+    with open("transakcije.csv", "w", newline="", encoding="utf-8") as f:
+        pisalec = csv.writer(f)
+        pisalec.writerow(("posilja", "prejema", "tip", "znesek", "cas", "opis"))
+        for _ in range(args.transakcije):
+            posilja, prejema = random.sample(racuni, 2)
+            cas = zdaj - timedelta(seconds=random.randint(86400, 730 * 86400))
+            pisalec.writerow(
+                (posilja, prejema, "nakazilo", random.randint(100, 10000), cas.strftime("%Y-%m-%d %H:%M:%S"), "")
+            )
+    pot = os.path.abspath("transakcije.csv")
+
+    def sveza_baza():
+        os.chdir(tempfile.mkdtemp(prefix="banka_bench_"))
+        with model.get_connection():
+            with model.Kazalec() as cur:
+                model.ustvari_tabele(cur=cur)
+                cur.execute(
+                    "INSERT INTO stranka (id_stranke, ime, priimek, naslov, datum_rojstva) "
+                    "VALUES (1, 'Marko', 'Novak', 'Dunajska 1', '1990-01-01')"
+                )
+                cur.execute(
+                    "INSERT INTO paket (id_paket, tip, cena, osnovni_limit, dnevni_limit) "
+                    "VALUES (1, 'Business', 1999, NULL, 100000000)"
+                )
+                cur.executemany(
+                    "INSERT INTO racun (IBAN, id_lastnik, id_paket, stanje) VALUES (?, 1, 1, 0)",
+                    [(iban,) for iban in racuni],
+                )
+
+    def po_vrsticah():
+        with model.get_connection():
+            with model.Kazalec() as cur, open(pot, newline="", encoding="utf-8") as f:
+                for vrstica in csv.DictReader(f):
+                    cur.execute(
+                        "INSERT INTO transakcija (posilja, prejema, tip, znesek, cas, opis) "
+                        "VALUES (:posilja, :prejema, :tip, :znesek, :cas, :opis)",
+                        vrstica,
+                    )
+
+    print(f"Transakcij: {args.transakcije}, paket: {args.paket}")
+    for ime, funkcija in (
+        ("po vrsticah", po_vrsticah),
+        ("nalozi", lambda: model.Transakcija.nalozi(pot, args.paket)),
+    ):
+        sveza_baza()
+        (cas,) = izmeri(funkcija, 1)
+        with model.Kazalec() as cur:
+            cur.execute("SELECT COUNT(*) FROM transakcija")
+            assert cur.fetchone()[0] == args.transakcije
+        print(f"{ime:<12} {cas / 1000:>8.1f} s {args.transakcije / cas * 1000:>10.0f} vrstic/s")
+
+
+MAPA = os.path.dirname(os.path.abspath(__file__))
+
+# Merjene metode BankService; vsaka dobi dva naključna vzorca
+# (id stranke, uporabniško ime, IBAN) in vrne, ali je klic uspel.
+STORITVE = {
+    "authenticate": lambda bank, v, d: bank.authenticate(v[1], "geslo123")[0],
+    "create_transfer": lambda bank, v, d: bank.create_transfer(v[2], d[2], 100)[0],
+    "create_deposit": lambda bank, v, d: bank.create_deposit(v[2], 1000)[0],
+    "create_withdrawal": lambda bank, v, d: bank.create_withdrawal(v[2], 100)[0],
+    "get_racuni_stranke": lambda bank, v, d: bool(bank.get_racuni_stranke(v[0])),
+    "get_recent_transactions": lambda bank, v, d: bank.get_recent_transactions(v[0]) is not None,
+    "get_transactions_for_account": lambda bank, v, d: bank.get_transactions_for_account(v[2]) is not None,
+    "get_statistics": lambda bank, v, d: bool(bank.get_statistics()),
+    "get_all_stranke": lambda bank, v, d: bool(bank.get_all_stranke()),
+}
+
+
+def izmeri_storitev(funkcija, vzorci, ponovitve, najvec_sekund):
+    """
+    Izvede storitev do `ponovitve`-krat (a ne dlje kot `najvec_sekund`, vsaj
+    petkrat) in vrne percentile časov v milisekundah ter klice na sekundo.
+    """
+    casi = []
+    uspesnih = 0
+    zacetek = time.perf_counter()
+    for i in range(ponovitve):
+        klic = time.perf_counter()
+        uspesnih += bool(funkcija(vzorci[i % len(vzorci)], vzorci[(i + 1) % len(vzorci)]))
+        casi.append((time.perf_counter() - klic) * 1000)
+        if len(casi) >= 5 and time.perf_counter() - zacetek > najvec_sekund:
+            break
+    skupaj = time.perf_counter() - zacetek
+    return {
+        "ponovitve": len(casi),
+        "uspesnih": uspesnih,
+        "p50_ms": round(percentil(casi, 50), 4),
+        "p95_ms": round(percentil(casi, 95), 4),
+        "p99_ms": round(percentil(casi, 99), 4),
+        "povprecje_ms": round(statistics.fmean(casi), 4),
+        "na_sekundo": round(len(casi) / skupaj, 1),
+    }
+
+
+def primerjaj_z_osnovo(rezultati, osnova, prag, prag_ms):
+    """
+    Izpiše spremembe p50 in p95 glede na osnovo in vrne storitve, pri katerih
+    je p50 počasnejši za več kot `prag` odstotkov in hkrati za več kot
+    `prag_ms` milisekund (pri klicih, krajših od desetinke milisekunde, je
+    nihanje med zagoni pogosto večje od 25 %).
+    """
+    razlike = [
+        kljuc
+        for kljuc in ("stranke", "transakcije", "seme", "python", "sqlite")
+        if rezultati["okolje"].get(kljuc) != osnova["okolje"].get(kljuc)
+    ]
+    if razlike:
+        print(f"⚠️  Osnova je bila izmerjena z drugačnimi nastavitvami ({', '.join(razlike)})")
+
+    print(f"\n{'Storitev':<30} {'p50 osnova':>11} {'p50':>9} {'':>7} {'p95 osnova':>11} {'p95':>9} {'':>7}")
+    print("-" * 92)
+    regresije = []
+    for ime, meritev in rezultati["meritve"].items():
+        prej = osnova["meritve"].get(ime)
+        if prej is None:
+            print(f"{ime:<30} {'(ni v osnovi)':>11}")
+            continue
+        vrstica = f"{ime:<30}"
+        for kljuc in ("p50_ms", "p95_ms"):
+            sprememba = meritev[kljuc] / prej[kljuc] - 1 if prej[kljuc] else 0.0
+            vrstica += f" {prej[kljuc]:>8.3f} ms {meritev[kljuc]:>6.3f} ms {sprememba:>+7.0%}"
+        if meritev["p50_ms"] > max(prej["p50_ms"] * (1 + prag / 100), prej["p50_ms"] + prag_ms):
+            regresije.append(ime)
+            vrstica += "  ❌"
+        print(vrstica)
+    return regresije
+
+
+def bench_storitve(args):
+    """
+    Zakasnitve in prepustnost vročih metod `BankService` na banki z
+    `--stranke` strankami in `--transakcije` transakcijami.
+
+    Banko ustvari `generate_demo_data.py` z istim semenom, zato so podatki ob
+    vsakem zagonu enaki. Vsaka storitev se izmeri v `--krogi` krogih, šteje
+    krog z najnižjim p50. Rezultati se shranijo v JSON (`--izhod`) in primerjajo
+    z osnovo (`--osnova`); če je p50 katere storitve počasnejši za več kot
+    `--prag` odstotkov in `--prag-ms` milisekund, se skripta konča z napako.
+    Novo osnovo shranite s `--shrani-osnovo`.
+    """
+    izhod = os.path.abspath(args.izhod)
+    osnova = os.path.abspath(args.osnova)
+    storitve = args.storitve or list(STORITVE)
+
+    os.chdir(tempfile.mkdtemp(prefix="banka_bench_"))
+    print(f"Ustvarjanje banke: {args.stranke} strank, {args.transakcije} transakcij (seme {args.seme})...")
+    subprocess.run(
+        [
+            sys.executable,
+            os.path.join(MAPA, "generate_demo_data.py"),
+            "--customers", str(args.stranke),
+            "--transactions", str(args.transakcije),
+            "--seed", str(args.seme),
+        ],
+        check=True,
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.DEVNULL,
+    )
+
+    rng = random.Random(args.seme)
+    with model.Kazalec() as cur:
+        vzorci = []
+        for id_stranke in rng.sample(range(1, args.stranke + 1), min(args.stranke, 1000)):
+            cur.execute(
+                """
+                SELECT u.id_stranke, u.uporabnisko_ime, r.IBAN
+                FROM uporabnik u
+                JOIN racun r ON r.id_lastnik = u.id_stranke
+                WHERE u.id_stranke = ?
+                ORDER BY r.IBAN
+                LIMIT 1
+            """,
+                (id_stranke,),
+            )
+            vzorci.append(cur.fetchone())
+
+    bank = BankService()
+    rezultati = {
+        "okolje": {
+            "stranke": args.stranke,
+            "transakcije": args.transakcije,
+            "seme": args.seme,
+            "krogi": args.krogi,
+            "python": platform.python_version(),
+            "sqlite": model.dbapi.sqlite_version,
+            "platforma": platform.platform(),
+            "cas": datetime.now(timezone.utc).strftime("%Y-%m-%d %H:%M:%S"),
+        },
+        "meritve": {},
+    }
+    print(f"\n{'Storitev':<30} {'klicev':>7} {'uspešnih':>9} {'p50':>10} {'p95':>10} {'p99':>10} {'klicev/s':>9}")
+    print("-" * 91)
+    for i in range(args.ogrevanje):
+        for ime in storitve:
+            STORITVE[ime](bank, vzorci[i % len(vzorci)], vzorci[(i + 1) % len(vzorci)])
+    # Storitve se merijo izmenično v več krogih; šteje krog z najnižjim p50,
+    # kar zmanjša vpliv motenj drugih procesov na primerjavo z osnovo.
+    for _ in range(args.krogi):
+        for ime in storitve:
+            funkcija = STORITVE[ime]
+            meritev = izmeri_storitev(
+                lambda v, d: funkcija(bank, v, d), vzorci, args.ponovitve, args.najvec_sekund
+            )
+            najboljsa = rezultati["meritve"].get(ime)
+            if najboljsa is None or meritev["p50_ms"] < najboljsa["p50_ms"]:
+                rezultati["meritve"][ime] = meritev
+    for ime, meritev in rezultati["meritve"].items():
+        print(
+            f"{ime:<30} {meritev['ponovitve']:>7} {meritev['uspesnih']:>9} "
+            f"{meritev['p50_ms']:>7.3f} ms {meritev['p95_ms']:>7.3f} ms {meritev['p99_ms']:>7.3f} ms "
+            f"{meritev['na_sekundo']:>9.0f}"
+        )
+
+    with open(izhod, "w", encoding="utf-8") as f:
+        json.dump(rezultati, f, indent=2, ensure_ascii=False)
+    print(f"\nRezultati shranjeni v {izhod}")
+
+    if args.shrani_osnovo:
+        with open(osnova, "w", encoding="utf-8") as f:
+            json.dump(rezultati, f, indent=2, ensure_ascii=False)
+        print(f"Osnova shranjena v {osnova}")
+        return 0
+    if not os.path.exists(osnova):
+        print(f"Osnove {osnova} ni; shranite jo s --shrani-osnovo")
+        return 0
+    with open(osnova, encoding="utf-8") as f:
+        regresije = primerjaj_z_osnovo(rezultati, json.load(f), args.prag, args.prag_ms)
+    if regresije:
+        print(f"\n❌ p50 je počasnejši za več kot {args.prag:.0f} % in {args.prag_ms} ms: {', '.join(regresije)}")
+        return 1
+    print(f"\n✅ Brez regresij nad {args.prag:.0f} % in {args.prag_ms} ms")
+    return 0
+
+
+def v_niti(funkcija, *args):
+    """
+    Izvede funkcijo v novi niti in vrne njen rezultat.
+    Nit si iz bazena izposodi povezavo z v tistem trenutku izbranim profilom.
+    """
+    rezultat = {}
+
+    def cilj():
+        rezultat["vrednost"] = funkcija(*args)
+
+    nit = threading.Thread(target=cilj)
+    nit.start()
+    nit.join()
+    return rezultat["vrednost"]
+
+
+def socasno(profil_bralcev, profil_pisalca, bralci, trajanje):
+    """
+    En pisalec izvaja nakazila, `bralci` niti pa hkrati berejo transakcije.
+    Vrne (pisanj/s, branj/s, število napak 'database is locked').
+    """
+    bank = BankService()
+    konec = time.perf_counter() + trajanje
+    stevci = Counter()
+    zaklep = threading.Lock()
+    pripravljen = threading.Event()
+
+    def pisalec():
+        # Pisalec ves čas drži svojo povezavo (s profilom pisalca)
+        with model.get_connection():
+            pripravljen.set()
+            while time.perf_counter() < konec:
+                success, message = bank.create_transfer(IBAN_POSILJA, IBAN_PREJEMA, 1)
+                with zaklep:
+                    stevci["pisanja" if success else "napake"] += 1
+
+    def bralec():
+        while time.perf_counter() < konec:
+            try:
+                bank.get_transactions_for_account(IBAN_POSILJA, limit=20)
+                kljuc = "branja"
+            except Exception as e:
+                kljuc = "zaklenjeno" if "locked" in str(e) else "napake"
+            with zaklep:
+                stevci[kljuc] += 1
+
+    model.nastavi_profil(profil_pisalca)
+    niti = [threading.Thread(target=pisalec)]
+    niti[0].start()
+    pripravljen.wait()
+    model.nastavi_profil(profil_bralcev)
+    niti += [threading.Thread(target=bralec) for _ in range(bralci)]
+    for nit in niti[1:]:
+        nit.start()
+    for nit in niti:
+        nit.join()
+    return stevci["pisanja"] / trajanje, stevci["branja"] / trajanje, stevci["zaklenjeno"] + stevci["napake"]
+
+
+def bench_profili(args):
+    """
+    Primerjava profilov PRAGMA nastavitev iz model.PROFILI.
+
+    Za vsak profil ustvari svežo bazo z zgodovino in izmeri zaporedna
+    nakazila, zaporedna branja ter sočasno branje in pisanje.
+    """
+    bank = BankService()
+    print(
+        f"\n{'Profil':<10} {'nakazila/s':>11} {'branja/s':>10} "
+        f"{'soč. pisanja/s':>15} {'soč. branja/s':>14} {'napake':>7}"
+    )
+    print("-" * 72)
+    for profil in args.profili:
+        # Profil samo za branje ne more pisati - bazo pripravi in piše "web"
+        pisalni = profil if "query_only" not in model.PROFILI[profil] else "web"
+        model.nastavi_profil(pisalni)
+
+        def pripravi_in_pisi():
+            pripravi_bazo()
+            with model.get_connection():
+                with model.Kazalec() as cur:
+                    dodaj_zgodovino(cur, IBAN_POSILJA, args.zgodovina)
+            casi = izmeri(
+                lambda: bank.create_transfer(IBAN_POSILJA, IBAN_PREJEMA, 1), args.ponovitve
+            )
+            return 1000 / statistics.mean(casi)
+
+        nakazila = v_niti(pripravi_in_pisi)
+        model.nastavi_profil(profil)
+        casi = v_niti(
+            izmeri,
+            lambda: bank.get_transactions_for_account(IBAN_POSILJA, limit=20),
+            args.ponovitve,
+        )
+        branja = 1000 / statistics.mean(casi)
+        pisanja_s, branja_s, napake = socasno(profil, pisalni, args.bralci, args.trajanje)
+        oznaka = f"{nakazila:>11.0f}" if pisalni == profil else f"{'(web)':>11}"
+        print(
+            f"{profil:<10} {oznaka} {branja:>10.0f} "
+            f"{pisanja_s:>15.0f} {branja_s:>14.0f} {napake:>7}"
+        )
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Meritve zmogljivosti Slovenia Bank")
+    podukazi = parser.add_subparsers(dest="meritev", required=True)
+
+    p = podukazi.add_parser("dnevni-limit", help="preverjanje dnevnega limita")
+    p.add_argument("--velikosti", type=int, nargs="+", default=[1000, 10000, 100000])
+    p.add_argument("--ponovitve", type=int, default=200)
+    p.set_defaults(funkcija=bench_dnevni_limit)
+
+    p = podukazi.add_parser("profili", help="primerjava profilov PRAGMA nastavitev")
+    p.add_argument("--profili", nargs="+", choices=list(model.PROFILI), default=list(model.PROFILI))
+    p.add_argument("--zgodovina", type=int, default=20000)
+    p.add_argument("--ponovitve", type=int, default=500)
+    p.add_argument("--bralci", type=int, default=4)
+    p.add_argument("--trajanje", type=float, default=2.0)
+    p.set_defaults(funkcija=bench_profili)
+
+    p = podukazi.add_parser("zadnje-transakcije", help="zadnje transakcije stranke")
+    p.add_argument("--velikosti", type=int, nargs="+", default=[100000, 1000000, 10000000])
+    p.add_argument("--aktivnost", type=int, default=2000, help="transakcij stranke")
+    p.add_argument("--racuni", type=int, default=1000, help="računov drugih strank")
+    p.add_argument("--limit", type=int, default=10)
+    p.add_argument("--ponovitve", type=int, default=200)
+    p.add_argument("--ponovitve-stare", type=int, default=3)
+    p.set_defaults(funkcija=bench_zadnje_transakcije)
+
+    p = podukazi.add_parser("brisanje-stranke", help="brisanje stranke z veliko računi")
+    p.add_argument("--racuni", type=int, default=50)
+    p.add_argument("--transakcije", type=int, default=1000000)
+    p.add_argument("--ostale", type=int, default=1000000, help="transakcij drugih strank")
+    p.set_defaults(funkcija=bench_brisanje_stranke)
+
+    p = podukazi.add_parser("izpisek", help="izvoz izpiska računa (čas in pomnilnik)")
+    p.add_argument("--velikosti", type=int, nargs="+", default=[10000, 100000, 1000000])
+    p.set_defaults(funkcija=bench_izpisek)
+
+    p = podukazi.add_parser("nalaganje", help="paketno nalaganje transakcij iz CSV")
+    p.add_argument("--transakcije", type=int, default=1000000)
+    p.add_argument("--paket", type=int, default=50000)
+    p.set_defaults(funkcija=bench_nalaganje)
+
+    p = podukazi.add_parser("storitve", help="zakasnitve vročih metod BankService in primerjava z osnovo")
+    p.add_argument("--stranke", type=int, default=10000)
+    p.add_argument("--transakcije", type=int, default=200000)
+    p.add_argument("--seme", type=int, default=42)
+    p.add_argument("--storitve", nargs="+", choices=list(STORITVE), help="privzeto vse")
+    p.add_argument("--ponovitve", type=int, default=500)
+    p.add_argument("--krogi", type=int, default=3, help="šteje krog z najnižjim p50")
+    p.add_argument("--ogrevanje", type=int, default=5)
+    p.add_argument("--najvec-sekund", type=float, default=10.0, help="najdaljše merjenje ene storitve")
+    p.add_argument("--izhod", default="benchmark_storitve.json", help="datoteka z rezultati")
+    p.add_argument("--osnova", default=os.path.join(MAPA, "benchmark_osnova.json"))
+    p.add_argument("--shrani-osnovo", action="store_true", help="rezultate shrani kot novo osnovo")
+    p.add_argument("--prag", type=float, default=25.0, help="dovoljena upočasnitev p50 v odstotkih")
+    p.add_argument("--prag-ms", type=float, default=0.05, help="dovoljena upočasnitev p50 v milisekundah")
+    p.set_defaults(funkcija=bench_storitve)
+
+    args = parser.parse_args()
+    random.seed(42)
+    return args.funkcija(args) or 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,347 @@
+"""
+Preverjanje načrtov poizvedb (EXPLAIN QUERY PLAN) za vse SQL stavke v BankService
+
+Skripta v začasni mapi ustvari prazno bazo, vstavi nekaj demo podatkov,
+pokliče vse javne metode BankService in zabeleži vsak izveden SQL stavek.
+Za vsak stavek izpiše načrt in vrne izhodno kodo 1, če katera od vročih
+poizvedb preiskuje celotno tabelo `transakcija` ali `racun` brez indeksa.
+
+Preveri tudi število SQL stavkov na posamezno spletno zahtevo (`ZAHTEVE`),
+da se ne vrne vzorec N+1 poizvedb.
+
+Uporaba:
+    python check_query_plans.py
+"""
+
+import datetime
+import os
+import random
+import re
+import sys
+import tempfile
+import types
+
+import model
+from services import BankService, zakodiraj_kazalec
+
+# Tabele, ki rastejo s prometom - na njih ne dovolimo pregleda brez indeksa
+VROCE_TABELE = {"transakcija", "racun"}
+
+# Metode, ki namenoma preberejo vse vrstice (admin pregledi), in razlog
+DOVOLJENI_PREGLEDI = {
+    "get_all_racuni": "admin seznam vseh računov",
+    "rebuild_dnevna_poraba": "vzdrževanje - ponoven izračun iz vseh transakcij",
+    "rebuild_statistika": "vzdrževanje - ponoven izračun iz vseh podatkov",
+    "rebuild_stanja_transakcij": "vzdrževanje - ponoven izračun iz vseh transakcij",
+}
+
+# Spletne poti in največje dovoljeno število SQL stavkov na zahtevo
+ZAHTEVE = {
+    # stranka, računi, zadnje transakcije in čas najnovejše arhivirane transakcije
+    "/dashboard": 4,
+    "/accounts": 1,
+    "/packages": 2,
+}
+
+IBAN_1 = "SI56191000000123438"
+IBAN_2 = "SI56263300012039086"
+# Dodatne stranke, računi in transakcije, da imajo načrti realno statistiko
+# (ANALYZE) - na skoraj prazni bazi optimizator izbere drugače kot v produkciji
+POLNILO_STRANK = 2000
+POLNILO_TRANSAKCIJ = 30000
+# Stranka, ki jo doda scenarij (za vsemi strankami iz polnila)
+NOVA_STRANKA = POLNILO_STRANK + 2
+# Kazalec strani (keyset) za preverjanje druge strani seznamov transakcij
+STRAN = zakodiraj_kazalec("2999-12-31 23:59:59", 2**62)
+
+
+def pripravi_bazo(cur):
+    """Ustvari tabele, vstavi testne podatke in polnilo ter zbere statistiko."""
+    model.ustvari_tabele(cur=cur)
+    cur.execute(
+        "INSERT INTO stranka (id_stranke, ime, priimek, naslov, datum_rojstva) "
+        "VALUES (1, 'Marko', 'Novak', 'Dunajska 1', '1990-01-01')"
+    )
+    cur.execute(
+        "INSERT INTO paket (id_paket, tip, cena, osnovni_limit, dnevni_limit) "
+        "VALUES (1, 'Basic', 0, 50000, 100000)"
+    )
+    cur.executemany(
+        "INSERT INTO racun (IBAN, id_lastnik, id_paket, stanje) VALUES (?, 1, 1, 100000)",
+        [(IBAN_1,), (IBAN_2,)],
+    )
+    # Stara transakcija, ki jo arhiviranje prestavi v arhiv
+    cur.execute(
+        "INSERT INTO transakcija (posilja, prejema, tip, znesek, cas, opis) "
+        "VALUES (NULL, ?, 'polog', 100, '2020-01-01 12:00:00', 'stari test')",
+        (IBAN_1,),
+    )
+    with open("uvoz.csv", "w", encoding="utf-8") as f:
+        f.write(f"posilja,prejema,tip,znesek,cas,opis\n{IBAN_2},{IBAN_1},nakazilo,100,2024-06-01 12:00:00,uvoz\n")
+
+    rng = random.Random(0)
+    cur.executemany(
+        "INSERT INTO stranka (id_stranke, ime, priimek, naslov, datum_rojstva) "
+        "VALUES (?, ?, ?, 'Polnilo 1', '1980-01-01')",
+        [(i, f"Ime{i}", f"Priimek{i % 500}") for i in range(2, POLNILO_STRANK + 2)],
+    )
+    ibani = [f"SI56{i:015d}" for i in range(2 * POLNILO_STRANK)]
+    cur.executemany(
+        "INSERT INTO racun (IBAN, id_lastnik, id_paket, stanje) VALUES (?, ?, 1, 100000)",
+        [(iban, 2 + i // 2) for i, iban in enumerate(ibani)],
+    )
+    # Polnilo je mlajše od meje arhiviranja, da ga scenarij ne prestavlja
+    zdaj = datetime.datetime.now()
+    transakcije = []
+    for _ in range(POLNILO_TRANSAKCIJ):
+        posilja, prejema = rng.sample(ibani, 2)
+        cas = zdaj - datetime.timedelta(seconds=rng.randrange(300 * 86400))
+        transakcije.append((posilja, prejema, rng.randint(1, 1000), cas.strftime("%Y-%m-%d %H:%M:%S")))
+    cur.executemany(
+        "INSERT INTO transakcija (posilja, prejema, tip, znesek, cas, opis) "
+        "VALUES (?, ?, 'nakazilo', ?, ?, 'polnilo')",
+        transakcije,
+    )
+    cur.execute("ANALYZE")
+
+
+def scenarij(bank):
+    """
+    Zaporedje klicev (ime metode, argumenti), ki pokrije vse javne metode.
+    Brisanja so na koncu, da ne odstranijo podatkov prej.
+    """
+    return [
+        ("create_uporabnik", ("marko.novak", "geslo123", 1)),
+        ("authenticate", ("marko.novak", "geslo123")),
+        ("change_password", (1, "geslo123", "geslo456")),
+        ("get_stranka", (1,)),
+        ("get_racuni_stranke", (1,)),
+        ("get_dashboard", (1,)),
+        ("get_racun", (IBAN_1,)),
+        ("get_paket_za_racun", (IBAN_1,)),
+        ("create_deposit", (IBAN_1, 1000)),
+        ("create_transfer", (IBAN_1, IBAN_2, 500, "test")),
+        ("create_withdrawal", (IBAN_2, 200)),
+        ("get_remaining_daily_limit", (IBAN_1,)),
+        ("get_balance_at", (IBAN_1, "2020-06-01")),
+        ("arhiviraj_transakcije", (365, 100)),
+        ("create_stanje_posnetki", ("2024-12-31",)),
+        ("get_balance_at", (IBAN_1, "2025-01-01 12:00:00")),
+        ("get_izpisek", (IBAN_1, "2020-01-01", "2030-12-31")),
+        ("get_recent_transactions", (1,)),
+        ("get_recent_transactions", (1, 10, STRAN)),
+        ("get_transactions_for_account", (IBAN_1,)),
+        ("get_transactions_for_account", (IBAN_1, 50, STRAN)),
+        ("get_all_stranke", ()),
+        ("search_stranke", ()),
+        ("search_stranke", ("nov dun",)),
+        ("search_stranke", ("1",)),
+        ("search_stranke", ("", 50, zakodiraj_kazalec("Kovač", "Ana", 1))),
+        ("get_all_transactions", ()),
+        ("get_all_transactions", (100, STRAN)),
+        ("search_transactions", ("test",)),
+        ("search_transactions", ("", None, "nakazilo", 100, 100000, "2024-01-01", "2030-12-31")),
+        ("search_transactions", ("test", IBAN_1, None, None, None, None, None, 50, STRAN)),
+        ("get_statistics", ()),
+        ("rebuild_dnevna_poraba", ()),
+        ("rebuild_statistika", ()),
+        ("rebuild_stanja_transakcij", ()),
+        ("uvozi_csv", ("transakcija", "uvoz.csv", 1)),
+        ("add_stranka", ("Ana", "Kovač", "Slovenska 2", "1985-02-02")),
+        ("update_stranka", (NOVA_STRANKA, "Ana", "Kovač", "Slovenska 3", "1985-02-02")),
+        ("get_all_racuni", ()),
+        ("get_all_paketi", ()),
+        ("generate_iban", ()),
+        ("add_paket", ("Premium", 599, None, 500000)),
+        ("update_paket", (2, "Premium", 699, None, 500000)),
+        ("add_racun", (bank.generate_iban(), NOVA_STRANKA, 2)),
+        ("update_racun_paket", (IBAN_2, 2)),
+        ("delete_racun", (IBAN_2,)),
+        ("delete_paket", (2,)),
+        ("delete_uporabnik_za_stranko", (NOVA_STRANKA,)),
+        ("delete_stranka", (1,)),
+    ]
+
+
+def stavki_na_zahtevo(conn):
+    """
+    Izvede vsako pot iz `ZAHTEVE` kot prijavljena stranka 1 in vrne
+    seznam (pot, število stavkov, status).
+    """
+    from app import app
+
+    rezultati = []
+    odjemalec = app.test_client()
+    with odjemalec.session_transaction() as seja:
+        seja["user_id"] = 1
+        seja["is_admin"] = False
+    for pot in ZAHTEVE:
+        # Prva zahteva napolni predpomnilnike procesa, šteje se druga
+        odjemalec.get(pot)
+        zabelezeni = []
+        conn.set_trace_callback(zabelezeni.append)
+        try:
+            odgovor = odjemalec.get(pot)
+        finally:
+            conn.set_trace_callback(None)
+        rezultati.append((pot, len(zabelezeni), odgovor.status_code))
+    return rezultati
+
+
+def javne_metode():
+    return {
+        ime
+        for ime in vars(BankService)
+        if not ime.startswith("_") and callable(getattr(BankService, ime))
+    }
+
+
+def tabela_za_alias(sql, alias):
+    """Poišči ime tabele za alias iz FROM/JOIN dela stavka."""
+    for tabela, a in re.findall(
+        r"(?:FROM|JOIN|UPDATE|INTO)\s+(\w+)(?:\s+(?:AS\s+)?(\w+))?", sql, re.I
+    ):
+        if alias in (tabela, a):
+            return tabela
+    return alias
+
+
+def pregledi_brez_indeksa(cur, sql):
+    """Vrne seznam vročih tabel, ki jih stavek prebere v celoti brez indeksa."""
+    if not re.match(r"\s*(SELECT|UPDATE|DELETE|WITH)", sql, re.I):
+        return [], []
+    try:
+        cur.execute("EXPLAIN QUERY PLAN " + sql)
+    except model.dbapi.OperationalError as e:
+        # Npr. začasna tabela, ki jo je metoda že pobrisala
+        return [f"(načrta ni mogoče izpisati: {e})"], []
+    nacrt = [vrstica[3] for vrstica in cur.fetchall()]
+    tabele = []
+    for korak in nacrt:
+        m = re.match(r"SCAN (\w+)$", korak)
+        if m and tabela_za_alias(sql, m.group(1)) in VROCE_TABELE:
+            tabele.append(tabela_za_alias(sql, m.group(1)))
+    return nacrt, tabele
+
+
+def preveri_prekinjeno_arhiviranje(bank):
+    """
+    Posnemaj arhiviranje, prekinjeno med kopiranjem paketa v arhiv in
+    brisanjem iz glavne tabele, ter preveri, da obnova statistike vsako
+    transakcijo šteje enkrat - tudi po nadaljevanju arhiviranja.
+    Vrne število napak.
+    """
+    with model.PisalniKazalec() as cur:
+        cur.execute("""
+            INSERT OR IGNORE INTO arhiv.transakcija
+                (id_transakcije, posilja, prejema, tip, znesek, cas, opis,
+                 stanje_posilja, stanje_prejema)
+            SELECT id_transakcije, posilja, prejema, tip, znesek, cas, opis,
+                   stanje_posilja, stanje_prejema
+            FROM transakcija
+            ORDER BY cas, id_transakcije
+            LIMIT 100
+        """)
+
+    napake = 0
+    for korak, pred in (
+        ("po prekinjenem paketu", lambda: None),
+        ("po nadaljevanju arhiviranja", lambda: bank.arhiviraj_transakcije(1)),
+    ):
+        pred()
+        success, message = bank.rebuild_statistika()
+        with model.Kazalec() as cur:
+            cur.execute("""
+                SELECT COUNT(*) FROM (
+                    SELECT id_transakcije FROM main.transakcija
+                    UNION
+                    SELECT id_transakcije FROM arhiv.transakcija
+                )
+            """)
+            pricakovano = cur.fetchone()[0]
+            cur.execute("SELECT vrednost FROM statistika WHERE ime = 'transakcije'")
+            (steto,) = cur.fetchone()
+            cur.execute("SELECT SUM(vrednost) FROM statistika WHERE ime LIKE 'transakcije:%'")
+            (po_dnevih,) = cur.fetchone()
+        oznaka = "OK"
+        if not success or steto != pricakovano or po_dnevih != pricakovano:
+            oznaka = "NAPAKA"
+            napake += 1
+        print(
+            f"[{oznaka}] statistika {korak}: {steto} transakcij "
+            f"(po dnevih {po_dnevih}, pričakovano {pricakovano}) - {message}"
+        )
+    return napake
+
+
+def main():
+    os.chdir(tempfile.mkdtemp(prefix="banka_plani_"))
+    # Povezava ostane izposojena ves čas, da se spletne zahteve in klici
+    # metod v tej niti izvedejo na njej in jih sledenje zabeleži
+    with model.get_connection() as conn:
+        with model.Kazalec() as cur:
+            pripravi_bazo(cur)
+        conn.commit()
+
+        napake = 0
+        for pot, stevilo, status in stavki_na_zahtevo(conn):
+            oznaka = "OK" if stevilo <= ZAHTEVE[pot] and status == 200 else "PREVEČ"
+            if oznaka != "OK":
+                napake += 1
+            print(f"[{oznaka}] GET {pot}: {stevilo} stavkov (največ {ZAHTEVE[pot]}), status {status}")
+        print()
+
+        bank = BankService()
+        koraki = scenarij(bank)
+        manjkajo = javne_metode() - {ime for ime, _ in koraki}
+        if manjkajo:
+            print(f"Metode brez scenarija: {', '.join(sorted(manjkajo))}")
+            return 1
+
+        stavki = []
+        for ime, argumenti in koraki:
+            zabelezeni = []
+            conn.set_trace_callback(zabelezeni.append)
+            try:
+                rezultat = getattr(bank, ime)(*argumenti)
+                # Generatorji (npr. transakcije izpiska) izvedejo stavke šele ob branju
+                if isinstance(rezultat, dict):
+                    for vrednost in rezultat.values():
+                        if isinstance(vrednost, types.GeneratorType):
+                            list(vrednost)
+            finally:
+                conn.set_trace_callback(None)
+            for sql in zabelezeni:
+                if sql.strip().upper() not in ("BEGIN", "COMMIT", "ROLLBACK"):
+                    stavki.append((ime, sql))
+
+        with model.Kazalec() as cur:
+            for ime, sql in stavki:
+                # Trace vrne stavek z že vstavljenimi vrednostmi parametrov
+                nacrt, tabele = pregledi_brez_indeksa(cur, sql)
+                if not nacrt:
+                    continue
+                oznaka = "OK"
+                if tabele:
+                    if ime in DOVOLJENI_PREGLEDI:
+                        oznaka = f"DOVOLJENO ({DOVOLJENI_PREGLEDI[ime]})"
+                    else:
+                        oznaka = "PREGLED TABELE: " + ", ".join(tabele)
+                        napake += 1
+                print(f"[{oznaka}] {ime}: {' '.join(sql.split())[:100]}")
+                for korak in nacrt:
+                    print(f"    {korak}")
+
+        print()
+        napake += preveri_prekinjeno_arhiviranje(bank)
+
+        print()
+        if napake:
+            print(f"❌ {napake} napak(e) v načrtih, številu poizvedb ali statistiki")
+            return 1
+        print(f"✅ Vseh {len(stavki)} stavkov uporablja indekse")
+        return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
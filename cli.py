@@ -3,10 +3,14 @@ CLI - Tekstovni vmesnik za Slovenia Bank
 Omogoča interakcijo z banko preko ukazov v terminalu
 """
 
+import argparse
 import sys
 import os
+import time
 from datetime import date, datetime
-from services import BankService
+from services import ARHIV_PO_DNEH, BankService, naslednja_stran
+import izpisek
+import model
 
 bank = BankService()
 
@@ -57,9 +61,10 @@ def print_menu():
         print("11. Izbriši paket")
         print("── OSTALO ───────────────")
         print("12. Pregled vseh transakcij")
-        print("13. Statistika sistema")
-        print("14. Odjava")
-        print("15. Izhod")
+        print("13. Iskanje transakcij")
+        print("14. Statistika sistema")
+        print("15. Odjava")
+        print("16. Izhod")
     else:
         print("1. Pregled računov")
         print("2. Pregled stanja računa")
@@ -188,7 +193,7 @@ def view_account_balance():
         izbira = int(input("\nIzberite račun (številka): ")) - 1
         if 0 <= izbira < len(racuni):
             racun = racuni[izbira]
-            paket = bank.get_paket_za_racun(racun["IBAN"])
+            paket = racun["paket"]
 
             print(f"\n{'='*55}")
             print(f"IBAN:   {format_iban(racun['IBAN'])}")
@@ -375,8 +380,8 @@ def view_transactions():
         if not transakcije:
             print("\nNi transakcij.")
         else:
-            print(f"\n{'Datum':<20} {'Tip':<12} {'Znesek':>12}  {'Opis':<30}")
-            print("-" * 80)
+            print(f"\n{'Datum':<20} {'Tip':<12} {'Znesek':>12} {'Stanje':>12}  {'Opis':<30}")
+            print("-" * 93)
             for tr in transakcije:
                 datum = format_datum(tr["cas"])
                 tip = tr["tip"].upper()
@@ -399,7 +404,8 @@ def view_transactions():
                 # Prikaži namen plačila, če obstaja
                 opis_prikaz = tr.get("opis") or smer
 
-                print(f"{datum:<20} {tip:<12} {znak}{znesek:>11.2f} €  {opis_prikaz:<30}")
+                stanje = f"{tr['stanje_po'] / 100:>10.2f} €" if tr["stanje_po"] is not None else f"{'-':>12}"
+                print(f"{datum:<20} {tip:<12} {znak}{znesek:>11.2f} € {stanje}  {opis_prikaz:<30}")
 
     except ValueError:
         print("❌ Napaka: Neveljaven vnos!")
@@ -512,32 +518,85 @@ def admin_view_transactions():
     print("\n--- VSE TRANSAKCIJE ---")
 
     try:
-        limit = input("Število transakcij (privzeto 50): ").strip()
+        limit = input("Število transakcij na stran (privzeto 50): ").strip()
         limit = int(limit) if limit else 50
 
-        transakcije = bank.get_all_transactions(limit=limit)
+        izpisi_strani(lambda po: bank.get_all_transactions(limit=limit, po=po), limit)
+
+    except ValueError:
+        print("❌ Napaka: Neveljaven vnos!")
+
+    input("\nPritisnite Enter za nadaljevanje...")
+
+
+def izpisi_strani(stran, limit):
+    """
+    Izpiši transakcije stran za stranjo.
+    `stran(po)` vrne transakcije strani za kazalcem `po` (None za prvo stran).
+    """
+    po = None
+    while True:
+        transakcije = stran(po)
 
         if not transakcije:
             print("Ni transakcij.")
-        else:
+            break
+
+        print(
+            f"\n{'ID':<8} {'Datum':<20} {'Tip':<12} {'Od':<22} {'Za':<22} {'Znesek':>12}"
+        )
+        print("-" * 103)
+        for tr in transakcije:
+            id_tr = tr["id_transakcije"]
+            datum = format_datum(tr["cas"])
+            tip = tr["tip"].upper()
+            posilja = tr["posilja"] or "-"
+            prejema = tr["prejema"] or "-"
+            znesek = tr["znesek"] / 100
+
             print(
-                f"\n{'ID':<8} {'Datum':<20} {'Tip':<12} {'Od':<22} {'Za':<22} {'Znesek':>12}"
+                f"{id_tr:<8} {datum:<20} {tip:<12} {posilja:<22} {prejema:<22} {znesek:>11.2f} €"
             )
-            print("-" * 103)
-            for tr in transakcije:
-                id_tr = tr["id_transakcije"]
-                datum = format_datum(tr["cas"])
-                tip = tr["tip"].upper()
-                posilja = tr["posilja"] or "-"
-                prejema = tr["prejema"] or "-"
-                znesek = tr["znesek"] / 100
+            if tr["opis"]:
+                print(f"{'':<8} {tr['opis']}")
+
+        po = naslednja_stran(transakcije, limit)
+        if po is None:
+            break
+        if input("\nNaslednja stran? (Enter = da, n = ne): ").strip().lower() == "n":
+            break
 
-                print(
-                    f"{id_tr:<8} {datum:<20} {tip:<12} {posilja:<22} {prejema:<22} {znesek:>11.2f} €"
-                )
 
+def admin_search_transactions():
+    """Iskanje transakcij po opisu in filtrih"""
+    print("\n--- ISKANJE TRANSAKCIJ ---")
+    print("Prazen vnos pomeni brez omejitve.")
+
+    iskanje = input("Besede v namenu plačila: ").strip()
+    iban = input("IBAN: ").strip() or None
+    tip = input("Tip (polog/dvig/nakazilo/obresti): ").strip().lower() or None
+    znesek_od = input("Znesek od (EUR): ").strip()
+    znesek_do = input("Znesek do (EUR): ").strip()
+    od = input("Od datuma (LLLL-MM-DD): ").strip() or None
+    do = input("Do datuma (LLLL-MM-DD): ").strip() or None
+
+    try:
+        znesek_od = round(float(znesek_od) * 100) if znesek_od else None
+        znesek_do = round(float(znesek_do) * 100) if znesek_do else None
     except ValueError:
-        print("❌ Napaka: Neveljaven vnos!")
+        print("❌ Napaka: Neveljaven znesek!")
+        input("\nPritisnite Enter za nadaljevanje...")
+        return
+
+    try:
+        izpisi_strani(
+            lambda po: bank.search_transactions(
+                iskanje, iban, tip, znesek_od, znesek_do, od, do, limit=50, po=po
+            ),
+            50,
+        )
+    except ValueError as e:
+        print(f"❌ Napaka: {e}")
 
     input("\nPritisnite Enter za nadaljevanje...")
 
@@ -937,10 +996,12 @@ def main():
                 elif izbira == "12":
                     admin_view_transactions()
                 elif izbira == "13":
-                    admin_view_statistics()
+                    admin_search_transactions()
                 elif izbira == "14":
-                    logout()
+                    admin_view_statistics()
                 elif izbira == "15":
+                    logout()
+                elif izbira == "16":
                     print("\n👋 Nasvidenje!")
                     sys.exit(0)
                 else:
@@ -979,7 +1040,164 @@ def main():
             input("\nPritisnite Enter za nadaljevanje...")
 
 
+def vzdrzevanje(args):
+    """
+    Izvedi vzdrževalne ukaze, podane kot argumente ukazne vrstice.
+    Vrne True, če je bil izveden vsaj en ukaz.
+    """
+    izvedeno = False
+    if args.migrate:
+        # Pred ostalimi ukazi, ki že potrebujejo nove tabele in stolpce
+        with model.get_connection():
+            model.ustvari_tabele()
+        print("✅ Manjkajoče tabele, stolpci, indeksi in sprožilci so dodani")
+        izvedeno = True
+    if args.import_csv:
+        zacetek = time.monotonic()
+
+        def napredek(vrstic):
+            hitrost = vrstic / max(time.monotonic() - zacetek, 1e-9)
+            print(f"\r   {vrstic} vrstic ({hitrost:.0f}/s)", end="", file=sys.stderr, flush=True)
+
+        success, message = bank.uvozi_csv(*args.import_csv, args.import_batch, napredek)
+        print(file=sys.stderr)
+        print(f"✅ {message}" if success else f"❌ {message}")
+        izvedeno = True
+    if args.rebuild_daily_usage:
+        success, message = bank.rebuild_dnevna_poraba()
+        print(f"✅ {message}" if success else f"❌ {message}")
+        izvedeno = True
+    if args.rebuild_stats:
+        success, message = bank.rebuild_statistika()
+        print(f"✅ {message}" if success else f"❌ {message}")
+        izvedeno = True
+    if args.rebuild_running_balances:
+        success, message = bank.rebuild_stanja_transakcij()
+        print(f"✅ {message}" if success else f"❌ {message}")
+        izvedeno = True
+    if args.snapshot_balances is not None:
+        success, message = bank.create_stanje_posnetki(args.snapshot_balances or None)
+        print(f"✅ {message}" if success else f"❌ {message}")
+        izvedeno = True
+    if args.archive is not None:
+        success, message = bank.arhiviraj_transakcije(args.archive, args.archive_batch)
+        print(f"✅ {message}" if success else f"❌ {message}")
+        izvedeno = True
+    return izvedeno
+
+
+def izvozi_izpisek(args):
+    """
+    Zapiši izpisek računa (--statement) v datoteko --output ali na standardni
+    izhod. Izpisek se zapisuje sproti, med branjem iz baze.
+    Vrne True, če je bil izpisek zahtevan.
+    """
+    if not args.statement:
+        return False
+    try:
+        podatki = bank.get_izpisek(args.statement, args.od, args.do)
+    except ValueError as e:
+        sys.exit(f"❌ {e}")
+    if podatki is None:
+        sys.exit("❌ Račun ne obstaja")
+
+    if args.format == "pdf":
+        deli = izpisek.v_pdf(podatki)
+        izhod = open(args.output, "wb") if args.output else sys.stdout.buffer
+    else:
+        deli = izpisek.v_csv(podatki)
+        izhod = open(args.output, "w", newline="", encoding="utf-8") if args.output else sys.stdout
+    try:
+        for del_izpiska in deli:
+            izhod.write(del_izpiska)
+    finally:
+        if args.output:
+            izhod.close()
+    if args.output:
+        print(f"✅ Izpisek zapisan v {args.output}", file=sys.stderr)
+    return True
+
+
 if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Slovenia Bank - tekstovni vmesnik")
+    parser.add_argument(
+        "--migrate",
+        action="store_true",
+        help="v obstoječo bazo dodaj manjkajoče tabele, stolpce, indekse in sprožilce",
+    )
+    parser.add_argument(
+        "--rebuild-daily-usage",
+        action="store_true",
+        help="ponovno izračunaj tabelo dnevna_poraba iz transakcij",
+    )
+    parser.add_argument(
+        "--rebuild-stats",
+        action="store_true",
+        help="ponovno izračunaj tabelo statistika in preveri sprotne števce",
+    )
+    parser.add_argument(
+        "--rebuild-running-balances",
+        action="store_true",
+        help="ponovno izračunaj stanje računov po vsaki transakciji",
+    )
+    parser.add_argument(
+        "--snapshot-balances",
+        nargs="?",
+        const="",
+        metavar="DO_DNE",
+        help="dopolni posnetke stanj ob koncu dneva do dneva DO_DNE (privzeto včeraj)",
+    )
+    parser.add_argument(
+        "--import",
+        dest="import_csv",
+        nargs=2,
+        metavar=("TABELA", "CSV"),
+        help="paketno naloži CSV datoteko v tabelo (prekinjeno nalaganje se nadaljuje)",
+    )
+    parser.add_argument(
+        "--import-batch",
+        type=int,
+        default=50000,
+        metavar="N",
+        help="število vrstic, naloženih v eni pisalni transakciji",
+    )
+    parser.add_argument(
+        "--archive",
+        nargs="?",
+        const=ARHIV_PO_DNEH,
+        type=int,
+        metavar="DNI",
+        help=f"prestavi transakcije, starejše od DNI dni (privzeto {ARHIV_PO_DNEH}), v arhiv",
+    )
+    parser.add_argument(
+        "--archive-batch",
+        type=int,
+        default=10000,
+        metavar="N",
+        help="število transakcij, prestavljenih v eni pisalni transakciji",
+    )
+    parser.add_argument(
+        "--statement",
+        metavar="IBAN",
+        help="izvozi izpisek računa IBAN (glej --from, --to, --format, --output)",
+    )
+    parser.add_argument(
+        "--from", dest="od", metavar="LLLL-MM-DD", help="začetek obdobja izpiska (privzeto 1. januar)"
+    )
+    parser.add_argument(
+        "--to", dest="do", metavar="LLLL-MM-DD", help="konec obdobja izpiska (privzeto danes)"
+    )
+    parser.add_argument(
+        "--format", choices=("csv", "pdf"), default="csv", help="oblika izpiska (privzeto csv)"
+    )
+    parser.add_argument(
+        "--output", metavar="DATOTEKA", help="datoteka za izpisek (privzeto standardni izhod)"
+    )
+    args = parser.parse_args()
+    izvozeno = izvozi_izpisek(args)
+    if vzdrzevanje(args) or izvozeno:
+        sys.exit(0)
+
     print("\n🏦 Dobrodošli v Slovenia Bank CLI! 🏦\n")
     input("Pritisnite Enter za začetek...")
     main()
@@ -1,202 +1,365 @@
 """
 Generiranje demo podatkov za testiranje bančnega sistema
+
+Privzeto ustvari majhno demo banko (5 strank, 33 transakcij). Z možnostmi
+ustvari banko poljubne velikosti, npr.
+
+    python generate_demo_data.py --customers 1000000 --transactions 50000000 --seed 7
+
+Podatke v delih po --batch vrstic pripravlja --workers procesov, v bazo pa
+jih po vrsti zapisuje en sam proces (SQLite ima enega pisca). Vsak del ima
+svoj generator naključnih števil, zato so z istim semenom in koncem obdobja
+(--end-date) podatki vedno enaki, ne glede na število procesov.
+Skripta vse obstoječe podatke pobriše.
 """
 
+import argparse
+import functools
+import multiprocessing
+import os
 import random
-import sqlite3
-from datetime import datetime, timedelta
-
-from services import BankService
+import sys
+import time
+from array import array
+from collections import deque
+from datetime import date, datetime, time as ura, timedelta, timezone
+from itertools import accumulate
+
+import model
+from services import izracunaj_iban_kontrolni_stev
 from werkzeug.security import generate_password_hash
 
-conn = sqlite3.connect("Banka.db")
-cur = conn.cursor()
-bank = BankService()
+# Prve stranke so vedno te (uporabniška imena so v README.md)
+DEMO_STRANKE = [
+    ("Marko", "Novak", "Dunajska cesta 15", "1990-05-15"),
+    ("Ana", "Kovač", "Slovenska cesta 28", "1985-08-22"),
+    ("Peter", "Horvat", "Trubarjeva ulica 5", "1992-11-30"),
+    ("Maja", "Krajnc", "Beethovnova ulica 12", "1988-03-17"),
+    ("Luka", "Zupančič", "Njegoševa cesta 8", "1995-07-08"),
+]
+
+IMENA = [
+    "Marko", "Ana", "Peter", "Maja", "Luka", "Nina", "Jan", "Eva", "Matej", "Sara",
+    "Žiga", "Nika", "Gregor", "Urška", "Tomaž", "Špela", "Rok", "Katja", "Miha", "Petra",
+]
+PRIIMKI = [
+    "Novak", "Kovač", "Horvat", "Krajnc", "Zupančič", "Potočnik", "Mlakar", "Kos", "Vidmar", "Golob",
+    "Turk", "Kralj", "Božič", "Korošec", "Zupan", "Bizjak", "Hribar", "Kavčič", "Rozman", "Kastelic",
+]
+ULICE = [
+    "Dunajska cesta", "Slovenska cesta", "Trubarjeva ulica", "Beethovnova ulica", "Njegoševa cesta",
+    "Celovška cesta", "Tržaška cesta", "Prešernova ulica", "Glavni trg", "Partizanska cesta",
+]
+
+PAKETI = [
+    (1, "Basic", 0, 50000, 10000),
+    (2, "Premium", 599, 500000, 100000),
+    (3, "Business", 1999, None, 1000000),
+]
+DNEVNI_LIMITI = {id_paket: dnevni_limit for id_paket, _, _, _, dnevni_limit in PAKETI}
+
+
+# Vrednosti tipa transakcije v delih, ki jih pripravijo delavci
+POLOG, DVIG, NAKAZILO = 0, 1, 2
 
 
 def clear_data():
-    """Pobriši vse obstoječe podatke"""
+    """Pobriši vse obstoječe podatke (tabele se ustvarijo na novo)"""
     print("Brisanje starih podatkov...")
-    cur.execute("DELETE FROM transakcija")
-    cur.execute("DELETE FROM racun")
-    cur.execute("DELETE FROM paket")
-    cur.execute("DELETE FROM uporabnik")
-    cur.execute("DELETE FROM stranka")
-    conn.commit()
-
-
-def generate_stranke():
-    """Generiraj demo stranke"""
-    print("Generiranje strank...")
-
-    stranke = [
-        ("Marko", "Novak", "Dunajska cesta 15", "1990-05-15"),
-        ("Ana", "Kovač", "Slovenska cesta 28", "1985-08-22"),
-        ("Peter", "Horvat", "Trubarjeva ulica 5", "1992-11-30"),
-        ("Maja", "Krajnc", "Beethovnova ulica 12", "1988-03-17"),
-        ("Luka", "Zupančič", "Njegoševa cesta 8", "1995-07-08"),
-    ]
-
-    for ime, priimek, naslov, datum in stranke:
-        cur.execute(
-            """
-            INSERT INTO stranka (ime, priimek, naslov, datum_rojstva)
-            VALUES (?, ?, ?, ?)
-        """,
-            (ime, priimek, naslov, datum),
-        )
-
-    conn.commit()
-    print(f"Ustvarjenih {len(stranke)} strank")
-
-
-def generate_racuni():
-    """Generiraj demo račune"""
-    print("Generiranje računov...")
-
-    # Pridobi ID-je strank
-    cur.execute("SELECT id_stranke FROM stranka")
-    stranke_ids = [row[0] for row in cur.fetchall()]
+    with model.get_connection():
+        with model.Kazalec() as cur:
+            model.pobrisi_tabele(cur=cur)
+            model.ustvari_tabele(cur=cur)
+
+
+def uporabnisko_ime(ime, priimek, pripona=""):
+    """Uporabniško ime: ime.priimek (male črke, brez šumnikov)"""
+    uporabnisko_ime = f"{ime.lower()}.{priimek.lower()}{pripona}"
+    for src, dst in [("č", "c"), ("š", "s"), ("ž", "z"), ("ć", "c"), ("đ", "d")]:
+        uporabnisko_ime = uporabnisko_ime.replace(src, dst)
+    return uporabnisko_ime
+
+
+def _rng(seed, *del_podatkov):
+    """Generator naključnih števil za en del podatkov (odvisen le od semena in dela)"""
+    return random.Random(":".join(map(str, (seed, *del_podatkov))))
+
+
+def _iban_preslikava(seed):
+    """Koeficienta bijekcije i -> (a * i + b) mod 10^15 za BBAN-e računov"""
+    rng = _rng(seed, "iban")
+    a = rng.randrange(1, 10**15, 2)
+    while a % 5 == 0:
+        a = rng.randrange(1, 10**15, 2)
+    return a, rng.randrange(10**15)
+
+
+@functools.lru_cache(maxsize=1)
+def _promet(seed, n, nagib):
+    """Računi, urejeni po prometnosti (naključno), in kumulativne Zipfove uteži"""
+    vrstni_red = list(range(n))
+    _rng(seed, "promet").shuffle(vrstni_red)
+    return vrstni_red, list(accumulate(1 / (rang + 1) ** nagib for rang in range(n)))
+
+
+def pripravi_stranke(seed, prva, zadnja, na_stranko):
+    """
+    Vrstice strank, uporabnikov in računov za stranke od `prva` do `zadnja`.
+
+    Račun j stranke i dobi BBAN iz bijekcije mesta (i - 1) * M + j, kjer je M
+    največje število računov stranke, zato so IBAN-i različni brez preverjanja
+    v bazi in neodvisni od ostalih delov.
+    """
+    rng = _rng(seed, "stranke", prva)
+    a, b = _iban_preslikava(seed)
+    najvec = int(na_stranko) + 1
+    # Vsi uporabniki imajo isto geslo, zato je dovolj ena zgoščena vrednost na del
+    geslo_hash = generate_password_hash("geslo123")
+    stranke, uporabniki, racuni = [], [], []
+    for id_stranke in range(prva, zadnja + 1):
+        if id_stranke <= len(DEMO_STRANKE):
+            stranka = (id_stranke, *DEMO_STRANKE[id_stranke - 1])
+            pripona = ""
+        else:
+            rojstvo = date(1940, 1, 1) + timedelta(days=rng.randrange(60 * 365))
+            stranka = (
+                id_stranke,
+                rng.choice(IMENA),
+                rng.choice(PRIIMKI),
+                f"{rng.choice(ULICE)} {rng.randint(1, 200)}",
+                rojstvo.isoformat(),
+            )
+            pripona = f".{id_stranke}"
+        stranke.append(stranka)
+        uporabniki.append((uporabnisko_ime(stranka[1], stranka[2], pripona), geslo_hash, id_stranke, "stranka"))
+        # Povprečno `na_stranko` računov, vsaj eden
+        stevilo = int(na_stranko) + (rng.random() < na_stranko - int(na_stranko))
+        for j in range(stevilo):
+            bban = f"{(a * ((id_stranke - 1) * najvec + j) + b) % 10**15:015d}"
+            racuni.append((f"SI{izracunaj_iban_kontrolni_stev(bban)}{bban}", id_stranke, rng.choice(PAKETI)[0]))
+    return stranke, uporabniki, racuni
+
+
+def pripravi_transakcije(seed, prva, velikost, stevilo, n, nagib, zacetek_s, sekund):
+    """
+    Naključni del transakcij od `prva` naprej: računa, želeni tip, zneska in čas.
+
+    Računa sta izbrana po Zipfovi porazdelitvi z eksponentom `nagib`, i-ta
+    transakcija pa je v i-tem od `stevilo` enakih intervalov obdobja. Stanja
+    so odvisna od vseh prejšnjih transakcij, zato vrstice iz tega sestavi
+    zapisovalec (`generate_transakcije`).
+    """
+    rng = _rng(seed, "transakcije", prva)
+    nakljucno = rng.random
+    vrstni_red, utezi = _promet(seed, n, nagib)
+    posiljatelji = rng.choices(vrstni_red, cum_weights=utezi, k=velikost)
+    prejemniki = rng.choices(vrstni_red, cum_weights=utezi, k=velikost)
+    tipi, zneski, pologi, casi = bytearray(), [], [], []
+    zadnja_sekunda, cas = None, None
+    for i in range(velikost):
+        sekunda = int(zacetek_s + (prva + i + nakljucno()) * sekund / stevilo)
+        if sekunda != zadnja_sekunda:
+            zadnja_sekunda = sekunda
+            cas = datetime.fromtimestamp(sekunda, timezone.utc).strftime("%Y-%m-%d %H:%M:%S")
+        casi.append(cas)
+        izbira = nakljucno()
+        if izbira < 0.3:
+            tipi.append(POLOG)
+            zneski.append(0)
+        elif izbira < 0.5 or n < 2:
+            tipi.append(DVIG)
+            zneski.append(2000 + int(nakljucno() * 8000))
+        else:
+            tipi.append(NAKAZILO)
+            zneski.append(1000 + int(nakljucno() * 19000))
+            if prejemniki[i] == posiljatelji[i]:
+                prejemniki[i] = (posiljatelji[i] + 1) % n
+        # Če je račun prazen, postane transakcija polog s tem zneskom
+        pologi.append(5000 + int(nakljucno() * 45000))
+    return (
+        array("q", posiljatelji),
+        array("q", prejemniki),
+        bytes(tipi),
+        array("q", zneski),
+        array("q", pologi),
+        casi,
+    )
 
-    # Najprej ustvari pakete
-    paketi_tipi = [
-        (1, "Basic", 0, 50000, 10000),
-        (2, "Premium", 599, 500000, 100000),
-        (3, "Business", 1999, None, 1000000),
-    ]
 
-    # Preveri, če paketi že obstajajo
-    cur.execute("SELECT COUNT(*) FROM paket")
-    if cur.fetchone()[0] == 0:
+def po_vrsti(bazen, funkcija, naloge, naprej):
+    """
+    Rezultati `funkcija(*naloga)` za vse naloge v vrstnem redu nalog.
+
+    Z bazenom procesov se naloge izvajajo vzporedno, vendar je naenkrat
+    oddanih največ `naprej` nalog, da pripravljeni deli ne zasedejo preveč
+    pomnilnika, če je zapisovalec počasnejši. Brez bazena se izvajajo sproti.
+    """
+    if bazen is None:
+        for naloga in naloge:
+            yield funkcija(*naloga)
+        return
+    oddane = deque()
+    for naloga in naloge:
+        oddane.append(bazen.apply_async(funkcija, naloga))
+        if len(oddane) >= naprej:
+            yield oddane.popleft().get()
+    while oddane:
+        yield oddane.popleft().get()
+
+
+class Faza:
+    """Merjenje časa ene faze: vrstice, skupni čas in čas čakanja na delavce"""
+
+    def __init__(self, ime):
+        self.ime = ime
+        self.vrstic = 0
+        self.cakanje = 0.0
+        self.zacetek = self.zadnje = time.monotonic()
+        self.sekund = None
+
+    def deli(self, deli):
+        """Vrne dele iz `deli` in meri, koliko časa je zapisovalec čakal nanje"""
+        for del_podatkov in deli:
+            self.cakanje += time.monotonic() - self.zadnje
+            yield del_podatkov
+            self.zadnje = time.monotonic()
+
+    def konec(self, vrstic=None):
+        if vrstic is not None:
+            self.vrstic = vrstic
+        self.sekund = time.monotonic() - self.zacetek
+        return self
+
+
+def generate_stranke(bazen, seed, stevilo, na_stranko, paket, naprej):
+    """Generiraj pakete, stranke, njihove uporabnike in račune ter admin uporabnika; vrne IBAN-e in dnevne limite računov"""
+    print("Generiranje strank, uporabnikov in računov...")
+    faza = Faza("stranke, uporabniki, računi")
+    with model.PisalniKazalec() as cur:
         cur.executemany(
             """
             INSERT INTO paket (id_paket, tip, cena, osnovni_limit, dnevni_limit)
             VALUES (?, ?, ?, ?, ?)
         """,
-            paketi_tipi,
+            PAKETI,
         )
-        conn.commit()
-        print(f"Ustvarjeni {len(paketi_tipi)} paketi")
-
-    racuni = []
-    for idx, id_stranke in enumerate(stranke_ids, start=1):
-        # Vsaka stranka dobi 1-2 računa
-        num_accounts = random.randint(1, 2)
-        for i in range(num_accounts):
-            iban = bank.generate_iban()
-            if not iban:
-                raise RuntimeError("Ni bilo mogoče generirati veljavnega IBAN-a.")
-            stanje = random.randint(10000, 500000)  # 100-5000 EUR v centih
-            id_paket = random.choice([1, 2, 3])
-            racuni.append((iban, id_stranke, id_paket, stanje))
-
-    cur.executemany(
-        """
-        INSERT INTO racun (IBAN, id_lastnik, id_paket, stanje)
-        VALUES (?, ?, ?, ?)
-    """,
-        racuni,
-    )
-
-    conn.commit()
-    print(f"Ustvarjenih {len(racuni)} računov")
-
-
-def generate_uporabniki():
-    """Generiraj demo uporabnike (avtentikacija)"""
-    print("Generiranje uporabnikov...")
-
-    # Pridobi stranke
-    cur.execute("SELECT id_stranke, ime, priimek FROM stranka")
-    stranke = cur.fetchall()
-
-    uporabniki = []
-    for id_stranke, ime, priimek in stranke:
-        # Uporabniško ime: ime.priimek (male črke, brez šumnikov)
-        uporabnisko_ime = f"{ime.lower()}.{priimek.lower()}"
-        # Zamenjaj šumnike
-        for src, dst in [("č", "c"), ("š", "s"), ("ž", "z"), ("ć", "c"), ("đ", "d")]:
-            uporabnisko_ime = uporabnisko_ime.replace(src, dst)
-
-        geslo_hash = generate_password_hash("geslo123")
-        uporabniki.append((uporabnisko_ime, geslo_hash, id_stranke, "stranka"))
 
-    # Admin uporabnik
-    admin_hash = generate_password_hash("admin123")
-    uporabniki.append(("admin", admin_hash, None, "admin"))
-
-    cur.executemany(
-        """
-        INSERT INTO uporabnik (uporabnisko_ime, geslo_hash, id_stranke, vloga)
-        VALUES (?, ?, ?, ?)
-    """,
-        uporabniki,
-    )
+    naloge = ((seed, prva, min(prva + paket - 1, stevilo), na_stranko) for prva in range(1, stevilo + 1, paket))
+    ibani, limiti = [], []
+    for stranke, uporabniki, racuni in faza.deli(po_vrsti(bazen, pripravi_stranke, naloge, naprej)):
+        with model.PisalniKazalec() as cur:
+            cur.executemany(
+                """
+                INSERT INTO stranka (id_stranke, ime, priimek, naslov, datum_rojstva)
+                VALUES (?, ?, ?, ?, ?)
+            """,
+                stranke,
+            )
+            cur.executemany(
+                """
+                INSERT INTO uporabnik (uporabnisko_ime, geslo_hash, id_stranke, vloga)
+                VALUES (?, ?, ?, ?)
+            """,
+                uporabniki,
+            )
+            cur.executemany(
+                "INSERT INTO racun (IBAN, id_lastnik, id_paket, stanje) VALUES (?, ?, ?, 0)",
+                racuni,
+            )
+        ibani.extend(iban for iban, _, _ in racuni)
+        limiti.extend(DNEVNI_LIMITI[id_paket] for _, _, id_paket in racuni)
+        faza.vrstic += len(stranke) + len(uporabniki) + len(racuni)
+    with model.PisalniKazalec() as cur:
+        cur.execute(
+            """
+            INSERT INTO uporabnik (uporabnisko_ime, geslo_hash, id_stranke, vloga)
+            VALUES ('admin', ?, NULL, 'admin')
+        """,
+            (generate_password_hash("admin123"),),
+        )
+    print(f"Ustvarjenih {stevilo} strank, {stevilo + 1} uporabnikov in {len(ibani)} računov")
+    return ibani, limiti, faza.konec()
 
-    conn.commit()
-    print(f"Ustvarjenih {len(uporabniki)} uporabnikov")
 
+def generate_transakcije(bazen, seed, ibani, limiti, stevilo, zacetek, konec, nagib, paket, naprej):
+    """
+    Generiraj transakcije od najstarejše naprej in na koncu zapiši stanja računov.
 
-def generate_transakcije():
-    """Generiraj demo transakcije"""
+    Delavci pripravijo naključne dele (`pripravi_transakcije`), zapisovalec
+    pa jih po vrsti dopolni s stanji: ta se vodijo sproti, zato ima vsaka
+    transakcija stanje pošiljatelja oz. prejemnika po njej, dvig ali
+    nakazilo pa nikoli ne preseže stanja niti dnevnega limita paketa (tako
+    kot v `dnevna_poraba` ločeno za nakazila in dvige po dnevih UTC). Če
+    na računu ni dovolj sredstev ali limita, postane polog.
+    """
     print("Generiranje transakcij...")
-
-    # Pridobi vse IBAN-e
-    cur.execute("SELECT IBAN FROM racun")
-    ibans = [row[0] for row in cur.fetchall()]
-
-    transakcije = []
-
-    # Pologi
-    for _ in range(10):
-        iban = random.choice(ibans)
-        znesek = random.randint(5000, 50000)
-        cas = (datetime.now() - timedelta(days=random.randint(1, 30))).strftime(
-            "%Y-%m-%d %H:%M:%S"
-        )
-        transakcije.append((None, iban, "polog", znesek, cas))
-
-    # Dvigi
-    for _ in range(8):
-        iban = random.choice(ibans)
-        znesek = random.randint(2000, 10000)
-        cas = (datetime.now() - timedelta(days=random.randint(1, 30))).strftime(
-            "%Y-%m-%d %H:%M:%S"
-        )
-        transakcije.append((iban, None, "dvig", znesek, cas))
-
-    # Nakazila
-    for _ in range(15):
-        from_iban = random.choice(ibans)
-        to_iban = random.choice([i for i in ibans if i != from_iban])
-        znesek = random.randint(1000, 20000)
-        cas = (datetime.now() - timedelta(days=random.randint(1, 30))).strftime(
-            "%Y-%m-%d %H:%M:%S"
-        )
-        transakcije.append((from_iban, to_iban, "nakazilo", znesek, cas))
-
-    cur.executemany(
-        """
-        INSERT INTO transakcija (posilja, prejema, tip, znesek, cas)
-        VALUES (?, ?, ?, ?, ?)
-    """,
-        transakcije,
+    faza = Faza("transakcije")
+    n = len(ibani)
+    stanja = [0] * n
+    # (račun, tip) -> [dan, porabljeno]; transakcije so po času, zato zadošča zadnji dan
+    poraba = {}
+    zacetek_s = zacetek.timestamp()
+    sekund = (konec - zacetek).total_seconds()
+    naloge = (
+        (seed, prva, min(paket, stevilo - prva), stevilo, n, nagib, zacetek_s, sekund)
+        for prva in range(0, stevilo, paket)
     )
-
-    # Posodobi stanja računov glede na transakcije
-    cur.execute("""
-        UPDATE racun SET stanje = (
-            SELECT 
-                r.stanje +
-                COALESCE((SELECT SUM(znesek) FROM transakcija WHERE prejema = r.IBAN AND tip IN ('polog', 'nakazilo', 'obresti')), 0) -
-                COALESCE((SELECT SUM(znesek) FROM transakcija WHERE posilja = r.IBAN AND tip IN ('dvig', 'nakazilo')), 0)
-            FROM racun r
-            WHERE r.IBAN = racun.IBAN
-        )
-    """)
-
-    conn.commit()
-    print(f"Ustvarjenih {len(transakcije)} transakcij")
+    for posiljatelji, prejemniki, tipi, zneski, pologi, casi in faza.deli(
+        po_vrsti(bazen, pripravi_transakcije, naloge, naprej)
+    ):
+        vrstice = []
+        for p, r, tip, znesek, polog, cas in zip(posiljatelji, prejemniki, tipi, zneski, pologi, casi):
+            na_voljo = 0
+            if tip != POLOG:
+                porabljeno = poraba.get((p, tip))
+                if porabljeno is None or porabljeno[0] != cas[:10]:
+                    porabljeno = poraba[p, tip] = [cas[:10], 0]
+                na_voljo = min(stanja[p], limiti[p] - porabljeno[1])
+            if na_voljo >= 100:
+                znesek = min(znesek, na_voljo)
+                porabljeno[1] += znesek
+                stanja[p] -= znesek
+                if tip == DVIG:
+                    vrstice.append((ibani[p], None, "dvig", znesek, cas, stanja[p], None))
+                else:
+                    stanja[r] += znesek
+                    vrstice.append((ibani[p], ibani[r], "nakazilo", znesek, cas, stanja[p], stanja[r]))
+            else:
+                stanja[p] += polog
+                vrstice.append((None, ibani[p], "polog", polog, cas, None, stanja[p]))
+        with model.PisalniKazalec() as cur:
+            cur.executemany(
+                """
+                INSERT INTO transakcija (posilja, prejema, tip, znesek, cas, stanje_posilja, stanje_prejema)
+                VALUES (?, ?, ?, ?, ?, ?, ?)
+            """,
+                vrstice,
+            )
+        faza.vrstic += len(vrstice)
+        hitrost = faza.vrstic / max(time.monotonic() - faza.zacetek, 1e-9)
+        print(f"\r   {faza.vrstic}/{stevilo} ({hitrost:.0f}/s)", end="", file=sys.stderr, flush=True)
+    print(file=sys.stderr)
+    faza.konec()
+    print(f"Ustvarjenih {stevilo} transakcij")
+
+    stanja_racunov = Faza("stanja računov")
+    for prvi in range(0, n, paket):
+        with model.PisalniKazalec() as cur:
+            cur.executemany(
+                "UPDATE racun SET stanje = ? WHERE IBAN = ?",
+                ((stanje, iban) for stanje, iban in zip(stanja[prvi : prvi + paket], ibani[prvi : prvi + paket]) if stanje),
+            )
+    return faza, stanja_racunov.konec(n)
+
+
+def izpisi_porocilo(faze):
+    """Izpiši hitrost posameznih faz generiranja"""
+    print(f"\n{'Faza':<32} {'vrstic':>10} {'čas [s]':>8} {'vrstic/s':>10} {'čakanje':>8}")
+    for faza in faze:
+        hitrost = faza.vrstic / faza.sekund if faza.sekund else 0
+        cakanje = faza.cakanje / faza.sekund if faza.sekund else 0
+        print(f"{faza.ime:<32} {faza.vrstic:>10} {faza.sekund:>8.1f} {hitrost:>10.0f} {cakanje:>8.0%}")
+    print("(čakanje: delež časa, ko je zapisovalec čakal na pripravo podatkov)")
 
 
 def show_summary():
@@ -204,65 +367,114 @@ def show_summary():
     print("\nPovzetek generiranih podatkov:")
     print("=" * 50)
 
-    cur.execute("SELECT COUNT(*) FROM stranka")
-    print(f"   Stranke: {cur.fetchone()[0]}")
-
-    cur.execute("SELECT COUNT(*) FROM uporabnik")
-    print(f"   Uporabniki: {cur.fetchone()[0]}")
-
-    cur.execute("SELECT COUNT(*) FROM racun")
-    print(f"   Računi: {cur.fetchone()[0]}")
-
-    cur.execute("SELECT COUNT(*) FROM paket")
-    print(f"   Paketi: {cur.fetchone()[0]}")
-
-    cur.execute("SELECT COUNT(*) FROM transakcija")
-    print(f"   Transakcije: {cur.fetchone()[0]}")
-
-    cur.execute("SELECT SUM(stanje) FROM racun")
-    total = cur.fetchone()[0] or 0
-    print(f"   Skupno stanje: {total / 100:.2f} EUR")
-
-    print("=" * 50)
-
-    # Primer uporabnikov za prijavo
-    cur.execute("""
-        SELECT u.uporabnisko_ime, u.vloga, s.ime, s.priimek
-        FROM uporabnik u
-        LEFT JOIN stranka s ON u.id_stranke = s.id_stranke
-    """)
-    print("\nUporabniki za prijavo (geslo je 'geslo123' oz. 'admin123' za admina):")
-    for uporabnisko_ime, vloga, ime, priimek in cur.fetchall():
-        if vloga == "admin":
-            print(f"{uporabnisko_ime} (Administrator) — geslo: admin123")
-        else:
-            print(f"  {uporabnisko_ime} ({ime} {priimek}) — geslo: geslo123")
+    with model.Kazalec() as cur:
+        cur.execute("SELECT COUNT(*) FROM stranka")
+        print(f"   Stranke: {cur.fetchone()[0]}")
+
+        cur.execute("SELECT COUNT(*) FROM uporabnik")
+        print(f"   Uporabniki: {cur.fetchone()[0]}")
+
+        cur.execute("SELECT COUNT(*) FROM racun")
+        print(f"   Računi: {cur.fetchone()[0]}")
+
+        cur.execute("SELECT COUNT(*) FROM paket")
+        print(f"   Paketi: {cur.fetchone()[0]}")
+
+        cur.execute("SELECT COUNT(*) FROM transakcija")
+        print(f"   Transakcije: {cur.fetchone()[0]}")
+
+        cur.execute("SELECT SUM(stanje) FROM racun")
+        total = cur.fetchone()[0] or 0
+        print(f"   Skupno stanje: {total / 100:.2f} EUR")
+
+        print("=" * 50)
+
+        # Primer uporabnikov za prijavo
+        cur.execute("""
+            SELECT u.uporabnisko_ime, u.vloga, s.ime, s.priimek
+            FROM uporabnik u
+            LEFT JOIN stranka s ON u.id_stranke = s.id_stranke
+            WHERE u.vloga = 'admin' OR u.id_stranke <= ?
+            ORDER BY u.id_uporabnika
+        """, (len(DEMO_STRANKE),))
+        print("\nUporabniki za prijavo (geslo je 'geslo123' oz. 'admin123' za admina):")
+        for uporabnisko_ime, vloga, ime, priimek in cur.fetchall():
+            if vloga == "admin":
+                print(f"  {uporabnisko_ime} (Administrator) — geslo: admin123")
+            else:
+                print(f"  {uporabnisko_ime} ({ime} {priimek}) — geslo: geslo123")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Generiranje demo podatkov za Slovenia Bank")
+    parser.add_argument("--customers", type=int, default=len(DEMO_STRANKE), help="število strank")
+    parser.add_argument(
+        "--accounts-per-customer", type=float, default=1.5, help="povprečno število računov stranke"
+    )
+    parser.add_argument("--transactions", type=int, default=33, help="število transakcij")
+    parser.add_argument("--seed", type=int, default=42, help="seme generatorja naključnih števil")
+    parser.add_argument("--days", type=int, default=30, help="transakcije so iz zadnjih DAYS dni")
+    parser.add_argument(
+        "--end-date",
+        type=date.fromisoformat,
+        default=datetime.now(timezone.utc).date(),
+        metavar="LLLL-MM-DD",
+        help="konec obdobja transakcij (polnoč UTC; privzeto danes)",
+    )
+    parser.add_argument(
+        "--skew", type=float, default=1.0, help="eksponent Zipfove porazdelitve prometa po računih"
+    )
+    parser.add_argument("--batch", type=int, default=50000, help="vrstic v eni pisalni transakciji")
+    parser.add_argument(
+        "--workers",
+        type=int,
+        default=os.cpu_count() or 1,
+        help="število procesov, ki pripravljajo podatke (1: vse v enem procesu)",
+    )
+    args = parser.parse_args()
+    if args.customers < 1 or args.accounts_per_customer < 1 or args.transactions < 0:
+        parser.error("potrebna je vsaj ena stranka z vsaj enim računom")
+    if args.workers < 1 or args.batch < 1:
+        parser.error("--workers in --batch morata biti pozitivna")
 
+    konec = datetime.combine(args.end_date, ura(), timezone.utc)
+    zacetek = konec - timedelta(days=args.days)
+    # Delavci naj bodo največ dva dela pred zapisovalcem
+    naprej = 2 * args.workers
 
-if __name__ == "__main__":
     print("Generiranje demo podatkov za Slovenia Bank\n")
-
+    zacetni_cas = time.monotonic()
+    # Procesi se ustvarijo pred prvo povezavo na bazo in je ne uporabljajo
+    bazen = multiprocessing.Pool(args.workers) if args.workers > 1 else None
     try:
-        # Pobriši stare podatke
         clear_data()
+        with model.paketni_profil():
+            # Indeksi, sprožilci in izpeljane tabele se zgradijo enkrat na koncu
+            with model.PisalniKazalec() as cur:
+                odlozeno = model.odlozi_objekte(
+                    cur, model.Stranka, model.Uporabnik, model.Racun, model.Transakcija
+                )
+            ibani, limiti, faza_strank = generate_stranke(
+                bazen, args.seed, args.customers, args.accounts_per_customer, args.batch, naprej
+            )
+            faze = [faza_strank]
+            faze += generate_transakcije(
+                bazen, args.seed, ibani, limiti, args.transactions, zacetek, konec, args.skew, args.batch, naprej
+            )
+            print("Gradnja indeksov in izpeljanih tabel...")
+            faza = Faza("indeksi in izpeljane tabele")
+            with model.PisalniKazalec() as cur:
+                model.obnovi_odlozeno(cur, odlozeno)
+            faze.append(faza.konec(len(ibani) + args.transactions))
+    finally:
+        if bazen is not None:
+            bazen.terminate()
 
-        # Generiraj nove podatke
-        generate_stranke()
-        generate_racuni()
-        generate_uporabniki()
-        generate_transakcije()
-
-        # Prikaži povzetek
-        show_summary()
-
-        print("\nDemo podatki uspešno generirani!")
-        print("\nZdaj lahko zaženete: python app.py")
+    show_summary()
+    izpisi_porocilo(faze)
+    print(f"\nDemo podatki uspešno generirani v {time.monotonic() - zacetni_cas:.1f} s (procesov: {args.workers})!")
+    print("\nZdaj lahko zaženete: python app.py")
 
-    except Exception as e:
-        print(f"\nNapaka: {e}")
-        import traceback
 
-        traceback.print_exc()
-        conn.rollback()
-    finally:
-        conn.close()
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,177 @@
+"""
+Oblikovanje izpiska računa v CSV in PDF
+
+Obe funkciji sta generatorja: transakcije jemljeta sproti iz izpiska, ki ga
+vrne `BankService.get_izpisek`, in sproti vračata dele datoteke. Tako lahko
+Flask ali ukazna vrstica izpisek pošilja med branjem iz baze, poraba
+pomnilnika pa ni odvisna od števila transakcij.
+"""
+
+import codecs
+import csv
+import unicodedata
+
+STOLPCI = ("Datum", "Tip", "Protiračun", "Opis", "Znesek", "Stanje")
+
+
+def _evri(centi):
+    """
+    Znesek v centih kot niz v evrih (npr. -12.50).
+    """
+    return f"{centi / 100:.2f}"
+
+
+def _vrstice(izpisek):
+    """
+    Vrstice izpiska (brez glave): začetno stanje, transakcije in končno stanje.
+    """
+    iban = izpisek["iban"]
+    stanje = izpisek["zacetno_stanje"]
+    yield (izpisek["od"], "", "", "Začetno stanje", "", _evri(stanje))
+    for tr in izpisek["transakcije"]:
+        if tr["posilja"] == iban:
+            znesek, protiracun = -tr["znesek"], tr["prejema"]
+        else:
+            znesek, protiracun = tr["znesek"], tr["posilja"]
+        stanje = tr["stanje_po"]
+        yield (tr["cas"], tr["tip"], protiracun or "", tr["opis"] or "", _evri(znesek), _evri(stanje))
+    yield (izpisek["do"], "", "", "Končno stanje", "", _evri(stanje))
+
+
+class _Odmev:
+    """
+    "Datoteka", ki zapisani niz le vrne - csv.writer tako vrne vrstico.
+    """
+
+    def write(self, niz):
+        return niz
+
+
+def v_csv(izpisek):
+    """
+    Izpisek kot CSV (niz za vsako vrstico).
+    """
+    pisalec = csv.writer(_Odmev())
+    yield pisalec.writerow(STOLPCI)
+    for vrstica in _vrstice(izpisek):
+        yield pisalec.writerow(vrstica)
+
+
+# Preprost PDF: stran A4, pisava Courier (ena od standardnih pisav, ki je ni
+# treba vdelati), po VRSTIC_NA_STRAN vrstic na stran. V pomnilniku je vedno
+# le trenutna stran in odmiki že zapisanih objektov.
+SIRINA, VISINA = 595, 842
+VRSTIC_NA_STRAN = 75
+VELIKOST_PISAVE = 7
+SIRINE_STOLPCEV = (19, 8, 19, 30, 12, 13)
+
+
+def _brez_diakritike(napaka):
+    """
+    Obravnava napak kodiranja: znaki, ki jih WinAnsi nima (npr. č, ć), se
+    zapišejo brez diakritičnega znamenja.
+    """
+    nadomestek = "".join(
+        unicodedata.normalize("NFKD", znak).encode("ascii", "ignore").decode() or "?"
+        for znak in napaka.object[napaka.start : napaka.end]
+    )
+    return nadomestek, napaka.end
+
+
+codecs.register_error("izpisek_brez_diakritike", _brez_diakritike)
+
+
+def _pdf_niz(besedilo):
+    """
+    Besedilo kot niz PDF v kodiranju WinAnsi.
+    """
+    kodirano = besedilo.encode("cp1252", "izpisek_brez_diakritike")
+    return b"(" + kodirano.replace(b"\\", b"\\\\").replace(b"(", b"\\(").replace(b")", b"\\)") + b")"
+
+
+def _pdf_vrstica(vrstica):
+    """
+    Vrstica tabele s stolpci, poravnanimi na SIRINE_STOLPCEV znakov.
+    """
+    deli = []
+    for i, (vrednost, sirina) in enumerate(zip(vrstica, SIRINE_STOLPCEV)):
+        vrednost = str(vrednost)[: sirina - 1]
+        deli.append(vrednost.rjust(sirina - 1) if i >= 4 else vrednost.ljust(sirina - 1))
+    return " ".join(deli)
+
+
+def v_pdf(izpisek):
+    """
+    Izpisek kot PDF (bajti, stran za stranjo).
+
+    Objekti strani se zapisujejo sproti; katalog, seznam strani in tabela
+    odmikov (xref) se zapišejo na koncu, ko je število strani znano.
+    """
+    odmiki = {}
+    zapisano = 0
+    strani = []
+    # 1: katalog, 2: seznam strani, 3: pisava; strani so od 4 naprej
+    naslednji = 4
+
+    def objekt(stevilka, vsebina):
+        nonlocal zapisano
+        odmiki[stevilka] = zapisano
+        podatki = b"%d 0 obj\n" % stevilka + vsebina + b"\nendobj\n"
+        zapisano += len(podatki)
+        return podatki
+
+    def stran(vrstice):
+        nonlocal naslednji
+        stevilka_strani, stevilka_vsebine = naslednji, naslednji + 1
+        naslednji += 2
+        strani.append(stevilka_strani)
+        tok = [b"BT /F1 %d Tf %d TL 36 %d Td" % (VELIKOST_PISAVE, VELIKOST_PISAVE + 3, VISINA - 40)]
+        tok += [_pdf_niz(vrstica) + b" '" for vrstica in vrstice]
+        tok.append(b"ET")
+        tok = b"\n".join(tok)
+        return objekt(
+            stevilka_strani,
+            b"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 %d %d] "
+            b"/Resources << /Font << /F1 3 0 R >> >> /Contents %d 0 R >>"
+            % (SIRINA, VISINA, stevilka_vsebine),
+        ) + objekt(
+            stevilka_vsebine,
+            b"<< /Length %d >>\nstream\n" % len(tok) + tok + b"\nendstream",
+        )
+
+    glava = b"%PDF-1.4\n%\xe2\xe3\xcf\xd3\n"
+    zapisano = len(glava)
+    yield glava
+    yield objekt(
+        3, b"<< /Type /Font /Subtype /Type1 /BaseFont /Courier /Encoding /WinAnsiEncoding >>"
+    )
+
+    naslov = [
+        f"Izpisek računa {izpisek['iban']} za obdobje {izpisek['od']} - {izpisek['do']}",
+        "",
+        _pdf_vrstica(STOLPCI),
+        "-" * (sum(SIRINE_STOLPCEV) - 1),
+    ]
+    vrstice = list(naslov)
+    for vrstica in _vrstice(izpisek):
+        vrstice.append(_pdf_vrstica(vrstica))
+        if len(vrstice) == VRSTIC_NA_STRAN:
+            yield stran(vrstice)
+            vrstice = []
+    if vrstice:
+        yield stran(vrstice)
+
+    yield objekt(
+        2,
+        b"<< /Type /Pages /Kids [%s] /Count %d >>"
+        % (b" ".join(b"%d 0 R" % s for s in strani), len(strani)),
+    )
+    yield objekt(1, b"<< /Type /Catalog /Pages 2 0 R >>")
+    xref = zapisano
+    vnosi = [b"0000000000 65535 f \n"]
+    vnosi += [b"%010d 00000 n \n" % odmiki[i] for i in range(1, naslednji)]
+    yield (
+        b"xref\n0 %d\n" % naslednji
+        + b"".join(vnosi)
+        + b"trailer\n<< /Size %d /Root 1 0 R >>\nstartxref\n%d\n%%%%EOF\n" % (naslednji, xref)
+    )
@@ -0,0 +1,359 @@
+"""
+Obremenitveni test spletne aplikacije prek HTTP
+
+Skripta v začasni mapi z `generate_demo_data.py` ustvari banko, v ločenem
+procesu zažene `app.py` in nato iz več niti ("uporabnikov") hkrati pošilja
+zahteve. Vsak uporabnik se prijavi kot ena od generiranih strank (`/login`)
+in do konca testa izvaja naključne akcije po utežeh mešanice: nadzorna
+plošča, podrobnosti računa, nakazilo, polog, dvig in poizvedovanje po
+stanju (`/api/account/<iban>/balance`).
+
+Za vsako pot izpiše zahteve na sekundo, p50/p95/p99, zavrnjene zahteve
+(4xx) in napake (5xx, preusmeritve, prekinjene povezave), na koncu pa še,
+kolikokrat je strežnik zapisal "database is locked".
+
+Uporaba:
+    python load_test.py [--uporabniki 50] [--trajanje 30] [--procesi 0]
+                        [--mesanica dashboard=25 account=15 balance=30 transfer=10 deposit=10 withdraw=10]
+"""
+
+import argparse
+import http.client
+import json
+import os
+import random
+import socket
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from collections import Counter, defaultdict
+
+import model
+from benchmark import percentil
+
+MAPA = os.path.dirname(os.path.abspath(__file__))
+
+# Strežnik: app.py brez razhroščevalnika in samodejnega ponovnega nalaganja
+STREZNIK = """
+import sys
+sys.path.insert(0, sys.argv[1])
+import app
+procesi = int(sys.argv[3])
+app.app.run(host="127.0.0.1", port=int(sys.argv[2]), threaded=not procesi, processes=procesi or 1)
+"""
+
+# Akcija -> (ime poti v poročilu, funkcija(uporabnik, rng, ibani_vseh))
+AKCIJE = {
+    "dashboard": ("GET /dashboard", lambda u, rng, vsi: u.zahtevaj("GET", "/dashboard")),
+    "account": (
+        "GET /account/<iban>",
+        lambda u, rng, vsi: u.zahtevaj("GET", f"/account/{rng.choice(u.ibani)}"),
+    ),
+    "balance": (
+        "GET /api/account/<iban>/balance",
+        lambda u, rng, vsi: u.zahtevaj("GET", f"/api/account/{rng.choice(u.ibani)}/balance"),
+    ),
+    "transfer": (
+        "POST /transfer",
+        lambda u, rng, vsi: u.zahtevaj(
+            "POST",
+            "/transfer",
+            {"from_iban": rng.choice(u.ibani), "to_iban": rng.choice(vsi), "amount": "1.00"},
+        ),
+    ),
+    "deposit": (
+        "POST /deposit",
+        lambda u, rng, vsi: u.zahtevaj("POST", "/deposit", {"iban": rng.choice(u.ibani), "amount": "10.00"}),
+    ),
+    "withdraw": (
+        "POST /withdraw",
+        lambda u, rng, vsi: u.zahtevaj("POST", "/withdraw", {"iban": rng.choice(u.ibani), "amount": "1.00"}),
+    ),
+}
+PRIVZETA_MESANICA = {
+    "dashboard": 25,
+    "account": 15,
+    "balance": 30,
+    "transfer": 10,
+    "deposit": 10,
+    "withdraw": 10,
+}
+PRIJAVA = "POST /login"
+
+
+class Uporabnik:
+    """Ena stranka s svojo povezavo HTTP in piškotkom seje."""
+
+    def __init__(self, vrata, uporabnisko_ime, ibani):
+        self.povezava = http.client.HTTPConnection("127.0.0.1", vrata, timeout=60)
+        self.uporabnisko_ime = uporabnisko_ime
+        self.ibani = ibani
+        self.piskotek = None
+
+    def zahtevaj(self, metoda, pot, podatki=None):
+        """Pošlje zahtevo (podatke kot JSON) in vrne statusno kodo odgovora."""
+        glave = {}
+        telo = None
+        if podatki is not None:
+            telo = json.dumps(podatki)
+            glave["Content-Type"] = "application/json"
+        if self.piskotek:
+            glave["Cookie"] = self.piskotek
+        try:
+            self.povezava.request(metoda, pot, body=telo, headers=glave)
+            odgovor = self.povezava.getresponse()
+            odgovor.read()
+        except (OSError, http.client.HTTPException):
+            # Naslednja zahteva odpre novo povezavo
+            self.povezava.close()
+            return None
+        piskotek = odgovor.getheader("Set-Cookie")
+        if piskotek:
+            self.piskotek = piskotek.split(";", 1)[0]
+        return odgovor.status
+
+    def prijava(self):
+        return self.zahtevaj("POST", "/login", {"uporabnisko_ime": self.uporabnisko_ime, "geslo": "geslo123"})
+
+
+class Meritve:
+    """Časi in statusne kode po poteh (vsaka nit ima svoje, na koncu se združijo)."""
+
+    def __init__(self):
+        self.casi = defaultdict(list)
+        self.statusi = defaultdict(Counter)
+
+    def zabelezi(self, pot, zacetek, status):
+        self.casi[pot].append((time.perf_counter() - zacetek) * 1000)
+        self.statusi[pot][status] += 1
+
+    def dodaj(self, druge):
+        for pot, casi in druge.casi.items():
+            self.casi[pot].extend(casi)
+        for pot, statusi in druge.statusi.items():
+            self.statusi[pot].update(statusi)
+
+
+def prosta_vrata():
+    """Vrne številko vrat, ki so trenutno prosta."""
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def pripravi_banko(args):
+    """Ustvari banko v začasni mapi in vrne [(uporabniško ime, [IBAN-i])] za uporabnike testa."""
+    os.chdir(tempfile.mkdtemp(prefix="banka_load_"))
+    print(f"Ustvarjanje banke: {args.stranke} strank, {args.transakcije} transakcij (seme {args.seme})...")
+    subprocess.run(
+        [
+            sys.executable,
+            os.path.join(MAPA, "generate_demo_data.py"),
+            "--customers", str(args.stranke),
+            "--transactions", str(args.transakcije),
+            "--seed", str(args.seme),
+        ],
+        check=True,
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.DEVNULL,
+    )
+    rng = random.Random(args.seme)
+    stranke = rng.sample(range(1, args.stranke + 1), min(args.uporabniki, args.stranke))
+    uporabniki = []
+    with model.Kazalec() as cur:
+        for id_stranke in stranke:
+            cur.execute("SELECT uporabnisko_ime FROM uporabnik WHERE id_stranke = ?", (id_stranke,))
+            (uporabnisko_ime,) = cur.fetchone()
+            cur.execute("SELECT IBAN FROM racun WHERE id_lastnik = ? ORDER BY IBAN", (id_stranke,))
+            uporabniki.append((uporabnisko_ime, [row[0] for row in cur.fetchall()]))
+    return uporabniki
+
+
+def zazeni_streznik(vrata, procesi):
+    """
+    Zažene app.py v novem procesu in počaka, da odgovarja. Vrne proces in
+    števec vrstic "database is locked" v njegovem izpisu (sproti ga bere nit).
+    """
+    streznik = subprocess.Popen(
+        [sys.executable, "-c", STREZNIK, MAPA, str(vrata), str(procesi)],
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.PIPE,
+        text=True,
+        errors="replace",
+    )
+    zaklenjeno = Counter()
+
+    def beri_izpis():
+        for vrstica in streznik.stderr:
+            if "database is locked" in vrstica:
+                zaklenjeno["database is locked"] += 1
+
+    threading.Thread(target=beri_izpis, daemon=True).start()
+
+    rok = time.monotonic() + 30
+    while True:
+        try:
+            povezava = http.client.HTTPConnection("127.0.0.1", vrata, timeout=5)
+            povezava.request("GET", "/login")
+            povezava.getresponse().read()
+            povezava.close()
+            return streznik, zaklenjeno
+        except OSError:
+            if streznik.poll() is not None or time.monotonic() > rok:
+                streznik.kill()
+                raise RuntimeError("Strežnik se ni zagnal")
+            time.sleep(0.1)
+
+
+def delavec(uporabnik, vsi_ibani, mesanica, seme, zacni, casovnik, premor, meritve):
+    """
+    Prijavi uporabnika, počaka na začetek testa (`zacni`) in do konca testa
+    (`casovnik["konec"]`) izvaja naključne akcije iz mešanice.
+    """
+    rng = random.Random(seme)
+    akcije = list(mesanica)
+    utezi = list(mesanica.values())
+    zacetek = time.perf_counter()
+    status = uporabnik.prijava()
+    meritve.zabelezi(PRIJAVA, zacetek, status)
+    zacni.wait()
+    if status != 200:
+        return
+    while time.perf_counter() < casovnik["konec"]:
+        pot, akcija = AKCIJE[rng.choices(akcije, utezi)[0]]
+        zacetek = time.perf_counter()
+        meritve.zabelezi(pot, zacetek, akcija(uporabnik, rng, vsi_ibani))
+        if premor:
+            time.sleep(rng.expovariate(1000 / premor))
+
+
+def izpisi_porocilo(meritve, trajanje, zaklenjeno):
+    """Izpiše zahteve/s, percentile, zavrnjene zahteve in napake po poteh."""
+    print(
+        f"\n{'Pot':<32} {'zahtev':>7} {'zaht./s':>8} {'p50':>10} {'p95':>10} {'p99':>10} "
+        f"{'4xx':>6} {'napake':>7}"
+    )
+    print("-" * 98)
+    skupaj = Counter()
+    poti = [PRIJAVA] + sorted(pot for pot in meritve.casi if pot != PRIJAVA)
+    for pot in poti:
+        casi = meritve.casi.get(pot)
+        if not casi:
+            continue
+        statusi = meritve.statusi[pot]
+        zavrnjenih = sum(n for s, n in statusi.items() if s is not None and 400 <= s < 500)
+        napak = sum(n for s, n in statusi.items() if s is None or s >= 500 or 300 <= s < 400)
+        # Prijave so pred začetkom testa, zato nimajo zahtev na sekundo
+        na_sekundo = f"{len(casi) / trajanje:>8.1f}" if pot != PRIJAVA else f"{'':>8}"
+        print(
+            f"{pot:<32} {len(casi):>7} {na_sekundo} {percentil(casi, 50):>7.1f} ms "
+            f"{percentil(casi, 95):>7.1f} ms {percentil(casi, 99):>7.1f} ms {zavrnjenih:>6} {napak:>7}"
+        )
+        if pot != PRIJAVA:
+            skupaj.update(zahtev=len(casi), zavrnjenih=zavrnjenih, napak=napak)
+
+    if skupaj["zahtev"]:
+        print("-" * 98)
+        print(
+            f"Skupaj: {skupaj['zahtev']} zahtev v {trajanje:.1f} s ({skupaj['zahtev'] / trajanje:.1f} zahtev/s), "
+            f"zavrnjenih {skupaj['zavrnjenih'] / skupaj['zahtev']:.1%}, napak {skupaj['napak'] / skupaj['zahtev']:.1%}"
+        )
+    print(f"\"database is locked\" v izpisu strežnika: {zaklenjeno['database is locked']}")
+
+
+def mesanica_iz_argumentov(parser, vnosi):
+    """Pretvori vnose oblike akcija=utež v slovar mešanice."""
+    mesanica = {}
+    for vnos in vnosi:
+        akcija, _, utez = vnos.partition("=")
+        if akcija not in AKCIJE or not utez.isdigit():
+            parser.error(f"neveljaven vnos mešanice: {vnos} (akcije: {', '.join(AKCIJE)})")
+        if int(utez):
+            mesanica[akcija] = int(utez)
+    if not mesanica:
+        parser.error("mešanica mora imeti vsaj eno akcijo s pozitivno utežjo")
+    return mesanica
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Obremenitveni test spletne aplikacije")
+    parser.add_argument("--uporabniki", type=int, default=50, help="sočasnih uporabnikov (niti)")
+    parser.add_argument("--trajanje", type=float, default=30.0, help="trajanje testa v sekundah")
+    parser.add_argument("--premor", type=float, default=0.0, help="povprečni premislek med akcijami (ms)")
+    parser.add_argument(
+        "--mesanica",
+        nargs="+",
+        default=[f"{akcija}={utez}" for akcija, utez in PRIVZETA_MESANICA.items()],
+        metavar="AKCIJA=UTEŽ",
+        help=f"uteži akcij ({', '.join(AKCIJE)})",
+    )
+    parser.add_argument(
+        "--procesi",
+        type=int,
+        default=0,
+        help="procesov strežnika (0: en proces z nitjo na zahtevo)",
+    )
+    parser.add_argument("--stranke", type=int, default=10000)
+    parser.add_argument("--transakcije", type=int, default=100000)
+    parser.add_argument("--seme", type=int, default=42)
+    args = parser.parse_args()
+    mesanica = mesanica_iz_argumentov(parser, args.mesanica)
+
+    uporabniki = pripravi_banko(args)
+    vsi_ibani = [iban for _, ibani in uporabniki for iban in ibani]
+    vrata = prosta_vrata()
+    streznik, zaklenjeno = zazeni_streznik(vrata, args.procesi)
+    print(
+        f"Strežnik na vratih {vrata}, procesov: {args.procesi or 1}"
+        f"{'' if args.procesi else ' (nit na zahtevo)'}, uporabnikov: {len(uporabniki)}, "
+        f"trajanje: {args.trajanje:.0f} s"
+    )
+    print("Mešanica: " + ", ".join(f"{akcija} {utez}" for akcija, utez in mesanica.items()))
+
+    try:
+        # Vse niti se najprej prijavijo, test začne teči, ko so prijavljene vse
+        casovnik = {}
+
+        def zacetek_testa():
+            casovnik["zacetek"] = time.perf_counter()
+            casovnik["konec"] = casovnik["zacetek"] + args.trajanje
+
+        zacni = threading.Barrier(len(uporabniki) + 1, action=zacetek_testa)
+        meritve = [Meritve() for _ in uporabniki]
+        niti = [
+            threading.Thread(
+                target=delavec,
+                args=(
+                    Uporabnik(vrata, uporabnisko_ime, ibani),
+                    vsi_ibani,
+                    mesanica,
+                    args.seme + i,
+                    zacni,
+                    casovnik,
+                    args.premor,
+                    meritve[i],
+                ),
+            )
+            for i, (uporabnisko_ime, ibani) in enumerate(uporabniki)
+        ]
+        for nit in niti:
+            nit.start()
+        zacni.wait()
+        for nit in niti:
+            nit.join()
+        trajanje = time.perf_counter() - casovnik["zacetek"]
+    finally:
+        streznik.terminate()
+        streznik.wait()
+
+    skupaj = Meritve()
+    for m in meritve:
+        skupaj.dodaj(m)
+    izpisi_porocilo(skupaj, trajanje, zaklenjeno)
+    return 1 if sum(skupaj.statusi[PRIJAVA].values()) != skupaj.statusi[PRIJAVA][200] else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -6,28 +6,336 @@
 #
 
 import csv
+import itertools
+import json
+import logging
+import os
+import re
 import sqlite3 as dbapi
-from dataclasses import dataclass, field
+from contextlib import contextmanager
+from dataclasses import dataclass, field, fields
 import threading
+import time
 
 
-# Thread-local storage za database povezave
+# Povezava, ki si jo je trenutna nit izposodila iz bazena
 _thread_local = threading.local()
 
 
+# Profili nastavitev (PRAGMA), ki se uporabijo ob odprtju vsake povezave.
+# Profil izberete s spremenljivko okolja BANKA_PROFIL ali z nastavi_profil().
+PROFILI = {
+    # Spletna aplikacija in CLI: bralci ne blokirajo pisalcev, kratke transakcije
+    "web": {
+        "journal_mode": "WAL",
+        "synchronous": "NORMAL",
+        "busy_timeout": 5000,
+        "cache_size": -20000,  # 20 MB
+        "mmap_size": 268435456,  # 256 MB
+        "temp_store": "MEMORY",
+    },
+    # Paketni uvoz: hitrost pred trajnostjo, dolge čakalne dobe na ključavnico
+    "batch": {
+        "journal_mode": "WAL",
+        "synchronous": "OFF",
+        "busy_timeout": 60000,
+        "cache_size": -200000,  # 200 MB
+        "mmap_size": 1073741824,  # 1 GB
+        "temp_store": "MEMORY",
+    },
+    # Poročila: samo branje, velik predpomnilnik za agregacije
+    "reporting": {
+        "query_only": "ON",
+        "busy_timeout": 10000,
+        "cache_size": -100000,  # 100 MB
+        "mmap_size": 1073741824,  # 1 GB
+        "temp_store": "MEMORY",
+    },
+}
+
+_profil = None
+
+# Arhiv starih transakcij: ločena datoteka, ki je na vsaki povezavi priključena
+# kot shema "arhiv" (ATTACH DATABASE), glej TransakcijaArhiv.
+ARHIV = os.environ.get("BANKA_ARHIV", "Banka_arhiv.db")
+
+
+def nastavi_profil(ime):
+    """
+    Izberi profil nastavitev za povezave, odprte od zdaj naprej.
+    """
+    global _profil
+    if ime not in PROFILI:
+        raise ValueError(f"Neznan profil '{ime}', na voljo: {', '.join(PROFILI)}")
+    _profil = ime
+
+
+def izbran_profil():
+    """
+    Vrne ime profila: nastavljenega z nastavi_profil(), iz BANKA_PROFIL ali 'web'.
+    """
+    return _profil or os.environ.get("BANKA_PROFIL", "web")
+
+
+def uporabi_profil(conn, ime=None):
+    """
+    Na povezavi izvede PRAGMA ukaze izbranega profila.
+    """
+    ime = ime or izbran_profil()
+    if ime not in PROFILI:
+        raise ValueError(f"Neznan profil '{ime}', na voljo: {', '.join(PROFILI)}")
+    conn.execute("PRAGMA foreign_keys = ON;")
+    for pragma, vrednost in PROFILI[ime].items():
+        conn.execute(f"PRAGMA {pragma} = {vrednost};")
+
+
+@contextmanager
+def paketni_profil():
+    """
+    Med blokom `with` nit uporablja svojo povezavo s profilom 'batch' (za
+    vnos velike količine podatkov); ob izstopu se povezavi vrne njen profil.
+    """
+    with get_connection() as conn:
+        uporabi_profil(conn, "batch")
+        try:
+            yield conn
+        finally:
+            uporabi_profil(conn, conn.kljuc[2])
+
+
+def odlozi_objekte(cur, *tabele, sprozilci=True):
+    """
+    Odstrani sekundarne indekse (in sprožilce, če `sprozilci`) tabel
+    `tabele` (razredov), da vnos velike količine vrstic ne posodablja
+    vsakega sproti.
+
+    Vrne slovar ime tabele -> ukazi CREATE, ki jih sprejme `obnovi_odlozeno`.
+    """
+    vrste = ("index", "trigger") if sprozilci else ("index",)
+    odlozeno = {}
+    for t in tabele:
+        cur.execute(
+            f"""
+            SELECT type, name, sql FROM sqlite_master
+            WHERE tbl_name = ? AND type IN ({', '.join('?' * len(vrste))}) AND sql IS NOT NULL
+        """,
+            (t.IME, *vrste),
+        )
+        objekti = cur.fetchall()
+        for vrsta, ime, _ in objekti:
+            cur.execute(f"DROP {vrsta.upper()} {ime};")
+        odlozeno[t.IME] = [ukaz for _, _, ukaz in objekti]
+    return odlozeno
+
+
+def obnovi_odlozeno(cur, odlozeno):
+    """
+    Ponovno ustvari indekse in sprožilce, ki jih je odstranil `odlozi_objekte`
+    (obstoječe preskoči), in enkrat izračuna vse tabele, ki se izračunajo iz
+    tabel z odstranjenimi sprožilci (glej `VIRI`).
+    """
+    brez_sprozilcev = set()
+    for tabela, ukazi in odlozeno.items():
+        for ukaz in ukazi:
+            # sqlite_master hrani ukaz brez IF NOT EXISTS
+            cur.execute(re.sub(r"^CREATE (UNIQUE )?(INDEX|TRIGGER) ", r"CREATE \1\2 IF NOT EXISTS ", ukaz))
+            if ukaz.startswith("CREATE TRIGGER"):
+                brez_sprozilcev.add(tabela)
+    for t in Tabela.TABELE:
+        if set(t.VIRI) & brez_sprozilcev:
+            t.obnovi(cur)
+
+
+class BazenIzcrpan(Exception):
+    """
+    V bazenu ni bilo proste povezave v dovoljenem času čakanja.
+    """
+
+
+class PovezavaIzBazena(dbapi.Connection):
+    """
+    Povezava, ki pripada bazenu.
+
+    `with povezava:` potrdi oz. razveljavi transakcijo (kot običajna povezava)
+    in nato povezavo vrne v bazen, če je nit ne uporablja več.
+    """
+
+    def __enter__(self):
+        _zadrzi()
+        return super().__enter__()
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        try:
+            return super().__exit__(exc_type, exc_value, traceback)
+        finally:
+            _spusti()
+
+
+class Bazen:
+    """
+    Omejen bazen povezav do baze.
+
+    Nova povezava se nastavi po izbranem profilu. Proste povezave se ponovno
+    uporabijo (zadnja vrnjena najprej, da ostane njen predpomnilnik topel),
+    tiste, ki so bile dlje časa proste, pa se pred uporabo preverijo.
+    """
+
+    def __init__(self, najvec=10, cas_cakanja=30.0, preveri_po=30.0):
+        self.najvec = najvec
+        self.cas_cakanja = cas_cakanja
+        self.preveri_po = preveri_po
+        self._pogoj = threading.Condition()
+        self._proste = []
+        self._odprte = 0
+        self._v_uporabi = 0
+        self._cakanja = 0
+        self._cas_cakanja_skupaj = 0.0
+        self._potekla = 0
+
+    def _kljuc(self):
+        """
+        Povezava je uporabna le za isti datoteki baze in arhiva ter isti profil.
+        """
+        return os.path.abspath("Banka.db"), os.path.abspath(ARHIV), izbran_profil()
+
+    def _odpri(self, kljuc):
+        """
+        Odpri novo povezavo, priključi arhiv in jo nastavi po profilu.
+        """
+        conn = dbapi.connect(kljuc[0], check_same_thread=False, factory=PovezavaIzBazena)
+        # Pred PRAGMA ukazi, da npr. journal_mode velja tudi za arhiv
+        conn.execute("ATTACH DATABASE ? AS arhiv;", (kljuc[1],))
+        uporabi_profil(conn, kljuc[2])
+        conn.kljuc = kljuc
+        conn.zadnja_uporaba = time.monotonic()
+        return conn
+
+    def izposodi(self):
+        """
+        Vrni prosto povezavo ali odpri novo; če je bazen poln, počakaj.
+        """
+        kljuc = self._kljuc()
+        conn = None
+        zacetek = None
+        with self._pogoj:
+            while True:
+                while self._proste and conn is None:
+                    kandidat = self._proste.pop()
+                    if kandidat.kljuc == kljuc:
+                        conn = kandidat
+                    else:
+                        kandidat.close()
+                        self._odprte -= 1
+                if conn is not None or self._odprte < self.najvec:
+                    break
+                if zacetek is None:
+                    zacetek = time.monotonic()
+                    self._cakanja += 1
+                preostanek = self.cas_cakanja - (time.monotonic() - zacetek)
+                if preostanek <= 0:
+                    self._potekla += 1
+                    self._cas_cakanja_skupaj += time.monotonic() - zacetek
+                    raise BazenIzcrpan(
+                        f"Ni proste povezave v {self.cas_cakanja:g} s (največ {self.najvec})"
+                    )
+                self._pogoj.wait(preostanek)
+            if zacetek is not None:
+                self._cas_cakanja_skupaj += time.monotonic() - zacetek
+            if conn is None:
+                self._odprte += 1
+            self._v_uporabi += 1
+
+        try:
+            if conn is None:
+                conn = self._odpri(kljuc)
+            elif time.monotonic() - conn.zadnja_uporaba > self.preveri_po:
+                try:
+                    conn.execute("SELECT 1").fetchone()
+                except dbapi.Error:
+                    conn.close()
+                    conn = self._odpri(kljuc)
+        except Exception:
+            with self._pogoj:
+                self._odprte -= 1
+                self._v_uporabi -= 1
+                self._pogoj.notify()
+            raise
+        return conn
+
+    def vrni(self, conn):
+        """
+        Vrni povezavo v bazen (nedokončana transakcija se razveljavi).
+        """
+        if conn.in_transaction:
+            # Nepotrjen zapis je skoraj vedno napaka klicatelja (manjka
+            # `with get_connection()` ali PisalniKazalec), zato ga zabeležimo
+            logging.warning("Povezava vrnjena v bazen z nepotrjeno transakcijo - spremembe so razveljavljene")
+            conn.rollback()
+        conn.zadnja_uporaba = time.monotonic()
+        with self._pogoj:
+            self._proste.append(conn)
+            self._v_uporabi -= 1
+            self._pogoj.notify()
+
+    def statistika(self):
+        """
+        Vrni stanje bazena za spremljanje.
+        """
+        with self._pogoj:
+            return {
+                "najvec": self.najvec,
+                "odprte": self._odprte,
+                "v_uporabi": self._v_uporabi,
+                "proste": len(self._proste),
+                "cakanja": self._cakanja,
+                "cas_cakanja_ms": round(self._cas_cakanja_skupaj * 1000, 3),
+                "potekla": self._potekla,
+            }
+
+
+_bazen = Bazen(
+    najvec=int(os.environ.get("BANKA_POOL_SIZE", "10")),
+    cas_cakanja=float(os.environ.get("BANKA_POOL_TIMEOUT", "30")),
+)
+
+
+def statistika_bazena():
+    """
+    Vrne statistiko bazena povezav (v uporabi, čakanja, čas čakanja, ...).
+    """
+    return _bazen.statistika()
+
+
 def get_connection():
     """
-    Dobi thread-safe database povezavo.
-    Vsak thread ima svojo povezavo.
+    Dobi povezavo, ki si jo je trenutna nit izposodila iz bazena.
+
+    Če je nit še nima, si jo izposodi. Povezava se vrne v bazen, ko se konča
+    zadnji `with get_connection()`, `Kazalec` ali `PisalniKazalec` v niti.
     """
-    if not hasattr(_thread_local, "conn"):
-        _thread_local.conn = dbapi.connect("Banka.db", check_same_thread=False)
-        _thread_local.conn.execute("PRAGMA foreign_keys = ON;")
+    if getattr(_thread_local, "conn", None) is None:
+        _thread_local.conn = _bazen.izposodi()
+        _thread_local.globina = 0
     return _thread_local.conn
 
 
-# Backwards compatibility - za obstojočo kodo
-# conn = get_connection()
+def _zadrzi():
+    """
+    Označi, da nit uporablja svojo povezavo (konteksti se lahko gnezdijo).
+    """
+    get_connection()
+    _thread_local.globina += 1
+
+
+def _spusti():
+    """
+    Ob izstopu iz zadnjega konteksta niti vrni povezavo v bazen.
+    """
+    _thread_local.globina -= 1
+    if _thread_local.globina == 0:
+        conn = _thread_local.conn
+        _thread_local.conn = None
+        _bazen.vrni(conn)
 
 
 class Kazalec:
@@ -42,6 +350,7 @@ class Kazalec:
         Če kazalec ni podan, odpre novega, sicer uporabi podanega.
         """
         if cur is None:
+            _zadrzi()
             self.cur = get_connection().cursor()
             self.close = True
         else:
@@ -60,10 +369,48 @@ class Kazalec:
         """
         Izstop iz konteksta.
 
-        Če je bil ustvarjen nov kazalec, se ta zapre.
+        Če je bil ustvarjen nov kazalec, se ta zapre in povezava vrne v bazen.
         """
         if self.close:
             self.cur.close()
+            _spusti()
+
+
+class PisalniKazalec:
+    """
+    Upravitelj konteksta za kratko pisalno transakcijo.
+
+    Ob vstopu izvede `BEGIN IMMEDIATE`, zato pisalno ključavnico dobi takoj
+    (ali počaka do časovne omejitve povezave) in je kasneje ne nadgrajuje.
+    Ob izstopu potrdi spremembe oz. jih ob izjemi razveljavi.
+    """
+
+    def __enter__(self):
+        """
+        Začni pisalno transakcijo in vrni kazalec.
+        """
+        _zadrzi()
+        self.conn = get_connection()
+        try:
+            self.cur = self.conn.cursor()
+            self.cur.execute("BEGIN IMMEDIATE")
+        except Exception:
+            _spusti()
+            raise
+        return self.cur
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        """
+        Potrdi ali razveljavi transakcijo, zapri kazalec in vrni povezavo.
+        """
+        try:
+            if exc_type is None:
+                self.conn.commit()
+            else:
+                self.conn.rollback()
+        finally:
+            self.cur.close()
+            _spusti()
 
 
 class Tabela:
@@ -72,6 +419,10 @@ class Tabela:
     """
 
     TABELE = []
+    INDEKSI = {}
+    SHEMA = "main"
+    # tabele, iz katerih se izračuna (sprožilci jo vzdržujejo ob njihovih spremembah)
+    VIRI = ()
 
     def __init_subclass__(cls, /, **kwargs):
         """
@@ -82,6 +433,28 @@ class Tabela:
         super().__init_subclass__(**kwargs)
         cls.TABELE.append(cls)
 
+    @classmethod
+    def ustvari_indekse(cls, cur=None):
+        """
+        Ustvari sekundarne indekse tabele.
+
+        Indeksi so našteti v slovarju `INDEKSI` (ime -> stolpci).
+        """
+        with Kazalec(cur) as cur:
+            for ime, stolpci in cls.INDEKSI.items():
+                cur.execute(
+                    f"CREATE INDEX IF NOT EXISTS {cls.SHEMA}.{ime} ON {cls.IME} ({stolpci});"
+                )
+
+    @classmethod
+    def pobrisi_indekse(cls, cur=None):
+        """
+        Pobriši sekundarne indekse tabele.
+        """
+        with Kazalec(cur) as cur:
+            for ime in cls.INDEKSI:
+                cur.execute(f"DROP INDEX IF EXISTS {cls.SHEMA}.{ime};")
+
     @classmethod
     def uvozi_podatke(cls, cur=None):
         """
@@ -102,6 +475,114 @@ class Tabela:
             for vrstica in rd:
                 yield dict(zip(stolpci, vrstica))
 
+    @classmethod
+    def nalozi(cls, pot=None, paket=50000, napredek=None):
+        """
+        Naloži CSV datoteko `pot` (privzeto vir tabele v mapi podatki) v
+        tabelo, po `paket` vrstic v eni pisalni transakciji.
+
+        Prva vrstica datoteke našteje stolpce; prazne vrednosti in 'None'
+        se zapišejo kot NULL. Povezava med nalaganjem uporablja profil
+        'batch'. Sekundarni indeksi tabele se pred nalaganjem odstranijo in
+        na koncu (tudi ob napaki) ponovno ustvarijo; sprožilci ostanejo, zato
+        so dnevna poraba, statistika in iskalni indeks ves čas usklajeni.
+
+        Napredek se hrani v tabeli "uvoz" v isti transakciji kot vsak paket,
+        zato se prekinjeno nalaganje ob ponovnem klicu nadaljuje za zadnjim
+        potrjenim paketom (tudi če je bila datoteka vmes popravljena); že
+        končana datoteka se ne naloži ponovno. Končana datoteka se prepozna po
+        poti, velikosti in času spremembe - nov izvoz z istim imenom se naloži
+        znova. Med nalaganjem naj v tabelo ne piše nihče drug.
+
+        Po vsakem paketu pokliče `napredek(vrstic)` s številom vseh že
+        naloženih vrstic datoteke. Vrne število vrstic, naloženih v tem klicu.
+        """
+        pot = os.path.abspath(pot or f"podatki/{cls.VIR}")
+        with open(pot, newline="", encoding="utf-8") as f:
+            podatki = os.fstat(f.fileno())
+            velikost, spremenjeno = podatki.st_size, podatki.st_mtime_ns
+            rd = csv.reader(f)
+            stolpci = next(rd, None)
+            if not stolpci:
+                raise ValueError(f"Datoteka {pot} je prazna")
+            neznani = set(stolpci) - {polje.name for polje in fields(cls)}
+            if neznani:
+                raise ValueError(f"Tabela '{cls.IME}' nima stolpcev {', '.join(sorted(neznani))}")
+            sql = (
+                f"INSERT INTO {cls.IME} ({', '.join(stolpci)}) "
+                f"VALUES ({', '.join('?' * len(stolpci))});"
+            )
+
+            with paketni_profil():
+                with PisalniKazalec() as cur:
+                    cur.execute(
+                        "SELECT tabela, vrstic, odlozeno, koncano, velikost, spremenjeno "
+                        "FROM uvoz WHERE vir = ?",
+                        (pot,),
+                    )
+                    row = cur.fetchone()
+                    # Končana datoteka z drugo velikostjo ali časom spremembe je nov
+                    # izvoz z istim imenom; nedokončana (npr. popravljena po napaki)
+                    # se nadaljuje za potrjenimi vrsticami
+                    if row is not None and row[3] and row[4:] != (velikost, spremenjeno):
+                        row = None
+                    if row is None:
+                        row = (cls.IME, 0, "{}", 0)
+                        cur.execute(
+                            """
+                            INSERT OR REPLACE INTO uvoz
+                                (vir, tabela, vrstic, odlozeno, koncano, velikost, spremenjeno)
+                            VALUES (?, ?, ?, ?, ?, ?, ?)
+                        """,
+                            (pot, *row, velikost, spremenjeno),
+                        )
+                    tabela, vrstic, odlozeno, koncano = row[:4]
+                    if tabela != cls.IME:
+                        raise ValueError(f"Datoteka {pot} se nalaga v tabelo '{tabela}'")
+                    if koncano:
+                        return 0
+                    cur.execute(
+                        "UPDATE uvoz SET velikost = ?, spremenjeno = ? WHERE vir = ?",
+                        (velikost, spremenjeno, pot),
+                    )
+                    # Indeksi, ki jih prekinjen prejšnji zagon ni obnovil, so že odstranjeni
+                    odlozeno = json.loads(odlozeno)
+                    for ime, ukazi in odlozi_objekte(cur, cls, sprozilci=False).items():
+                        odlozeno[ime] = odlozeno.get(ime, []) + ukazi
+                    cur.execute(
+                        "UPDATE uvoz SET odlozeno = ? WHERE vir = ?", (json.dumps(odlozeno), pot)
+                    )
+
+                zacetek = vrstic
+                koncano = False
+                try:
+                    for _ in itertools.islice(rd, vrstic):
+                        pass
+                    while True:
+                        vrstice = [
+                            [None if v in ("", "None") else v for v in vrstica]
+                            for vrstica in itertools.islice(rd, paket)
+                        ]
+                        if not vrstice:
+                            break
+                        with PisalniKazalec() as cur:
+                            cur.executemany(sql, vrstice)
+                            cur.execute(
+                                "UPDATE uvoz SET vrstic = vrstic + ? WHERE vir = ?", (len(vrstice), pot)
+                            )
+                        vrstic += len(vrstice)
+                        if napredek:
+                            napredek(vrstic)
+                    koncano = True
+                finally:
+                    with PisalniKazalec() as cur:
+                        obnovi_odlozeno(cur, odlozeno)
+                        cur.execute(
+                            "UPDATE uvoz SET odlozeno = '{}', koncano = ? WHERE vir = ?",
+                            (int(koncano), pot),
+                        )
+                return vrstic - zacetek
+
 
 class Entiteta:
     """
@@ -155,6 +636,10 @@ class Stranka(Tabela, Entiteta):
 
     VIR = "stranka.csv"
     IME = "stranka"
+    INDEKSI = {
+        # admin seznam strank po abecedi (stran za stranjo)
+        "stranka_priimek_ime": "priimek, ime",
+    }
 
     @classmethod
     def ustvari_tabelo(cls, cur=None):
@@ -171,6 +656,7 @@ class Stranka(Tabela, Entiteta):
                         datum_rojstva   DATE     NOT NULL  
                 );
             """)
+            cls.ustvari_indekse(cur)
 
     @classmethod
     def pobrisi_tabelo(cls, cur=None):
@@ -197,6 +683,88 @@ class Stranka(Tabela, Entiteta):
             )
 
 
+@dataclass
+class StrankaIskanje(Tabela, Entiteta):
+    """
+    Razred za iskalni indeks strank (FTS5 nad imenom, priimkom in naslovom).
+
+    Tabela hrani le indeks, vsebino bere iz tabele "stranka"; sprožilci
+    ga posodabljajo ob vsaki spremembi strank.
+    """
+
+    ime: str = field(default=None)
+    priimek: str = field(default=None)
+    naslov: str = field(default=None)
+
+    IME = "stranka_fts"
+    VIRI = ("stranka",)
+
+    @classmethod
+    def ustvari_tabelo(cls, cur=None):
+        """
+        Ustvari iskalni indeks "stranka_fts" in sprožilce, ki ga posodabljajo.
+        Ob prvem ustvarjanju v indeks doda obstoječe stranke.
+        """
+        with Kazalec(cur) as cur:
+            cur.execute("SELECT 1 FROM sqlite_master WHERE name = 'stranka_fts';")
+            obstaja = cur.fetchone() is not None
+            # remove_diacritics: 'kovac' najde tudi 'Kovač'; prefix: hitro iskanje med tipkanjem
+            cur.execute("""
+                CREATE VIRTUAL TABLE IF NOT EXISTS stranka_fts USING fts5(
+                    ime, priimek, naslov,
+                    content = 'stranka',
+                    content_rowid = 'id_stranke',
+                    tokenize = 'unicode61 remove_diacritics 2',
+                    prefix = '2 3'
+                );
+            """)
+            cur.execute("""
+                CREATE TRIGGER IF NOT EXISTS stranka_fts_insert AFTER INSERT ON stranka
+                BEGIN
+                    INSERT INTO stranka_fts (rowid, ime, priimek, naslov)
+                    VALUES (NEW.id_stranke, NEW.ime, NEW.priimek, NEW.naslov);
+                END;
+            """)
+            cur.execute("""
+                CREATE TRIGGER IF NOT EXISTS stranka_fts_delete AFTER DELETE ON stranka
+                BEGIN
+                    INSERT INTO stranka_fts (stranka_fts, rowid, ime, priimek, naslov)
+                    VALUES ('delete', OLD.id_stranke, OLD.ime, OLD.priimek, OLD.naslov);
+                END;
+            """)
+            cur.execute("""
+                CREATE TRIGGER IF NOT EXISTS stranka_fts_update AFTER UPDATE ON stranka
+                BEGIN
+                    INSERT INTO stranka_fts (stranka_fts, rowid, ime, priimek, naslov)
+                    VALUES ('delete', OLD.id_stranke, OLD.ime, OLD.priimek, OLD.naslov);
+                    INSERT INTO stranka_fts (rowid, ime, priimek, naslov)
+                    VALUES (NEW.id_stranke, NEW.ime, NEW.priimek, NEW.naslov);
+                END;
+            """)
+            if not obstaja:
+                cls.obnovi(cur)
+
+    @classmethod
+    def pobrisi_tabelo(cls, cur=None):
+        """
+        Pobriši iskalni indeks "stranka_fts".
+        """
+        with Kazalec(cur) as cur:
+            for dogodek in ("insert", "delete", "update"):
+                cur.execute(f"DROP TRIGGER IF EXISTS stranka_fts_{dogodek};")
+            cur.execute("""
+                DROP TABLE IF EXISTS stranka_fts;
+            """)
+
+    @classmethod
+    def obnovi(cls, cur=None):
+        """
+        Ponovno zgradi iskalni indeks iz tabele "stranka".
+        """
+        with Kazalec(cur) as cur:
+            cur.execute("INSERT INTO stranka_fts (stranka_fts) VALUES ('rebuild');")
+
+
 @dataclass
 class Uporabnik(Tabela, Entiteta):
     """
@@ -211,6 +779,9 @@ class Uporabnik(Tabela, Entiteta):
     vloga: str = field(default=None)
 
     IME = "uporabnik"
+    INDEKSI = {
+        "uporabnik_id_stranke": "id_stranke",
+    }
 
     @classmethod
     def ustvari_tabelo(cls, cur=None):
@@ -227,6 +798,7 @@ class Uporabnik(Tabela, Entiteta):
                     vloga            TEXT     NOT NULL DEFAULT 'stranka' CHECK(vloga IN ('stranka', 'admin'))
                 );
             """)
+            cls.ustvari_indekse(cur)
 
     @classmethod
     def pobrisi_tabelo(cls, cur=None):
@@ -300,6 +872,67 @@ class Paket(Tabela, Entiteta):
             )
 
 
+@dataclass
+class Verzija(Tabela, Entiteta):
+    """
+    Razred za števce verzij podatkov, ki jih procesi hranijo v predpomnilniku.
+
+    Vrstico 'paket' povečajo sprožilci ob vsaki spremembi tabele "paket",
+    zato lahko vsak proces poceni preveri, ali je njegov predpomnilnik še veljaven.
+    """
+
+    ime: str = field(default=None)
+    vrednost: int = field(default=None)
+
+    IME = "verzija"
+    VIRI = ("paket",)
+
+    @classmethod
+    def ustvari_tabelo(cls, cur=None):
+        """
+        Ustvari tabelo "verzija" in sprožilce za tabelo "paket".
+        """
+        with Kazalec(cur) as cur:
+            cur.execute("""
+                CREATE TABLE IF NOT EXISTS verzija (
+                    ime       TEXT     PRIMARY KEY,
+                    vrednost  INTEGER  NOT NULL DEFAULT(0)
+                );
+            """)
+            cur.execute("""
+                INSERT OR IGNORE INTO verzija (ime, vrednost) VALUES ('paket', 0);
+            """)
+            for dogodek in ("INSERT", "UPDATE", "DELETE"):
+                cur.execute(f"""
+                    CREATE TRIGGER IF NOT EXISTS paket_verzija_{dogodek.lower()}
+                    AFTER {dogodek} ON paket
+                    BEGIN
+                        UPDATE verzija SET vrednost = vrednost + 1 WHERE ime = 'paket';
+                    END;
+                """)
+
+    @classmethod
+    def pobrisi_tabelo(cls, cur=None):
+        """
+        Pobriši tabelo "verzija".
+        """
+        with Kazalec(cur) as cur:
+            for dogodek in ("insert", "update", "delete"):
+                cur.execute(f"DROP TRIGGER IF EXISTS paket_verzija_{dogodek};")
+            cur.execute("""
+                DROP TABLE IF EXISTS verzija;
+            """)
+
+    @classmethod
+    def obnovi(cls, cur=None):
+        """
+        Po spremembi paketov mimo sprožilcev poveča verzijo 'paket', da
+        procesi osvežijo predpomnilnik.
+        """
+        with Kazalec(cur) as cur:
+            cur.execute("UPDATE verzija SET vrednost = vrednost + 1 WHERE ime = 'paket';")
+
+
 @dataclass
 class Racun(Tabela, Entiteta):
     """
@@ -313,6 +946,10 @@ class Racun(Tabela, Entiteta):
 
     VIR = "racun.csv"
     IME = "racun"
+    INDEKSI = {
+        "racun_id_lastnik": "id_lastnik",
+        "racun_id_paket": "id_paket",
+    }
 
     @classmethod
     def ustvari_tabelo(cls, cur=None):
@@ -328,6 +965,7 @@ class Racun(Tabela, Entiteta):
                         stanje          INTEGER  NOT NULL DEFAULT(0) -- centi
                 );
             """)
+            cls.ustvari_indekse(cur)
 
     @classmethod
     def pobrisi_tabelo(cls, cur=None):
@@ -367,9 +1005,19 @@ class Transakcija(Tabela, Entiteta):
     znesek: int = field(default=None)
     cas: str = field(default=None)
     opis: str = field(default=None)
+    stanje_posilja: int = field(default=None)
+    stanje_prejema: int = field(default=None)
 
     VIR = "transakcija.csv"
     IME = "transakcija"
+    INDEKSI = {
+        # odhodne transakcije računa po času (stran za stranjo)
+        "transakcija_posilja_cas": "posilja, cas",
+        # prihodne transakcije računa
+        "transakcija_prejema_cas": "prejema, cas",
+        # admin pregled in statistika po času
+        "transakcija_cas": "cas",
+    }
 
     @classmethod
     def ustvari_tabelo(cls, cur=None):
@@ -386,6 +1034,8 @@ class Transakcija(Tabela, Entiteta):
                     znesek          INTEGER  NOT NULL DEFAULT(0) CHECK(znesek > 0),    -- centi
                     cas             DATETIME DEFAULT(DATETIME('now')),
                     opis            TEXT,    -- Namen plačila / opis transakcije
+                    stanje_posilja  INTEGER, -- stanje pošiljatelja po transakciji (centi)
+                    stanje_prejema  INTEGER, -- stanje prejemnika po transakciji (centi)
 
     
                 CHECK (
@@ -396,11 +1046,13 @@ class Transakcija(Tabela, Entiteta):
                 )
             );
             """)
-            # Varnostna migracija: dodaj stolpec 'opis', če še ne obstaja
-            try:
-                cur.execute("ALTER TABLE transakcija ADD COLUMN opis TEXT")
-            except Exception:
-                pass  # Stolpec že obstaja
+            # Varnostna migracija: dodaj stolpce, ki jih starejša baza še nima
+            for stolpec in ("opis TEXT", "stanje_posilja INTEGER", "stanje_prejema INTEGER"):
+                try:
+                    cur.execute(f"ALTER TABLE transakcija ADD COLUMN {stolpec}")
+                except Exception:
+                    pass  # Stolpec že obstaja
+            cls.ustvari_indekse(cur)
 
     @classmethod
     def pobrisi_tabelo(cls, cur=None):
@@ -417,38 +1069,585 @@ class Transakcija(Tabela, Entiteta):
         """
         Uvozi podatke v tabelo "transakcija".
         """
-        with Kazalec(cur) as cur:
+        def vrstice():
             for vrstica in cls.preberi_vir():
                 if vrstica.get("posilja") == "None":
                     vrstica["posilja"] = None  # popravi zapis iz csv-ja
                 if vrstica.get("prejema") == "None":
                     vrstica["prejema"] = None
-                cur.execute(
-                    """
-                    INSERT INTO transakcija (id_transakcije, posilja, prejema, tip, znesek, cas)
-                    VALUES (:id_transakcije, :posilja, :prejema, :tip, :znesek, :cas);
-                """,
-                    vrstica,
+                yield vrstica
+
+        with Kazalec(cur) as cur:
+            cur.executemany(
+                """
+                INSERT INTO transakcija (id_transakcije, posilja, prejema, tip, znesek, cas)
+                VALUES (:id_transakcije, :posilja, :prejema, :tip, :znesek, :cas);
+            """,
+                vrstice(),
+            )
+
+
+@dataclass
+class TransakcijaIskanje(Tabela, Entiteta):
+    """
+    Razred za iskalni indeks opisov transakcij (FTS5 nad stolpcem opis).
+
+    Tabela hrani le indeks, vsebino bere iz tabele "transakcija"; sprožilci
+    ga posodabljajo ob vsaki spremembi transakcij.
+    """
+
+    opis: str = field(default=None)
+
+    IME = "transakcija_fts"
+    VIRI = ("transakcija",)
+
+    @classmethod
+    def ustvari_tabelo(cls, cur=None):
+        """
+        Ustvari iskalni indeks "transakcija_fts" in sprožilce, ki ga posodabljajo.
+        Ob prvem ustvarjanju v indeks doda obstoječe transakcije.
+        """
+        with Kazalec(cur) as cur:
+            cur.execute("SELECT 1 FROM sqlite_master WHERE name = 'transakcija_fts';")
+            obstaja = cur.fetchone() is not None
+            cur.execute("""
+                CREATE VIRTUAL TABLE IF NOT EXISTS transakcija_fts USING fts5(
+                    opis,
+                    content = 'transakcija',
+                    content_rowid = 'id_transakcije',
+                    tokenize = 'unicode61 remove_diacritics 2'
+                );
+            """)
+            cur.execute("""
+                CREATE TRIGGER IF NOT EXISTS transakcija_fts_insert AFTER INSERT ON transakcija
+                BEGIN
+                    INSERT INTO transakcija_fts (rowid, opis) VALUES (NEW.id_transakcije, NEW.opis);
+                END;
+            """)
+            cur.execute("""
+                CREATE TRIGGER IF NOT EXISTS transakcija_fts_delete AFTER DELETE ON transakcija
+                BEGIN
+                    INSERT INTO transakcija_fts (transakcija_fts, rowid, opis)
+                    VALUES ('delete', OLD.id_transakcije, OLD.opis);
+                END;
+            """)
+            cur.execute("""
+                CREATE TRIGGER IF NOT EXISTS transakcija_fts_update AFTER UPDATE OF opis ON transakcija
+                BEGIN
+                    INSERT INTO transakcija_fts (transakcija_fts, rowid, opis)
+                    VALUES ('delete', OLD.id_transakcije, OLD.opis);
+                    INSERT INTO transakcija_fts (rowid, opis) VALUES (NEW.id_transakcije, NEW.opis);
+                END;
+            """)
+            if not obstaja:
+                cls.obnovi(cur)
+
+    @classmethod
+    def pobrisi_tabelo(cls, cur=None):
+        """
+        Pobriši iskalni indeks "transakcija_fts".
+        """
+        with Kazalec(cur) as cur:
+            for dogodek in ("insert", "delete", "update"):
+                cur.execute(f"DROP TRIGGER IF EXISTS transakcija_fts_{dogodek};")
+            cur.execute("""
+                DROP TABLE IF EXISTS transakcija_fts;
+            """)
+
+    @classmethod
+    def obnovi(cls, cur=None):
+        """
+        Ponovno zgradi iskalni indeks iz tabele "transakcija".
+        """
+        with Kazalec(cur) as cur:
+            cur.execute("INSERT INTO transakcija_fts (transakcija_fts) VALUES ('rebuild');")
+
+
+@dataclass
+class TransakcijaArhiv(Tabela, Entiteta):
+    """
+    Razred za arhiv starih transakcij (tabela "transakcija" v shemi "arhiv").
+
+    Vrstice se vanj le prestavijo iz glavne tabele (glej
+    BankService.arhiviraj_transakcije), zato tabela nima sprožilcev za
+    dnevno porabo in statistiko; ima pa iste indekse in svoj iskalni indeks.
+    Tuji ključi med datotekami niso mogoči, zato jih tabela nima.
+    """
+
+    id_transakcije: int = field(default=None)
+    posilja: str = field(default=None)
+    prejema: str = field(default=None)
+    tip: str = field(default=None)
+    znesek: int = field(default=None)
+    cas: str = field(default=None)
+    opis: str = field(default=None)
+    stanje_posilja: int = field(default=None)
+    stanje_prejema: int = field(default=None)
+
+    IME = "transakcija"
+    SHEMA = "arhiv"
+    INDEKSI = Transakcija.INDEKSI
+
+    @classmethod
+    def ustvari_tabelo(cls, cur=None):
+        """
+        Ustvari tabelo "arhiv.transakcija", njen iskalni indeks in sprožilce zanj.
+        """
+        with Kazalec(cur) as cur:
+            cur.execute("""
+                CREATE TABLE IF NOT EXISTS arhiv.transakcija (
+                    id_transakcije  INTEGER  PRIMARY KEY,
+                    posilja         TEXT,
+                    prejema         TEXT,
+                    tip             TEXT     NOT NULL,
+                    znesek          INTEGER  NOT NULL, -- centi
+                    cas             DATETIME NOT NULL,
+                    opis            TEXT,
+                    stanje_posilja  INTEGER,
+                    stanje_prejema  INTEGER
+                );
+            """)
+            for stolpec in ("stanje_posilja INTEGER", "stanje_prejema INTEGER"):
+                try:
+                    cur.execute(f"ALTER TABLE arhiv.transakcija ADD COLUMN {stolpec}")
+                except Exception:
+                    pass  # Stolpec že obstaja
+            cls.ustvari_indekse(cur)
+            cur.execute("""
+                CREATE VIRTUAL TABLE IF NOT EXISTS arhiv.transakcija_fts USING fts5(
+                    opis,
+                    content = 'transakcija',
+                    content_rowid = 'id_transakcije',
+                    tokenize = 'unicode61 remove_diacritics 2'
+                );
+            """)
+            cur.execute("""
+                CREATE TRIGGER IF NOT EXISTS arhiv.transakcija_fts_insert AFTER INSERT ON transakcija
+                BEGIN
+                    INSERT INTO transakcija_fts (rowid, opis) VALUES (NEW.id_transakcije, NEW.opis);
+                END;
+            """)
+            cur.execute("""
+                CREATE TRIGGER IF NOT EXISTS arhiv.transakcija_fts_delete AFTER DELETE ON transakcija
+                BEGIN
+                    INSERT INTO transakcija_fts (transakcija_fts, rowid, opis)
+                    VALUES ('delete', OLD.id_transakcije, OLD.opis);
+                END;
+            """)
+
+    @classmethod
+    def pobrisi_tabelo(cls, cur=None):
+        """
+        Pobriši tabelo "arhiv.transakcija" in njen iskalni indeks.
+        """
+        with Kazalec(cur) as cur:
+            for dogodek in ("insert", "delete"):
+                cur.execute(f"DROP TRIGGER IF EXISTS arhiv.transakcija_fts_{dogodek};")
+            cur.execute("""
+                DROP TABLE IF EXISTS arhiv.transakcija_fts;
+            """)
+            cur.execute("""
+                DROP TABLE IF EXISTS arhiv.transakcija;
+            """)
+
+    @classmethod
+    def obnovi(cls, cur=None):
+        """
+        Ponovno zgradi iskalni indeks arhiva.
+        """
+        with Kazalec(cur) as cur:
+            cur.execute("INSERT INTO arhiv.transakcija_fts (transakcija_fts) VALUES ('rebuild');")
+
+
+@dataclass
+class DnevnaPoraba(Tabela, Entiteta):
+    """
+    Razred za dnevno porabo računa (vsota nakazil oz. dvigov na dan).
+
+    Tabelo vzdržuje sprožilec ob vstavljanju v "transakcija", zato je
+    preverjanje dnevnega limita en sam dostop po primarnem ključu.
+    """
+
+    IBAN: str = field(default=None)
+    dan: str = field(default=None)
+    tip: str = field(default=None)
+    znesek: int = field(default=None)
+
+    IME = "dnevna_poraba"
+    VIRI = ("transakcija",)
+
+    @classmethod
+    def ustvari_tabelo(cls, cur=None):
+        """
+        Ustvari tabelo "dnevna_poraba" in sprožilec, ki jo posodablja.
+        """
+        with Kazalec(cur) as cur:
+            cur.execute("""
+                CREATE TABLE IF NOT EXISTS dnevna_poraba (
+                    IBAN    TEXT     NOT NULL REFERENCES racun(IBAN),
+                    dan     DATE     NOT NULL,
+                    tip     TEXT     NOT NULL CHECK(tip IN ('nakazilo', 'dvig')),
+                    znesek  INTEGER  NOT NULL DEFAULT(0), -- centi
+                    PRIMARY KEY (IBAN, dan, tip)
+                ) WITHOUT ROWID;
+            """)
+            cur.execute("""
+                CREATE TRIGGER IF NOT EXISTS transakcija_dnevna_poraba
+                AFTER INSERT ON transakcija
+                WHEN NEW.tip IN ('nakazilo', 'dvig')
+                BEGIN
+                    INSERT INTO dnevna_poraba (IBAN, dan, tip, znesek)
+                    VALUES (NEW.posilja, DATE(NEW.cas), NEW.tip, NEW.znesek)
+                    ON CONFLICT (IBAN, dan, tip) DO UPDATE SET znesek = znesek + excluded.znesek;
+                END;
+            """)
+
+    @classmethod
+    def pobrisi_tabelo(cls, cur=None):
+        """
+        Pobriši tabelo "dnevna_poraba".
+        """
+        with Kazalec(cur) as cur:
+            cur.execute("""
+                DROP TRIGGER IF EXISTS transakcija_dnevna_poraba;
+            """)
+            cur.execute("""
+                DROP TABLE IF EXISTS dnevna_poraba;
+            """)
+
+    @classmethod
+    def obnovi(cls, cur=None):
+        """
+        Ponovno izračunaj dnevno porabo iz tabele "transakcija".
+        """
+        with Kazalec(cur) as cur:
+            cur.execute("DELETE FROM dnevna_poraba;")
+            cur.execute("""
+                INSERT INTO dnevna_poraba (IBAN, dan, tip, znesek)
+                SELECT posilja, DATE(cas), tip, SUM(znesek)
+                FROM transakcija
+                WHERE tip IN ('nakazilo', 'dvig')
+                GROUP BY posilja, DATE(cas), tip;
+            """)
+
+
+@dataclass
+class StanjePosnetek(Tabela, Entiteta):
+    """
+    Razred za posnetke stanja računa ob koncu dneva (UTC).
+
+    Posnetek obstaja le za dneve, ko je imel račun promet; med dvema
+    posnetkoma se stanje ni spremenilo. Tabelo dopolnjuje nočno opravilo
+    BankService.create_stanje_posnetki, stanje ob poljubnem času pa se
+    izračuna iz zadnjega posnetka in prometa po njem. Transakcija z
+    datumom za nazaj (npr. uvoz) izbriše posnetke udeleženih računov od
+    svojega dne naprej, da jih opravilo izračuna znova.
+    """
+
+    IBAN: str = field(default=None)
+    dan: str = field(default=None)
+    stanje: int = field(default=None)
+
+    IME = "stanje_posnetek"
+
+    @classmethod
+    def ustvari_tabelo(cls, cur=None):
+        """
+        Ustvari tabelo "stanje_posnetek".
+        """
+        with Kazalec(cur) as cur:
+            cur.execute("""
+                CREATE TABLE IF NOT EXISTS stanje_posnetek (
+                    IBAN    TEXT     NOT NULL REFERENCES racun(IBAN),
+                    dan     DATE     NOT NULL,
+                    stanje  INTEGER  NOT NULL, -- centi, ob koncu dneva
+                    PRIMARY KEY (IBAN, dan)
+                ) WITHOUT ROWID;
+            """)
+            cls.ustvari_indekse(cur)
+            # Varnostna migracija: nočno opravilo ne išče več zadnjega dne
+            # čez vse račune, sprožilec pa briše po primarnem ključu
+            cur.execute("DROP INDEX IF EXISTS stanje_posnetek_dan;")
+            cur.execute("DROP TRIGGER IF EXISTS transakcija_stanje_posnetek;")
+            # Posnetki obstajajo le za pretekle dneve, zato sprotne transakcije
+            # sprožilca ne izvedejo
+            cur.execute("""
+                CREATE TRIGGER transakcija_stanje_posnetek
+                AFTER INSERT ON transakcija
+                WHEN NEW.cas < DATE('now')
+                BEGIN
+                    DELETE FROM stanje_posnetek
+                    WHERE IBAN IN (NEW.posilja, NEW.prejema) AND dan >= DATE(NEW.cas);
+                END;
+            """)
+
+    @classmethod
+    def pobrisi_tabelo(cls, cur=None):
+        """
+        Pobriši tabelo "stanje_posnetek".
+        """
+        with Kazalec(cur) as cur:
+            cur.execute("""
+                DROP TRIGGER IF EXISTS transakcija_stanje_posnetek;
+            """)
+            cur.execute("""
+                DROP TABLE IF EXISTS stanje_posnetek;
+            """)
+
+
+@dataclass
+class Statistika(Tabela, Entiteta):
+    """
+    Razred za sprotno vzdrževano statistiko banke.
+
+    Števce posodabljajo sprožilci na tabelah "stranka", "racun" in
+    "transakcija" v isti transakciji kot spremembo, zato admin pregled
+    prebere le nekaj vrstic. Število transakcij po dnevih je shranjeno pod
+    imenom 'transakcije:YYYY-MM-DD'. Arhivirane transakcije se štejejo zraven.
+    """
+
+    ime: str = field(default=None)
+    vrednost: int = field(default=None)
+
+    IME = "statistika"
+    VIRI = ("stranka", "racun", "transakcija")
+
+    # ime sprožilca -> (dogodek, pogoj, stavki)
+    SPROZILCI = {
+        "stranka_statistika_insert": ("AFTER INSERT ON stranka", "", """
+            UPDATE statistika SET vrednost = vrednost + 1 WHERE ime = 'stranke';
+        """),
+        "stranka_statistika_delete": ("AFTER DELETE ON stranka", "", """
+            UPDATE statistika SET vrednost = vrednost - 1 WHERE ime = 'stranke';
+        """),
+        "racun_statistika_insert": ("AFTER INSERT ON racun", "", """
+            UPDATE statistika SET vrednost = vrednost + 1 WHERE ime = 'racuni';
+            UPDATE statistika SET vrednost = vrednost + NEW.stanje WHERE ime = 'stanje';
+        """),
+        "racun_statistika_delete": ("AFTER DELETE ON racun", "", """
+            UPDATE statistika SET vrednost = vrednost - 1 WHERE ime = 'racuni';
+            UPDATE statistika SET vrednost = vrednost - OLD.stanje WHERE ime = 'stanje';
+        """),
+        "racun_statistika_update": (
+            "AFTER UPDATE OF stanje ON racun",
+            "WHEN NEW.stanje IS NOT OLD.stanje",
+            """
+            UPDATE statistika SET vrednost = vrednost + NEW.stanje - OLD.stanje WHERE ime = 'stanje';
+        """),
+        "transakcija_statistika_insert": ("AFTER INSERT ON transakcija", "", """
+            UPDATE statistika SET vrednost = vrednost + 1 WHERE ime = 'transakcije';
+            INSERT INTO statistika (ime, vrednost) VALUES ('transakcije:' || DATE(NEW.cas), 1)
+            ON CONFLICT (ime) DO UPDATE SET vrednost = vrednost + 1;
+        """),
+        "transakcija_statistika_delete": ("AFTER DELETE ON transakcija", "", """
+            UPDATE statistika SET vrednost = vrednost - 1 WHERE ime = 'transakcije';
+            UPDATE statistika SET vrednost = vrednost - 1 WHERE ime = 'transakcije:' || DATE(OLD.cas);
+        """),
+    }
+
+    @classmethod
+    def ustvari_tabelo(cls, cur=None):
+        """
+        Ustvari tabelo "statistika" in sprožilce, ki jo posodabljajo.
+        V obstoječi bazi se števci najprej izračunajo iz obstoječih podatkov.
+        """
+        with Kazalec(cur) as cur:
+            cur.execute("""
+                CREATE TABLE IF NOT EXISTS statistika (
+                    ime       TEXT     PRIMARY KEY,
+                    vrednost  INTEGER  NOT NULL DEFAULT(0)
+                ) WITHOUT ROWID;
+            """)
+            cur.execute("SELECT COUNT(*) FROM statistika;")
+            if cur.fetchone()[0] == 0:
+                cls.obnovi(cur)
+            for ime, (dogodek, pogoj, stavki) in cls.SPROZILCI.items():
+                cur.execute(f"""
+                    CREATE TRIGGER IF NOT EXISTS {ime}
+                    {dogodek}
+                    {pogoj}
+                    BEGIN
+                        {stavki}
+                    END;
+                """)
+
+    @classmethod
+    def pobrisi_tabelo(cls, cur=None):
+        """
+        Pobriši tabelo "statistika".
+        """
+        with Kazalec(cur) as cur:
+            for ime in cls.SPROZILCI:
+                cur.execute(f"DROP TRIGGER IF EXISTS {ime};")
+            cur.execute("""
+                DROP TABLE IF EXISTS statistika;
+            """)
+
+    @classmethod
+    def izracunaj(cls, cur=None):
+        """
+        Izračunaj statistiko iz vseh podatkov (brez sprotnih števcev).
+
+        Arhivirana transakcija, ki je po prekinjenem arhiviranju še tudi v
+        glavni tabeli, se šteje enkrat.
+
+        Vrne slovar ime -> vrednost.
+        """
+        arhiv = """
+            SELECT cas FROM arhiv.transakcija a
+            WHERE NOT EXISTS (
+                SELECT 1 FROM main.transakcija t WHERE t.id_transakcije = a.id_transakcije
+            )
+        """
+        with Kazalec(cur) as cur:
+            cur.execute(f"""
+                SELECT 'stranke', COUNT(*) FROM stranka
+                UNION ALL
+                SELECT 'racuni', COUNT(*) FROM racun
+                UNION ALL
+                SELECT 'stanje', COALESCE(SUM(stanje), 0) FROM racun
+                UNION ALL
+                SELECT 'transakcije',
+                       (SELECT COUNT(*) FROM main.transakcija) + (SELECT COUNT(*) FROM ({arhiv}))
+                UNION ALL
+                SELECT 'transakcije:' || DATE(cas), COUNT(*)
+                FROM (SELECT cas FROM main.transakcija UNION ALL {arhiv})
+                GROUP BY DATE(cas);
+            """)
+            return dict(cur.fetchall())
+
+    @classmethod
+    def pristej_transakcije(cls, cur, izbor, parametri=(), predznak=1):
+        """
+        Števcem transakcij prišteje (oz. pri predznaku -1 odšteje) transakcije,
+        katerih čase vrne poizvedba `izbor` s parametri `parametri`.
+
+        Za spremembe, ki jih sprožilci ne vidijo (arhiv).
+        """
+        with Kazalec(cur) as cur:
+            cur.execute(
+                f"""
+                INSERT INTO statistika (ime, vrednost)
+                SELECT ime, ? * COUNT(*) FROM (
+                    SELECT 'transakcije' AS ime FROM ({izbor})
+                    UNION ALL
+                    SELECT 'transakcije:' || DATE(cas) FROM ({izbor})
                 )
+                WHERE true
+                GROUP BY ime
+                ON CONFLICT (ime) DO UPDATE SET vrednost = vrednost + excluded.vrednost;
+            """,
+                (predznak, *parametri, *parametri),
+            )
+
+    @classmethod
+    def obnovi(cls, cur=None):
+        """
+        Ponovno izračunaj statistiko iz vseh podatkov.
+        """
+        with Kazalec(cur) as cur:
+            vrednosti = cls.izracunaj(cur)
+            cur.execute("DELETE FROM statistika;")
+            cur.executemany(
+                "INSERT INTO statistika (ime, vrednost) VALUES (?, ?);",
+                vrednosti.items(),
+            )
+
+
+@dataclass
+class Uvoz(Tabela, Entiteta):
+    """
+    Razred za napredek paketnega nalaganja CSV datotek (glej `Tabela.nalozi`).
+
+    Za vsako datoteko hrani njeno velikost in čas spremembe, število že
+    potrjenih vrstic in ukaze CREATE za indekse, ki so odstranjeni za čas
+    nalaganja (in še niso obnovljeni, če je bil proces prekinjen).
+    """
+
+    vir: str = field(default=None)
+    tabela: str = field(default=None)
+    vrstic: int = field(default=None)
+    odlozeno: str = field(default=None)
+    koncano: int = field(default=None)
+    velikost: int = field(default=None)
+    spremenjeno: int = field(default=None)
+
+    IME = "uvoz"
+
+    @classmethod
+    def ustvari_tabelo(cls, cur=None):
+        """
+        Ustvari tabelo "uvoz".
+        """
+        with Kazalec(cur) as cur:
+            cur.execute("""
+                CREATE TABLE IF NOT EXISTS uvoz (
+                    vir       TEXT     PRIMARY KEY,  -- absolutna pot do CSV datoteke
+                    tabela    TEXT     NOT NULL,
+                    vrstic    INTEGER  NOT NULL DEFAULT(0),
+                    odlozeno  TEXT     NOT NULL,     -- JSON: tabela -> ukazi CREATE
+                    koncano   INTEGER  NOT NULL DEFAULT(0),
+                    velikost     INTEGER,  -- bajti
+                    spremenjeno  INTEGER   -- čas spremembe datoteke (ns)
+                );
+            """)
+            # Varnostna migracija: dodaj stolpce, ki jih starejša baza še nima
+            for stolpec in ("velikost INTEGER", "spremenjeno INTEGER"):
+                try:
+                    cur.execute(f"ALTER TABLE uvoz ADD COLUMN {stolpec}")
+                except Exception:
+                    pass  # Stolpec že obstaja
+
+    @classmethod
+    def pobrisi_tabelo(cls, cur=None):
+        """
+        Pobriši tabelo "uvoz".
+        """
+        with Kazalec(cur) as cur:
+            cur.execute("""
+                DROP TABLE IF EXISTS uvoz;
+            """)
 
 
 ##########################################################################################################################################################
 
 
+@contextmanager
+def _potrjen_kazalec(cur=None):
+    """
+    Vrni podan kazalec (spremembe potrdi klicatelj) ali pa odpri novega na
+    povezavi, ki spremembe ob izstopu potrdi oz. ob izjemi razveljavi.
+    """
+    if cur is not None:
+        yield cur
+        return
+    with get_connection(), Kazalec() as cur:
+        yield cur
+
+
 def ustvari_tabele(cur=None):
     """
     Ustvari vse tabele.
     """
-    with Kazalec(cur) as cur:
+    with _potrjen_kazalec(cur) as cur:
         for t in Tabela.TABELE:
             t.ustvari_tabelo(cur=cur)
 
 
+def ustvari_indekse(cur=None):
+    """
+    Ustvari (manjkajoče) indekse vseh tabel - tudi v obstoječi bazi.
+    """
+    with _potrjen_kazalec(cur) as cur:
+        for t in Tabela.TABELE:
+            t.ustvari_indekse(cur=cur)
+
+
 def pobrisi_tabele(cur=None):
     """
     Pobriši vse tabele.
     """
-    with Kazalec(cur) as cur:
+    with _potrjen_kazalec(cur) as cur:
         for t in reversed(Tabela.TABELE):
             t.pobrisi_tabelo(cur=cur)
 
@@ -457,7 +1656,7 @@ def uvozi_podatke(cur=None):
     """
     Uvozi vse podatke.
     """
-    with Kazalec(cur) as cur:
+    with _potrjen_kazalec(cur) as cur:
         for t in Tabela.TABELE:
             t.uvozi_podatke(cur=cur)
 
@@ -2,8 +2,24 @@
 Bančne storitve - vmesna plast med Flask aplikacijo in bazo podatkov
 """
 
-from datetime import date, datetime
-from model import get_connection, Kazalec, Stranka
+import base64
+import heapq
+import json
+import re
+from datetime import date, datetime, timedelta, timezone
+from model import (
+    dbapi,
+    get_connection,
+    Kazalec,
+    PisalniKazalec,
+    PROFILI,
+    Stranka,
+    TransakcijaArhiv,
+    StanjePosnetek,
+    DnevnaPoraba,
+    Statistika,
+    Tabela,
+)
 from werkzeug.security import generate_password_hash, check_password_hash
 import logging
 
@@ -42,6 +58,91 @@ def normaliziraj_iban(iban):
     return "".join(c for c in str(iban) if c.isalnum()).upper()
 
 
+def zakodiraj_kazalec(*kljuc):
+    """
+    Zakodira položaj v urejenem seznamu (ključ zadnje vrstice strani, npr.
+    cas in id_transakcije) v neprozoren niz, ki ga lahko podamo v URL kot
+    parameter `po`.
+    """
+    surovo = json.dumps(kljuc, ensure_ascii=False, separators=(",", ":")).encode()
+    return base64.urlsafe_b64encode(surovo).decode().rstrip("=")
+
+
+def odkodiraj_kazalec(kazalec, dolzina=2):
+    """
+    Vrne ključ (terko z `dolzina` vrednostmi) iz niza, ki ga vrne
+    `zakodiraj_kazalec`. Ob neveljavnem nizu sproži ValueError.
+    """
+    try:
+        kljuc = json.loads(base64.urlsafe_b64decode(kazalec + "=" * (-len(kazalec) % 4)))
+    except ValueError as e:
+        raise ValueError("Neveljaven kazalec strani") from e
+    if (
+        not isinstance(kljuc, list)
+        or len(kljuc) != dolzina
+        or not all(isinstance(v, (str, int, float)) for v in kljuc)
+    ):
+        raise ValueError("Neveljaven kazalec strani")
+    return tuple(kljuc)
+
+
+def naslednja_stran(vrstice, limit, kljuc=("cas", "id_transakcije")):
+    """
+    Vrne kazalec strani za zadnjo vrstico seznama ali None,
+    če je stran krajša od `limit` (ni več vrstic).
+    """
+    if len(vrstice) < limit:
+        return None
+    zadnja = vrstice[-1]
+    return zakodiraj_kazalec(*(zadnja[stolpec] for stolpec in kljuc))
+
+
+def _fts_poizvedba(iskanje):
+    """
+    Iz vnosa uporabnika sestavi poizvedbo FTS5, v kateri je vsaka beseda
+    predpona in morajo biti najdene vse ('kov lj' -> '"kov"* "lj"*').
+    """
+    return " ".join(f'"{beseda}"*' for beseda in re.findall(r"\w+", iskanje or ""))
+
+
+def _pogoj_strani(po, predpona=""):
+    """
+    Pogoj za transakcije, starejše od kazalca `po`, in njegovi parametri.
+    Brez kazalca vrne prazen pogoj (prva stran).
+    """
+    if not po:
+        return "", ()
+    return (
+        f"AND ({predpona}cas, {predpona}id_transakcije) < (?, ?)",
+        odkodiraj_kazalec(po),
+    )
+
+
+# Transakcije, starejše od toliko dni, se privzeto prestavijo v arhiv
+ARHIV_PO_DNEH = 365
+
+_TABELE_TRANSAKCIJ = re.compile(r"\bFROM transakcija(_fts)?\b")
+
+# Pogoj za arhivske vrstice, ki jih prekinjeno arhiviranje še ni izbrisalo iz
+# glavne tabele - pri seštevanju zneskov bi se sicer štele dvakrat
+_NI_V_GLAVNI = (
+    "AND NOT EXISTS (SELECT 1 FROM main.transakcija m "
+    "WHERE m.id_transakcije = transakcija.id_transakcije)"
+)
+
+# Največ računov v eni poizvedbi `_transakcije_racunov` (dva dela UNION na
+# račun, SQLite pa dovoli največ 500 delov sestavljenega SELECT-a)
+RACUNOV_NA_POIZVEDBO = 200
+
+
+def _v_arhivu(sql):
+    """
+    Isto poizvedbo usmeri na tabeli arhiva ("arhiv.transakcija" in njen
+    iskalni indeks) namesto na glavni tabeli.
+    """
+    return _TABELE_TRANSAKCIJ.sub(r"FROM arhiv.transakcija\1", sql)
+
+
 def preveri_iban_format(iban):
     """
     Preveri, če je IBAN veljaven po standardu ISO 7064 Mod 97-10.
@@ -67,6 +168,100 @@ def preveri_iban_format(iban):
         return False
 
 
+def dnevno_okno(dan=None):
+    """
+    Vrne polodprt interval (zacetek, konec) za dan v obliki stolpca `cas`.
+
+    `cas` hrani UTC čas kot 'LLLL-MM-DD HH:MM:SS', zato je pogoj
+    `cas >= ? AND cas < ?` enak `DATE(cas) = DATE('now')`, le da lahko
+    uporabi indeks na `cas`. Privzeto vrne današnji dan (UTC).
+    """
+    if dan is None:
+        dan = datetime.now(timezone.utc).date()
+    naslednji = dan + timedelta(days=1)
+    return f"{dan.isoformat()} 00:00:00", f"{naslednji.isoformat()} 00:00:00"
+
+
+def _cas(ts):
+    """
+    Čas (datetime, date ali niz ISO) v obliki stolpca `cas`
+    ('LLLL-MM-DD HH:MM:SS', UTC). Datum brez ure pomeni konec dneva.
+    Ob neveljavnem času sproži ValueError.
+    """
+    if isinstance(ts, datetime):
+        if ts.tzinfo is not None:
+            ts = ts.astimezone(timezone.utc)
+        return ts.strftime("%Y-%m-%d %H:%M:%S")
+    if isinstance(ts, date):
+        return f"{ts.isoformat()} 23:59:59"
+    try:
+        niz = str(ts).strip()
+        if len(niz) == 10:
+            return _cas(date.fromisoformat(niz))
+        return _cas(datetime.fromisoformat(niz))
+    except ValueError as e:
+        raise ValueError("Neveljaven čas (uporabite obliko LLLL-MM-DD HH:MM:SS)") from e
+
+
+class ZavrnjenaTransakcija(Exception):
+    """
+    Transakcija ni dovoljena (nezadostna sredstva, presežen limit, ...).
+    Sporočilo izjeme je namenjeno uporabniku.
+    """
+
+
+class PredpomnilnikPaketov:
+    """
+    Predpomnilnik tabele "paket" v pomnilniku procesa, ključ je id_paket.
+
+    Ob vsakem branju klicatelj poda trenutno verzijo iz tabele "verzija"
+    (vrstica 'paket'); če se razlikuje od shranjene, se paketi ponovno
+    naložijo. Tako tudi drugi procesi nikoli ne uporabljajo zastarelih limitov.
+    """
+
+    def __init__(self):
+        # (verzija, {id_paket: paket}) - zamenja se naenkrat
+        self._stanje = (None, {})
+
+    def razveljavi(self):
+        """Izprazni predpomnilnik (po spremembi paketa v tem procesu)."""
+        self._stanje = (None, {})
+
+    def _paketi(self, cur, verzija):
+        shranjena, paketi = self._stanje
+        if verzija is None or verzija != shranjena:
+            cur.execute("""
+                SELECT id_paket, tip, cena, osnovni_limit, dnevni_limit
+                FROM paket
+                ORDER BY id_paket
+            """)
+            paketi = {
+                row[0]: {
+                    "id_paket": row[0],
+                    "tip": row[1],
+                    "cena": row[2],
+                    "osnovni_limit": row[3],
+                    "dnevni_limit": row[4],
+                }
+                for row in cur.fetchall()
+            }
+            self._stanje = (verzija, paketi)
+        return paketi
+
+    def paket(self, cur, verzija, id_paket):
+        """Vrne kopijo paketa ali None."""
+        paket = self._paketi(cur, verzija).get(id_paket)
+        return dict(paket) if paket else None
+
+    def vsi(self, cur, verzija):
+        """Vrne kopije vseh paketov, urejene po id_paket."""
+        return [dict(paket) for paket in self._paketi(cur, verzija).values()]
+
+
+# Skupen predpomnilnik paketov za celoten proces
+_paketi = PredpomnilnikPaketov()
+
+
 class BankService:
     """Glavni razred za bančne storitve"""
 
@@ -215,8 +410,38 @@ class BankService:
                 )
             return None
 
+    @staticmethod
+    def _racun_s_paketom(row):
+        """
+        Pretvori vrstico (IBAN, id_lastnik, stanje, id_paket, tip, cena,
+        osnovni_limit, dnevni_limit) v slovar računa z vgnezdenim paketom.
+        """
+        paket = None
+        if row[3] is not None:
+            paket = {
+                "id_paket": row[3],
+                "tip": row[4],
+                "cena": row[5],
+                "osnovni_limit": row[6],
+                "dnevni_limit": row[7],
+            }
+        return {
+            "IBAN": row[0],
+            "id_lastnik": row[1],
+            "stanje": row[2],
+            "id_paket": row[3],
+            "paket_tip": row[4],
+            "paket_cena": row[5],
+            "osnovni_limit": row[6],
+            "dnevni_limit": row[7],
+            "paket": paket,
+        }
+
     def get_racuni_stranke(self, id_stranke):
-        """Pridobi vse račune stranke vključno s paketom"""
+        """
+        Pridobi vse račune stranke vključno s paketom (ključ "paket")
+        z eno poizvedbo, ne glede na število računov.
+        """
         with Kazalec() as cur:
             cur.execute(
                 """
@@ -229,19 +454,7 @@ class BankService:
                 (id_stranke,),
             )
             rows = cur.fetchall()
-            return [
-                {
-                    "IBAN": row[0],
-                    "id_lastnik": row[1],
-                    "stanje": row[2],
-                    "id_paket": row[3],
-                    "paket_tip": row[4],
-                    "paket_cena": row[5],
-                    "osnovni_limit": row[6],
-                    "dnevni_limit": row[7],
-                }
-                for row in rows
-            ]
+            return [self._racun_s_paketom(row) for row in rows]
 
     def get_racun(self, iban):
         """Pridobi podatke o računu"""
@@ -261,27 +474,20 @@ class BankService:
             return None
 
     def get_paket_za_racun(self, iban):
-        """Pridobi paket za račun"""
+        """Pridobi paket za račun (iz predpomnilnika paketov)"""
         iban = normaliziraj_iban(iban)
         with Kazalec() as cur:
             cur.execute(
                 """
-                SELECT p.id_paket, p.tip, p.cena, p.osnovni_limit, p.dnevni_limit
-                FROM paket p
-                JOIN racun r ON r.id_paket = p.id_paket
-                WHERE r.IBAN = ?
+                SELECT id_paket, (SELECT vrednost FROM verzija WHERE ime = 'paket')
+                FROM racun
+                WHERE IBAN = ?
             """,
                 (iban,),
             )
             row = cur.fetchone()
             if row:
-                return {
-                    "id_paket": row[0],
-                    "tip": row[1],
-                    "cena": row[2],
-                    "osnovni_limit": row[3],
-                    "dnevni_limit": row[4],
-                }
+                return _paketi.paket(cur, row[1], row[0])
             return None
 
     def get_remaining_daily_limit(self, iban):
@@ -296,79 +502,379 @@ class BankService:
             return None, None
 
         with Kazalec() as cur:
-            # Porabljeno za nakazila danes
-            cur.execute(
-                """
-                SELECT COALESCE(SUM(znesek), 0)
-                FROM transakcija
-                WHERE posilja = ? AND tip = 'nakazilo' AND DATE(cas) = DATE('now')
-            """,
-                (iban,),
-            )
-            nakazila_today = cur.fetchone()[0]
-
-            # Porabljeno za dvige danes
-            cur.execute(
-                """
-                SELECT COALESCE(SUM(znesek), 0)
-                FROM transakcija
-                WHERE posilja = ? AND tip = 'dvig' AND DATE(cas) = DATE('now')
-            """,
-                (iban,),
-            )
-            dvigi_today = cur.fetchone()[0]
+            nakazila_today = self._porabljeno_danes(cur, iban, "nakazilo")
+            dvigi_today = self._porabljeno_danes(cur, iban, "dvig")
 
             rem_nakazila = max(0, paket["dnevni_limit"] - nakazila_today)
             rem_dvigi = max(0, paket["dnevni_limit"] - dvigi_today)
 
             return rem_nakazila, rem_dvigi
 
-    def get_recent_transactions(self, id_stranke, limit=10):
-        """Pridobi zadnje transakcije za stranko"""
+    def get_dashboard(self, id_stranke, limit=10):
+        """
+        Pridobi vse podatke za nadzorno ploščo stranke s stalnim številom poizvedb:
+        stranko, račune s paketom in preostankom dnevnega limita ter zadnje transakcije.
+
+        Returns: dict ali None, če stranka ne obstaja
+        """
+        stranka = self.get_stranka(id_stranke)
+        if not stranka:
+            return None
+
         with Kazalec() as cur:
             cur.execute(
                 """
-                SELECT t.id_transakcije, t.posilja, t.prejema, t.tip, t.znesek, t.cas, t.opis
-                FROM transakcija t
-                LEFT JOIN racun r1 ON t.posilja = r1.IBAN
-                LEFT JOIN racun r2 ON t.prejema = r2.IBAN
-                WHERE r1.id_lastnik = ? OR r2.id_lastnik = ?
-                ORDER BY t.cas DESC
-                LIMIT ?
+                SELECT r.IBAN, r.id_lastnik, r.stanje, p.id_paket, p.tip, p.cena,
+                       p.osnovni_limit, p.dnevni_limit,
+                       COALESCE(dn.znesek, 0), COALESCE(dd.znesek, 0)
+                FROM racun r
+                LEFT JOIN paket p ON r.id_paket = p.id_paket
+                LEFT JOIN dnevna_poraba dn
+                       ON dn.IBAN = r.IBAN AND dn.dan = DATE('now') AND dn.tip = 'nakazilo'
+                LEFT JOIN dnevna_poraba dd
+                       ON dd.IBAN = r.IBAN AND dd.dan = DATE('now') AND dd.tip = 'dvig'
+                WHERE r.id_lastnik = ?
+                ORDER BY r.IBAN
             """,
-                (id_stranke, id_stranke, limit),
+                (id_stranke,),
             )
-            rows = cur.fetchall()
-            return [
-                {
-                    "id_transakcije": row[0],
-                    "posilja": row[1],
-                    "prejema": row[2],
-                    "tip": row[3],
-                    "znesek": row[4],
-                    "cas": row[5],
-                    "opis": row[6],
-                }
-                for row in rows
+            racuni = []
+            for row in cur.fetchall():
+                racun = self._racun_s_paketom(row)
+                dnevni_limit = racun["dnevni_limit"]
+                racun["preostanek_nakazil"] = max(0, dnevni_limit - row[8]) if dnevni_limit else None
+                racun["preostanek_dvigov"] = max(0, dnevni_limit - row[9]) if dnevni_limit else None
+                racuni.append(racun)
+
+            recent_transactions = self._transakcije_racunov(
+                cur, [racun["IBAN"] for racun in racuni], limit
+            )
+
+        return {
+            "stranka": stranka,
+            "racuni": racuni,
+            "recent_transactions": recent_transactions,
+        }
+
+    def _porabljeno_danes(self, cur, iban, tip):
+        """Vsota današnjih transakcij danega tipa z računa (v centih)"""
+        cur.execute(
+            """
+            SELECT znesek
+            FROM dnevna_poraba
+            WHERE IBAN = ? AND dan = DATE('now') AND tip = ?
+        """,
+            (iban, tip),
+        )
+        row = cur.fetchone()
+        return row[0] if row else 0
+
+    def _transakcije_racunov(self, cur, ibani, limit, po=None, filtri=("", ())):
+        """
+        Zadnjih `limit` transakcij, v katerih sodeluje kateri od računov `ibani`
+        (in ki ustrezajo dodatnim pogojem `filtri`, glej `_filtri_transakcij`).
+
+        Za vsak račun se prebere največ `limit` odhodnih transakcij iz indeksa
+        (posilja, cas) in največ `limit` prihodnih iz indeksa (prejema, cas);
+        SQLite nato zlije te dele (UNION odstrani nakazila med računi `ibani`,
+        ki se pojavijo dvakrat). Cena je odvisna od števila računov in velikosti
+        strani, ne od števila vseh transakcij v banki.
+
+        Računi se poizvedujejo v skupinah po `RACUNOV_NA_POIZVEDBO`, strani
+        skupin pa se zlijejo (brez nakazil med računi različnih skupin, ki se
+        pojavijo v obeh).
+        """
+        if not ibani:
+            return []
+        if len(ibani) > RACUNOV_NA_POIZVEDBO:
+            strani = [
+                self._transakcije_racunov(cur, ibani[i : i + RACUNOV_NA_POIZVEDBO], limit, po, filtri)
+                for i in range(0, len(ibani), RACUNOV_NA_POIZVEDBO)
             ]
+            zliti = heapq.merge(
+                *strani, key=lambda t: (t["cas"], t["id_transakcije"]), reverse=True
+            )
+            videni = set()
+            transakcije = []
+            for t in zliti:
+                if t["id_transakcije"] not in videni:
+                    videni.add(t["id_transakcije"])
+                    transakcije.append(t)
+                    if len(transakcije) == limit:
+                        break
+            return transakcije
+        pogoj, parametri = _pogoj_strani(po)
+        pogoj = f"{filtri[0]} {pogoj}"
+        parametri = (*filtri[1], *parametri)
+        deli = []
+        vrednosti = []
+        for iban in ibani:
+            deli.append(
+                f"""
+                SELECT * FROM (
+                    SELECT id_transakcije, posilja, prejema, tip, znesek, cas, opis,
+                           stanje_posilja, stanje_prejema
+                    FROM transakcija
+                    WHERE posilja = ? {pogoj}
+                    ORDER BY cas DESC, id_transakcije DESC
+                    LIMIT ?
+                )"""
+            )
+            vrednosti += [iban, *parametri, limit]
+            deli.append(
+                f"""
+                SELECT * FROM (
+                    SELECT id_transakcije, posilja, prejema, tip, znesek, cas, opis,
+                           stanje_posilja, stanje_prejema
+                    FROM transakcija
+                    WHERE prejema = ? {pogoj}
+                    ORDER BY cas DESC, id_transakcije DESC
+                    LIMIT ?
+                )"""
+            )
+            vrednosti += [iban, *parametri, limit]
+
+        return self._transakcije_z_arhivom(
+            cur,
+            "\n                UNION".join(deli)
+            + """
+                ORDER BY cas DESC, id_transakcije DESC
+                LIMIT ?
+            """,
+            (*vrednosti, limit),
+            limit,
+        )
+
+    def _meja_arhiva(self, cur):
+        """
+        Čas najnovejše arhivirane transakcije ali None, če je arhiv prazen
+        (oz. v starejši bazi še ni ustvarjen).
+        """
+        try:
+            cur.execute("SELECT MAX(cas) FROM arhiv.transakcija")
+        except dbapi.OperationalError as e:
+            # Ostale napake (zaklenjena baza, V/I) naj se ne skrijejo kot prazen arhiv
+            if "no such table" not in str(e):
+                raise
+            return None
+        return cur.fetchone()[0]
+
+    def _izbrisi_iz_arhiva(self, cur, pogoj, parametri):
+        """
+        Iz arhiva izbriše transakcije, ki ustrezajo pogoju, in jih odšteje od
+        statistike. Vrstic, ki so po prekinjenem arhiviranju še v glavni
+        tabeli, ne odšteje - to ob njihovem brisanju naredi sprožilec.
+        """
+        if self._meja_arhiva(cur) is None:
+            return
+        izbor = f"FROM arhiv.transakcija WHERE ({pogoj})"
+        Statistika.pristej_transakcije(cur, f"SELECT cas {izbor} {_NI_V_GLAVNI}", parametri, -1)
+        cur.execute(f"DELETE {izbor}", parametri)
+
+    def _transakcije_z_arhivom(self, cur, sql, parametri, limit):
+        """
+        Izvede poizvedbo, ki vrne največ `limit` transakcij (id_transakcije,
+        posilja, prejema, tip, znesek, cas, opis, stanje_posilja,
+        stanje_prejema) od najnovejše naprej.
+
+        Ista poizvedba se nad arhivom izvede le, če stran seže do časa
+        najnovejše arhivirane transakcije (stran ni polna ali je njena
+        zadnja transakcija tako stara); rezultata se nato zlijeta.
+        """
+        cur.execute(sql, parametri)
+        rows = cur.fetchall()
+        meja = self._meja_arhiva(cur)
+        if meja is not None and (len(rows) < limit or rows[-1][5] <= meja):
+            cur.execute(_v_arhivu(sql), parametri)
+            # Med prekinjenim arhiviranjem je lahko vrstica v obeh tabelah
+            vse = {row[0]: row for row in cur.fetchall()}
+            vse.update((row[0], row) for row in rows)
+            rows = sorted(vse.values(), key=lambda row: (row[5], row[0]), reverse=True)[:limit]
+        return [
+            {
+                "id_transakcije": row[0],
+                "posilja": row[1],
+                "prejema": row[2],
+                "tip": row[3],
+                "znesek": row[4],
+                "cas": row[5],
+                "opis": row[6],
+                "stanje_posilja": row[7],
+                "stanje_prejema": row[8],
+            }
+            for row in rows
+        ]
 
-    def get_transactions_for_account(self, iban, limit=50):
-        """Pridobi transakcije za določen račun"""
+    def get_recent_transactions(self, id_stranke, limit=10, po=None):
+        """
+        Pridobi zadnje transakcije za stranko.
+        Stran za kazalcem `po` (glej `naslednja_stran`) se začne za zadnjo transakcijo prejšnje strani.
+        """
+        with Kazalec() as cur:
+            cur.execute("SELECT IBAN FROM racun WHERE id_lastnik = ?", (id_stranke,))
+            ibani = [row[0] for row in cur.fetchall()]
+            return self._transakcije_racunov(cur, ibani, limit, po)
+
+    def get_transactions_for_account(self, iban, limit=50, po=None):
+        """
+        Pridobi transakcije za določen račun, od najnovejše naprej.
+
+        Odhodne in prihodne transakcije se preberejo vsaka iz svojega indeksa
+        (posilja, cas) oz. (prejema, cas), zato je vsaka stran enako draga.
+        Vsaka transakcija ima tudi `stanje_po` - stanje računa po njej
+        (None za transakcije, zapisane pred uvedbo tega stolpca).
+        """
         iban = normaliziraj_iban(iban)
         with Kazalec() as cur:
+            transakcije = self._transakcije_racunov(cur, [iban], limit, po)
+        for tr in transakcije:
+            tr["stanje_po"] = tr["stanje_posilja"] if tr["posilja"] == iban else tr["stanje_prejema"]
+        return transakcije
+
+    def _promet_racuna(self, cur, iban, pogoj, parametri, od):
+        """
+        Neto promet računa (prilivi - odlivi, v centih) v transakcijah, katerih
+        `cas` ustreza pogoju `pogoj` s parametri `parametri`.
+
+        Vsota se bere iz indeksov (prejema, cas) in (posilja, cas); arhiv se
+        prišteje le, če interval z začetkom `od` seže do arhiviranih transakcij.
+        """
+        sql = """
+            SELECT (SELECT COALESCE(SUM(znesek), 0) FROM transakcija WHERE prejema = ? AND {pogoj})
+                 - (SELECT COALESCE(SUM(znesek), 0) FROM transakcija WHERE posilja = ? AND {pogoj})
+        """
+        vrednosti = (iban, *parametri, iban, *parametri)
+        cur.execute(sql.format(pogoj=pogoj), vrednosti)
+        neto = cur.fetchone()[0]
+        meja = self._meja_arhiva(cur)
+        if meja is not None and od <= meja:
+            cur.execute(_v_arhivu(sql.format(pogoj=f"{pogoj} {_NI_V_GLAVNI}")), vrednosti)
+            neto += cur.fetchone()[0]
+        return neto
+
+    def get_balance_at(self, iban, ts):
+        """
+        Stanje računa (v centih) ob času `ts` (UTC; datum pomeni konec dneva),
+        upoštevane so vse transakcije do vključno `ts`.
+
+        Začne pri zadnjem posnetku stanja pred dnem `ts` (tabela
+        "stanje_posnetek") in prišteje le promet od konca tega dne do `ts`.
+        Če posnetka ni, se stanje izračuna nazaj od trenutnega stanja.
+
+        Returns: stanje ali None, če račun ne obstaja; ob neveljavnem času
+        sproži ValueError.
+        """
+        iban = normaliziraj_iban(iban)
+        ts = _cas(ts)
+        with Kazalec() as cur:
+            cur.execute("SELECT stanje FROM racun WHERE IBAN = ?", (iban,))
+            row = cur.fetchone()
+            if not row:
+                return None
             cur.execute(
                 """
-                SELECT id_transakcije, posilja, prejema, tip, znesek, cas, opis
-                FROM transakcija
-                WHERE posilja = ? OR prejema = ?
-                ORDER BY cas DESC
-                LIMIT ?
+                SELECT dan, stanje
+                FROM stanje_posnetek
+                WHERE IBAN = ? AND dan < ?
+                ORDER BY dan DESC
+                LIMIT 1
             """,
-                (iban, iban, limit),
+                (iban, ts[:10]),
             )
-            rows = cur.fetchall()
-            return [
-                {
+            posnetek = cur.fetchone()
+            if posnetek is None:
+                return row[0] - self._promet_racuna(cur, iban, "cas > ?", (ts,), ts)
+            od = dnevno_okno(date.fromisoformat(posnetek[0]))[1]
+            return posnetek[1] + self._promet_racuna(
+                cur, iban, "cas >= ? AND cas <= ?", (od, ts), od
+            )
+
+    def get_izpisek(self, iban, od=None, do=None):
+        """
+        Izpisek računa za obdobje od `od` do `do` (datuma, oba vključno;
+        privzeto od začetka letošnjega leta do danes, UTC).
+
+        Vrne slovar z računom, obdobjem, začetnim stanjem (ob koncu dneva
+        pred `od`) in generatorjem `transakcije`, ki transakcije obdobja od
+        najstarejše naprej (vsako s `stanje_po`) bere sproti iz baze, po
+        straneh. Poraba pomnilnika zato ni odvisna od dolžine izpiska, počasen
+        odjemalec pa povezave iz bazena ne zaseda med stranmi.
+
+        Returns: slovar ali None, če račun ne obstaja; ob neveljavnem
+        obdobju sproži ValueError.
+        """
+        iban = normaliziraj_iban(iban)
+        danes = datetime.now(timezone.utc).date()
+        try:
+            od = date.fromisoformat(str(od)) if od else date(danes.year, 1, 1)
+            do = date.fromisoformat(str(do)) if do else danes
+        except ValueError as e:
+            raise ValueError("Neveljaven datum (uporabite obliko LLLL-MM-DD)") from e
+        if od > do:
+            raise ValueError("Začetni datum je za končnim")
+        zacetno_stanje = self.get_balance_at(iban, od - timedelta(days=1))
+        if zacetno_stanje is None:
+            return None
+        return {
+            "iban": iban,
+            "od": od.isoformat(),
+            "do": do.isoformat(),
+            "zacetno_stanje": zacetno_stanje,
+            "transakcije": self._transakcije_izpiska(
+                iban, dnevno_okno(od)[0], dnevno_okno(do)[1], zacetno_stanje
+            ),
+        }
+
+    def _transakcije_izpiska(self, iban, zacetek, konec, stanje, paket=1000):
+        """
+        Generator transakcij računa s časom v [zacetek, konec), od najstarejše
+        naprej, s stanjem računa po vsaki (`stanje_po`).
+
+        Transakcije se berejo po straneh s `paket` vrsticami za ključem
+        (cas, id_transakcije) zadnje prebrane; odhodne in prihodne iz indeksov
+        (posilja, cas) in (prejema, cas), ki ju SQLite zlije brez razvrščanja.
+        Povezava iz bazena je izposojena le med branjem strani, ne ves čas
+        prenosa izpiska. Če stran seže do arhiva, se enaka stran prebere še
+        iz arhiva in zlije. Za transakcije brez shranjenega stanja se stanje
+        računa naprej od `stanje`.
+        """
+        sql = """
+            SELECT id_transakcije, posilja, prejema, tip, znesek, cas, opis,
+                   stanje_posilja, stanje_prejema
+            FROM transakcija
+            WHERE posilja = ? AND (cas, id_transakcije) > (?, ?) AND cas < ?
+            UNION
+            SELECT id_transakcije, posilja, prejema, tip, znesek, cas, opis,
+                   stanje_posilja, stanje_prejema
+            FROM transakcija
+            WHERE prejema = ? AND (cas, id_transakcije) > (?, ?) AND cas < ?
+            ORDER BY cas, id_transakcije
+            LIMIT ?
+        """
+        # Ključ pred prvo transakcijo obdobja (id_transakcije so pozitivni)
+        kljuc = (zacetek, 0)
+        while True:
+            parametri = (iban, *kljuc, konec) * 2 + (paket,)
+            with Kazalec() as cur:
+                cur.execute(sql, parametri)
+                stran = cur.fetchall()
+                meja = self._meja_arhiva(cur)
+                if meja is not None and kljuc[0] <= meja:
+                    cur.execute(_v_arhivu(sql), parametri)
+                    # Med prekinjenim arhiviranjem je lahko vrstica v obeh tabelah
+                    vse = {row[0]: row for row in cur.fetchall()}
+                    vse.update((row[0], row) for row in stran)
+                    stran = sorted(vse.values(), key=lambda row: (row[5], row[0]))[:paket]
+            for row in stran:
+                if row[1] == iban:
+                    stanje -= row[4]
+                    shranjeno = row[7]
+                else:
+                    stanje += row[4]
+                    shranjeno = row[8]
+                if shranjeno is not None:
+                    stanje = shranjeno
+                yield {
                     "id_transakcije": row[0],
                     "posilja": row[1],
                     "prejema": row[2],
@@ -376,13 +882,97 @@ class BankService:
                     "znesek": row[4],
                     "cas": row[5],
                     "opis": row[6],
+                    "stanje_po": stanje,
                 }
-                for row in rows
-            ]
+            if len(stran) < paket:
+                return
+            kljuc = (stran[-1][5], stran[-1][0])
+
+    @staticmethod
+    def _filtri_transakcij(iskanje="", tip=None, znesek_od=None, znesek_do=None, od=None, do=None):
+        """
+        Sestavi dodatne pogoje za iskanje transakcij: besede v opisu (FTS5),
+        tip, razpon zneska (v centih) in razpon datumov (od, do vključno).
+
+        Returns: (pogoj, parametri) - pogoj se začne z AND; ob neveljavnem
+        filtru sproži ValueError.
+        """
+        pogoji = []
+        parametri = []
+        fts = _fts_poizvedba(iskanje)
+        if iskanje and iskanje.strip() and not fts:
+            raise ValueError("Iskalni niz nima besed")
+        if fts:
+            pogoji.append(
+                "id_transakcije IN (SELECT rowid FROM transakcija_fts WHERE transakcija_fts MATCH ?)"
+            )
+            parametri.append(fts)
+        if tip:
+            if tip not in ("polog", "dvig", "nakazilo", "obresti"):
+                raise ValueError("Neveljaven tip transakcije")
+            pogoji.append("tip = ?")
+            parametri.append(tip)
+        if znesek_od is not None:
+            pogoji.append("znesek >= ?")
+            parametri.append(int(znesek_od))
+        if znesek_do is not None:
+            pogoji.append("znesek <= ?")
+            parametri.append(int(znesek_do))
+        try:
+            if od:
+                pogoji.append("cas >= ?")
+                parametri.append(f"{date.fromisoformat(str(od)).isoformat()} 00:00:00")
+            if do:
+                pogoji.append("cas < ?")
+                naslednji = date.fromisoformat(str(do)) + timedelta(days=1)
+                parametri.append(f"{naslednji.isoformat()} 00:00:00")
+        except ValueError as e:
+            raise ValueError("Neveljaven datum (uporabite obliko LLLL-MM-DD)") from e
+        return "".join(f" AND {p}" for p in pogoji), tuple(parametri)
+
+    def _bremeni(self, cur, iban, znesek, tip, ni_racuna):
+        """
+        Zavarovana bremenitev računa znotraj pisalne transakcije.
+
+        Stanje zmanjša le, če je na računu dovolj sredstev, nato preveri še
+        limite paketa. Ob kršitvi sproži ZavrnjenaTransakcija, zato se
+        celotna transakcija razveljavi. Vrne novo stanje računa.
+        """
+        cur.execute(
+            """
+            UPDATE racun SET stanje = stanje - ?
+            WHERE IBAN = ? AND stanje >= ?
+            RETURNING id_paket, (SELECT vrednost FROM verzija WHERE ime = 'paket'), stanje
+        """,
+            (znesek, iban, znesek),
+        )
+        row = cur.fetchone()
+        if not row:
+            cur.execute("SELECT IBAN FROM racun WHERE IBAN = ?", (iban,))
+            if not cur.fetchone():
+                raise ZavrnjenaTransakcija(ni_racuna)
+            raise ZavrnjenaTransakcija("Nezadostna sredstva")
+
+        paket = _paketi.paket(cur, row[1], row[0])
+        if paket and paket["osnovni_limit"] and znesek > paket["osnovni_limit"]:
+            raise ZavrnjenaTransakcija(
+                f"Presežen limit posamezne transakcije ({paket['osnovni_limit'] / 100:.2f} EUR)"
+            )
+
+        if paket and paket["dnevni_limit"]:
+            if self._porabljeno_danes(cur, iban, tip) + znesek > paket["dnevni_limit"]:
+                raise ZavrnjenaTransakcija(
+                    f"Presežen dnevni limit ({paket['dnevni_limit'] / 100:.2f} EUR)"
+                )
+
+        return row[2]
 
     def create_transfer(self, from_iban, to_iban, amount_cents, opis=None):
         """
-        Ustvari nakazilo med računi
+        Ustvari nakazilo med računi.
+
+        Bremenitev, odobritev in vpis v dnevnik se izvedejo v eni kratki
+        transakciji, ki pisalno ključavnico dobi takoj (BEGIN IMMEDIATE).
 
         Returns: (success: bool, message: str)
         """
@@ -401,76 +991,35 @@ class BankService:
             return False, "Ne morete nakazati na isti račun"
 
         try:
-            with get_connection():
-                with Kazalec() as cur:
-                    # Preveri stanje pošiljatelja
-                    cur.execute("SELECT stanje FROM racun WHERE IBAN = ?", (from_iban,))
-                    row = cur.fetchone()
-                    if not row:
-                        return False, "Račun pošiljatelja ne obstaja"
-
-                    if row[0] < amount_cents:
-                        return False, "Nezadostna sredstva"
-
-                    paket = self.get_paket_za_racun(from_iban)
-                    if paket and paket["osnovni_limit"] and amount_cents > paket["osnovni_limit"]:
-                        return (
-                            False,
-                            f"Presežen limit posamezne transakcije ({paket['osnovni_limit'] / 100:.2f} EUR)",
-                        )
-
-                    # Preveri, da prejemnik obstaja
-                    cur.execute("SELECT IBAN FROM racun WHERE IBAN = ?", (to_iban,))
-                    if not cur.fetchone():
-                        return False, "Račun prejemnika ne obstaja"
-
-                    # Preveri dnevni limit
-                    if paket and paket["dnevni_limit"]:
-                        # Preveri koliko je bilo že poslano danes
-                        cur.execute(
-                            """
-                            SELECT COALESCE(SUM(znesek), 0)
-                            FROM transakcija
-                            WHERE posilja = ?
-                            AND tip = 'nakazilo'
-                            AND DATE(cas) = DATE('now')
-                        """,
-                            (from_iban,),
-                        )
-                        daily_total = cur.fetchone()[0]
-
-                        if daily_total + amount_cents > paket["dnevni_limit"]:
-                            return (
-                                False,
-                                f"Presežen dnevni limit ({paket['dnevni_limit'] / 100:.2f} EUR)",
-                            )
-
-                    # Izvedi transakcijo
-                    cur.execute(
-                        """
-                        INSERT INTO transakcija (posilja, prejema, tip, znesek, opis)
-                        VALUES (?, ?, 'nakazilo', ?, ?)
-                    """,
-                        (from_iban, to_iban, amount_cents, opis),
-                    )
-
-                    # Posodobi stanja
-                    cur.execute(
-                        """
-                        UPDATE racun SET stanje = stanje - ? WHERE IBAN = ?
-                    """,
-                        (amount_cents, from_iban),
-                    )
+            with PisalniKazalec() as cur:
+                # Bremeni pošiljatelja (stanje, limit transakcije, dnevni limit)
+                stanje_posilja = self._bremeni(
+                    cur, from_iban, amount_cents, "nakazilo", "Račun pošiljatelja ne obstaja"
+                )
 
-                    cur.execute(
-                        """
-                        UPDATE racun SET stanje = stanje + ? WHERE IBAN = ?
-                    """,
-                        (amount_cents, to_iban),
-                    )
+                # Odobri prejemnika
+                cur.execute(
+                    "UPDATE racun SET stanje = stanje + ? WHERE IBAN = ? RETURNING stanje",
+                    (amount_cents, to_iban),
+                )
+                row = cur.fetchone()
+                if not row:
+                    raise ZavrnjenaTransakcija("Račun prejemnika ne obstaja")
+
+                # V dnevnik se zapišeta tudi stanji obeh računov po nakazilu
+                cur.execute(
+                    """
+                    INSERT INTO transakcija
+                        (posilja, prejema, tip, znesek, opis, stanje_posilja, stanje_prejema)
+                    VALUES (?, ?, 'nakazilo', ?, ?, ?, ?)
+                """,
+                    (from_iban, to_iban, amount_cents, opis, stanje_posilja, row[0]),
+                )
 
-                    return True, f"Nakazilo {amount_cents / 100:.2f} EUR uspešno!"
+            return True, f"Nakazilo {amount_cents / 100:.2f} EUR uspešno!"
 
+        except ZavrnjenaTransakcija as e:
+            return False, str(e)
         except Exception as e:
             logging.error(f"Napaka pri nakazilu: {e}")
             return False, "Napaka pri nakazilu"
@@ -489,32 +1038,28 @@ class BankService:
             return False, "Neveljaven IBAN"
 
         try:
-            with get_connection():
-                with Kazalec() as cur:
-                    # Preveri, da račun obstaja
-                    cur.execute("SELECT IBAN FROM racun WHERE IBAN = ?", (iban,))
-                    if not cur.fetchone():
-                        return False, "Račun ne obstaja"
-
-                    # Izvedi polog
-                    cur.execute(
-                        """
-                        INSERT INTO transakcija (posilja, prejema, tip, znesek, opis)
-                        VALUES (NULL, ?, 'polog', ?, ?)
-                    """,
-                        (iban, amount_cents, opis),
-                    )
-
-                    # Posodobi stanje
-                    cur.execute(
-                        """
-                        UPDATE racun SET stanje = stanje + ? WHERE IBAN = ?
-                    """,
-                        (amount_cents, iban),
-                    )
+            with PisalniKazalec() as cur:
+                # Posodobi stanje (hkrati preveri, da račun obstaja)
+                cur.execute(
+                    "UPDATE racun SET stanje = stanje + ? WHERE IBAN = ? RETURNING stanje",
+                    (amount_cents, iban),
+                )
+                row = cur.fetchone()
+                if not row:
+                    raise ZavrnjenaTransakcija("Račun ne obstaja")
+
+                cur.execute(
+                    """
+                    INSERT INTO transakcija (posilja, prejema, tip, znesek, opis, stanje_prejema)
+                    VALUES (NULL, ?, 'polog', ?, ?, ?)
+                """,
+                    (iban, amount_cents, opis, row[0]),
+                )
 
-                    return True, f"Polog {amount_cents / 100:.2f} EUR uspešen!"
+            return True, f"Polog {amount_cents / 100:.2f} EUR uspešen!"
 
+        except ZavrnjenaTransakcija as e:
+            return False, str(e)
         except Exception as e:
             logging.error(f"Napaka pri pologu: {e}")
             return False, "Napaka pri pologu"
@@ -533,63 +1078,21 @@ class BankService:
             return False, "Neveljaven IBAN"
 
         try:
-            with get_connection():
-                with Kazalec() as cur:
-                    # Preveri stanje
-                    cur.execute("SELECT stanje FROM racun WHERE IBAN = ?", (iban,))
-                    row = cur.fetchone()
-                    if not row:
-                        return False, "Račun ne obstaja"
-
-                    if row[0] < amount_cents:
-                        return False, "Nezadostna sredstva"
-
-                    paket = self.get_paket_za_racun(iban)
-                    if paket and paket["osnovni_limit"] and amount_cents > paket["osnovni_limit"]:
-                        return (
-                            False,
-                            f"Presežen limit posamezne transakcije ({paket['osnovni_limit'] / 100:.2f} EUR)",
-                        )
-
-                    # Preveri dnevni limit
-                    if paket and paket["dnevni_limit"]:
-                        cur.execute(
-                            """
-                            SELECT COALESCE(SUM(znesek), 0)
-                            FROM transakcija
-                            WHERE posilja = ?
-                            AND tip = 'dvig'
-                            AND DATE(cas) = DATE('now')
-                        """,
-                            (iban,),
-                        )
-                        daily_total = cur.fetchone()[0]
-
-                        if daily_total + amount_cents > paket["dnevni_limit"]:
-                            return (
-                                False,
-                                f"Presežen dnevni limit ({paket['dnevni_limit'] / 100:.2f} EUR)",
-                            )
-
-                    # Izvedi dvig
-                    cur.execute(
-                        """
-                        INSERT INTO transakcija (posilja, prejema, tip, znesek, opis)
-                        VALUES (?, NULL, 'dvig', ?, ?)
-                    """,
-                        (iban, amount_cents, opis),
-                    )
-
-                    # Posodobi stanje
-                    cur.execute(
-                        """
-                        UPDATE racun SET stanje = stanje - ? WHERE IBAN = ?
-                    """,
-                        (amount_cents, iban),
-                    )
+            with PisalniKazalec() as cur:
+                stanje = self._bremeni(cur, iban, amount_cents, "dvig", "Račun ne obstaja")
+
+                cur.execute(
+                    """
+                    INSERT INTO transakcija (posilja, prejema, tip, znesek, opis, stanje_posilja)
+                    VALUES (?, NULL, 'dvig', ?, ?, ?)
+                """,
+                    (iban, amount_cents, opis, stanje),
+                )
 
-                    return True, f"Dvig {amount_cents / 100:.2f} EUR uspešen!"
+            return True, f"Dvig {amount_cents / 100:.2f} EUR uspešen!"
 
+        except ZavrnjenaTransakcija as e:
+            return False, str(e)
         except Exception as e:
             logging.error(f"Napaka pri dvigu: {e}")
             return False, "Napaka pri dvigu"
@@ -622,69 +1125,507 @@ class BankService:
                 for row in rows
             ]
 
-    def get_all_transactions(self, limit=100):
-        """Pridobi vse transakcije (admin)"""
+    def search_stranke(self, iskanje="", limit=50, po=None):
+        """
+        Poišči stranke po imenu, priimku ali naslovu (admin), stran za stranjo.
+        Iskanje, ki je samo število, najde tudi stranko s tem ID-jem.
+
+        Stranke so urejene po (priimek, ime, id_stranke), `po` je kazalec na
+        zadnjo stranko prejšnje strani. Iskanje uporablja indeks "stranka_fts",
+        število računov in skupno stanje pa se seštejeta le za stranke na strani.
+        """
+        pogoji = []
+        parametri = []
+        fts = _fts_poizvedba(iskanje)
+        if iskanje and iskanje.strip() and not fts:
+            return []  # samo ločila - nič za iskati
+        if fts:
+            pogoj = "s.id_stranke IN (SELECT rowid FROM stranka_fts WHERE stranka_fts MATCH ?)"
+            if iskanje.strip().isdigit():
+                pogoj = f"(s.id_stranke = ? OR {pogoj})"
+                parametri.append(int(iskanje))
+            pogoji.append(pogoj)
+            parametri.append(fts)
+        if po:
+            pogoji.append("(s.priimek, s.ime, s.id_stranke) > (?, ?, ?)")
+            parametri += odkodiraj_kazalec(po, 3)
+        where = ("WHERE " + " AND ".join(pogoji)) if pogoji else ""
+
         with Kazalec() as cur:
             cur.execute(
-                """
-                SELECT id_transakcije, posilja, prejema, tip, znesek, cas, opis
-                FROM transakcija
-                ORDER BY cas DESC
-                LIMIT ?
+                f"""
+                WITH stran AS (
+                    SELECT s.id_stranke, s.ime, s.priimek, s.naslov, s.datum_rojstva
+                    FROM stranka s
+                    {where}
+                    ORDER BY s.priimek, s.ime, s.id_stranke
+                    LIMIT ?
+                )
+                SELECT st.id_stranke, st.ime, st.priimek, st.naslov, st.datum_rojstva,
+                       COUNT(r.IBAN) as stevilo_racunov,
+                       COALESCE(SUM(r.stanje), 0) as skupno_stanje
+                FROM stran st
+                LEFT JOIN racun r ON r.id_lastnik = st.id_stranke
+                GROUP BY st.id_stranke
+                ORDER BY st.priimek, st.ime, st.id_stranke
             """,
-                (limit,),
+                (*parametri, limit),
             )
             rows = cur.fetchall()
             return [
                 {
-                    "id_transakcije": row[0],
-                    "posilja": row[1],
-                    "prejema": row[2],
-                    "tip": row[3],
-                    "znesek": row[4],
-                    "cas": row[5],
-                    "opis": row[6],
+                    "id_stranke": row[0],
+                    "ime": row[1],
+                    "priimek": row[2],
+                    "naslov": row[3],
+                    "datum_rojstva": row[4],
+                    "stevilo_racunov": row[5],
+                    "skupno_stanje": row[6],
                 }
                 for row in rows
             ]
 
-    def get_statistics(self):
-        """Pridobi statistiko (admin)"""
+    def get_all_transactions(self, limit=100, po=None):
+        """Pridobi vse transakcije (admin), po straneh s kazalcem `po`"""
+        pogoj, parametri = _pogoj_strani(po)
         with Kazalec() as cur:
-            # Število strank
-            cur.execute("SELECT COUNT(*) FROM stranka")
-            total_customers = cur.fetchone()[0]
+            return self._transakcije_z_arhivom(
+                cur,
+                f"""
+                SELECT id_transakcije, posilja, prejema, tip, znesek, cas, opis,
+                       stanje_posilja, stanje_prejema
+                FROM transakcija
+                WHERE 1 {pogoj}
+                ORDER BY cas DESC, id_transakcije DESC
+                LIMIT ?
+            """,
+                (*parametri, limit),
+                limit,
+            )
 
-            # Število računov
-            cur.execute("SELECT COUNT(*) FROM racun")
-            total_accounts = cur.fetchone()[0]
+    def search_transactions(
+        self,
+        iskanje="",
+        iban=None,
+        tip=None,
+        znesek_od=None,
+        znesek_do=None,
+        od=None,
+        do=None,
+        limit=50,
+        po=None,
+    ):
+        """
+        Iskanje transakcij (admin): besede v opisu (indeks "transakcija_fts")
+        skupaj s filtri po računu, tipu, znesku (v centih) in datumu.
 
-            # Skupna vrednost vseh računov
-            cur.execute("SELECT COALESCE(SUM(stanje), 0) FROM racun")
-            total_balance = cur.fetchone()[0]
+        Rezultati so urejeni od najnovejše naprej in razdeljeni na strani s
+        kazalcem `po` kot pri `get_all_transactions`. Če je podan IBAN, se
+        transakcije berejo iz indeksov računa (glej `_transakcije_racunov`).
+        Ob neveljavnem filtru ali kazalcu sproži ValueError.
+        """
+        filtri = self._filtri_transakcij(iskanje, tip, znesek_od, znesek_do, od, do)
+        with Kazalec() as cur:
+            if iban:
+                return self._transakcije_racunov(
+                    cur, [normaliziraj_iban(iban)], limit, po, filtri
+                )
 
-            # Število transakcij danes
+            pogoj, parametri = _pogoj_strani(po)
+            return self._transakcije_z_arhivom(
+                cur,
+                f"""
+                SELECT id_transakcije, posilja, prejema, tip, znesek, cas, opis,
+                       stanje_posilja, stanje_prejema
+                FROM transakcija
+                WHERE 1 {filtri[0]} {pogoj}
+                ORDER BY cas DESC, id_transakcije DESC
+                LIMIT ?
+            """,
+                (*filtri[1], *parametri, limit),
+                limit,
+            )
+
+    def get_statistics(self):
+        """
+        Pridobi statistiko (admin).
+        Števci v tabeli "statistika" se vzdržujejo sproti, zato je to en kratek dostop.
+        """
+        with Kazalec() as cur:
             cur.execute("""
-                SELECT COUNT(*) FROM transakcija 
-                WHERE DATE(cas) = DATE('now')
+                SELECT CASE WHEN ime LIKE 'transakcije:%' THEN 'danes' ELSE ime END, vrednost
+                FROM statistika
+                WHERE ime IN ('stranke', 'racuni', 'stanje', 'transakcije', 'transakcije:' || DATE('now'))
             """)
-            transactions_today = cur.fetchone()[0]
+            vrednosti = dict(cur.fetchall())
 
-            # Število transakcij vse skupaj
-            cur.execute("SELECT COUNT(*) FROM transakcija")
-            total_transactions = cur.fetchone()[0]
+        total_accounts = vrednosti.get("racuni", 0)
+        total_balance = vrednosti.get("stanje", 0)
 
+        return {
+            "total_customers": vrednosti.get("stranke", 0),
+            "total_accounts": total_accounts,
+            "total_balance": total_balance,
+            "transactions_today": vrednosti.get("danes", 0),
+            "total_transactions": vrednosti.get("transakcije", 0),
             # Povprečno stanje na računu
-            avg_balance = total_balance / total_accounts if total_accounts > 0 else 0
-
-            return {
-                "total_customers": total_customers,
-                "total_accounts": total_accounts,
-                "total_balance": total_balance,
-                "transactions_today": transactions_today,
-                "total_transactions": total_transactions,
-                "avg_balance": avg_balance,
-            }
+            "avg_balance": total_balance / total_accounts if total_accounts > 0 else 0,
+        }
+
+    def rebuild_statistika(self):
+        """
+        Ponovno izračunaj statistiko iz vseh podatkov in jo primerjaj
+        s sprotno vzdrževanimi števci.
+
+        Returns: (success: bool, message: str) - success je False tudi,
+        če se števci niso ujemali (v tem primeru so popravljeni).
+        """
+        try:
+            with PisalniKazalec() as cur:
+                cur.execute("SELECT ime, vrednost FROM statistika WHERE vrednost != 0")
+                sprotno = dict(cur.fetchall())
+                izracunano = {
+                    ime: vrednost
+                    for ime, vrednost in Statistika.izracunaj(cur).items()
+                    if vrednost != 0
+                }
+                razlike = [
+                    f"{ime}: {sprotno.get(ime, 0)} -> {izracunano.get(ime, 0)}"
+                    for ime in sorted(sprotno.keys() | izracunano.keys())
+                    if sprotno.get(ime, 0) != izracunano.get(ime, 0)
+                ]
+                Statistika.obnovi(cur)
+        except Exception as e:
+            logging.error(f"Napaka pri obnovi statistike: {e}")
+            return False, "Napaka pri obnovi statistike"
+
+        if razlike:
+            return False, "Statistika se ni ujemala in je popravljena (" + ", ".join(razlike) + ")"
+        return True, f"Statistika se ujema ({len(izracunano)} števcev)"
+
+    def rebuild_dnevna_poraba(self):
+        """
+        Ponovno izračunaj tabelo dnevne porabe iz vseh transakcij (popravilo).
+
+        Returns: (success: bool, message: str)
+        """
+        try:
+            with get_connection():
+                with Kazalec() as cur:
+                    DnevnaPoraba.obnovi(cur)
+                    cur.execute("SELECT COUNT(*) FROM dnevna_poraba")
+                    return True, f"Dnevna poraba obnovljena ({cur.fetchone()[0]} vrstic)"
+        except Exception as e:
+            logging.error(f"Napaka pri obnovi dnevne porabe: {e}")
+            return False, "Napaka pri obnovi dnevne porabe"
+
+    def rebuild_stanja_transakcij(self):
+        """
+        Ponovno izračunaj stanji računov po vsaki transakciji (stolpca
+        stanje_posilja in stanje_prejema, tudi v arhivu), npr. za transakcije,
+        zapisane pred uvedbo teh stolpcev ali z neposrednim uvozom.
+
+        Stanje po transakciji je trenutno stanje računa, zmanjšano za promet
+        vseh poznejših transakcij računa (po ključu cas, id_transakcije).
+
+        Returns: (success: bool, message: str)
+        """
+        try:
+            with PisalniKazalec() as cur:
+                vrstice = "SELECT id_transakcije, posilja, prejema, znesek, cas FROM transakcija"
+                tabele = ["transakcija"]
+                if self._meja_arhiva(cur) is not None:
+                    vrstice += " UNION " + _v_arhivu(vrstice)
+                    tabele.append("arhiv.transakcija")
+
+                cur.execute("DROP TABLE IF EXISTS temp.stanje_po")
+                cur.execute("""
+                    CREATE TEMP TABLE stanje_po (
+                        id_transakcije  INTEGER  NOT NULL,
+                        prejema         INTEGER  NOT NULL, -- 1 za prejemnika, 0 za pošiljatelja
+                        stanje          INTEGER  NOT NULL,
+                        PRIMARY KEY (id_transakcije, prejema)
+                    ) WITHOUT ROWID
+                """)
+                cur.execute(f"""
+                    WITH vrstice AS ({vrstice}),
+                    premiki AS (
+                        SELECT id_transakcije, cas, prejema AS IBAN, znesek AS neto, 1 AS prejema
+                        FROM vrstice WHERE prejema IS NOT NULL
+                        UNION ALL
+                        SELECT id_transakcije, cas, posilja, -znesek, 0
+                        FROM vrstice WHERE posilja IS NOT NULL
+                    )
+                    INSERT INTO stanje_po (id_transakcije, prejema, stanje)
+                    SELECT p.id_transakcije, p.prejema,
+                           r.stanje - COALESCE(SUM(p.neto) OVER (
+                               PARTITION BY p.IBAN
+                               ORDER BY p.cas DESC, p.id_transakcije DESC
+                               ROWS BETWEEN UNBOUNDED PRECEDING AND 1 PRECEDING
+                           ), 0)
+                    FROM premiki p
+                    JOIN racun r ON r.IBAN = p.IBAN
+                """)
+                posodobljene = 0
+                for tabela in tabele:
+                    cur.execute(f"""
+                        UPDATE {tabela} SET
+                            stanje_posilja = (SELECT stanje FROM stanje_po
+                                              WHERE id_transakcije = transakcija.id_transakcije
+                                                AND prejema = 0),
+                            stanje_prejema = (SELECT stanje FROM stanje_po
+                                              WHERE id_transakcije = transakcija.id_transakcije
+                                                AND prejema = 1)
+                    """)
+                    posodobljene += cur.rowcount
+                cur.execute("DROP TABLE temp.stanje_po")
+        except Exception as e:
+            logging.error(f"Napaka pri obnovi stanj po transakcijah: {e}")
+            return False, "Napaka pri obnovi stanj po transakcijah"
+
+        return True, f"Stanja po transakcijah obnovljena ({posodobljene} transakcij)"
+
+    def arhiviraj_transakcije(self, starejse_od_dni=ARHIV_PO_DNEH, paket=10000):
+        """
+        Prestavi transakcije, starejše od `starejse_od_dni` dni (šteje se
+        od polnoči UTC), v arhiv (tabela "transakcija" v shemi "arhiv").
+
+        Transakcije se prestavijo od najstarejše naprej v paketih po `paket`
+        vrstic. V načinu WAL potrditev ni atomarna čez obe datoteki, zato se
+        paket najprej potrdi v arhivu (INSERT OR IGNORE) in šele nato v drugi
+        kratki transakciji izbriše iz glavne tabele - le vrstice, ki so že v
+        arhivu. Prekinitev vmes pusti vrstice v obeh tabelah (branje jih zlije),
+        ponoven zagon pa arhiviranje nadaljuje. Števci statistike arhivirane
+        transakcije štejejo še naprej.
+
+        Returns: (success: bool, message: str)
+        """
+        if starejse_od_dni < 1 or paket < 1:
+            return False, "Arhivirati je mogoče le transakcije, starejše od enega dneva"
+        meja = dnevno_okno(
+            datetime.now(timezone.utc).date() - timedelta(days=starejse_od_dni)
+        )[0]
+        arhivirano = 0
+        try:
+            with PisalniKazalec() as cur:
+                TransakcijaArhiv.ustvari_tabelo(cur)
+            while True:
+                with PisalniKazalec() as cur:
+                    # Ključa (cas, id_transakcije) prve in zadnje transakcije v paketu
+                    cur.execute(
+                        """
+                        SELECT cas, id_transakcije
+                        FROM transakcija
+                        WHERE cas < ?
+                        ORDER BY cas, id_transakcije
+                        LIMIT 1
+                    """,
+                        (meja,),
+                    )
+                    prva = cur.fetchone()
+                    if prva is None:
+                        break
+                    cur.execute(
+                        """
+                        SELECT cas, id_transakcije
+                        FROM transakcija
+                        WHERE cas < ?
+                        ORDER BY cas, id_transakcije
+                        LIMIT 1 OFFSET ?
+                    """,
+                        (meja, paket - 1),
+                    )
+                    zadnja = cur.fetchone()
+                    if zadnja is None:
+                        cur.execute(
+                            """
+                            SELECT cas, id_transakcije
+                            FROM transakcija
+                            WHERE cas < ?
+                            ORDER BY cas DESC, id_transakcije DESC
+                            LIMIT 1
+                        """,
+                            (meja,),
+                        )
+                        zadnja = cur.fetchone()
+                    cur.execute(
+                        """
+                        INSERT OR IGNORE INTO arhiv.transakcija
+                            (id_transakcije, posilja, prejema, tip, znesek, cas, opis,
+                             stanje_posilja, stanje_prejema)
+                        SELECT id_transakcije, posilja, prejema, tip, znesek, cas, opis,
+                               stanje_posilja, stanje_prejema
+                        FROM transakcija
+                        WHERE (cas, id_transakcije) BETWEEN (?, ?) AND (?, ?)
+                    """,
+                        (*prva, *zadnja),
+                    )
+
+                with PisalniKazalec() as cur:
+                    izbor = """
+                        FROM transakcija
+                        WHERE (cas, id_transakcije) BETWEEN (?, ?) AND (?, ?)
+                          AND id_transakcije IN (
+                              SELECT id_transakcije FROM arhiv.transakcija
+                              WHERE (cas, id_transakcije) BETWEEN (?, ?) AND (?, ?)
+                          )
+                    """
+                    kljuci = (*prva, *zadnja) * 2
+                    # Sprožilec ob brisanju jih odšteje od števcev, zato jih prištej
+                    Statistika.pristej_transakcije(cur, f"SELECT cas {izbor}", kljuci)
+                    cur.execute(f"DELETE {izbor}", kljuci)
+                    arhivirano += cur.rowcount
+        except Exception as e:
+            logging.error(f"Napaka pri arhiviranju transakcij: {e}")
+            return False, f"Napaka pri arhiviranju transakcij (arhiviranih {arhivirano})"
+
+        return True, f"Arhiviranih {arhivirano} transakcij, starejših od {meja[:10]}"
+
+    def _naslednji_dan_prometa(self, cur, od):
+        """
+        Prvi dan (UTC) s kakšno transakcijo ob času `od` ali pozneje (ali None).
+        """
+        sql = "SELECT MIN(cas) FROM transakcija WHERE cas >= ?"
+        cur.execute(sql, (od,))
+        casi = [cur.fetchone()[0]]
+        meja = self._meja_arhiva(cur)
+        if meja is not None and od <= meja:
+            cur.execute(_v_arhivu(sql), (od,))
+            casi.append(cur.fetchone()[0])
+        casi = [cas for cas in casi if cas is not None]
+        return date.fromisoformat(min(casi)[:10]) if casi else None
+
+    def _zadnji_posnetki(self, cur):
+        """
+        Zadnji dan s posnetkom za vsak račun in prvi dan (UTC), od katerega
+        ima kateri od računov promet za svojim zadnjim posnetkom (ali None).
+
+        Returns: (slovar IBAN -> dan ali None, dan ali None)
+        """
+        sql = """
+            SELECT IBAN, zadnji,
+                   (SELECT MIN(cas) FROM transakcija WHERE posilja = z.IBAN AND cas >= z.od),
+                   (SELECT MIN(cas) FROM transakcija WHERE prejema = z.IBAN AND cas >= z.od)
+            FROM (
+                SELECT IBAN, zadnji, COALESCE(DATE(zadnji, '+1 day'), '') AS od
+                FROM (
+                    SELECT r.IBAN,
+                           (SELECT MAX(p.dan) FROM stanje_posnetek p WHERE p.IBAN = r.IBAN) AS zadnji
+                    FROM racun r
+                )
+            ) AS z
+        """
+        cur.execute(sql)
+        vrstice = cur.fetchall()
+        if self._meja_arhiva(cur) is not None:
+            cur.execute(_v_arhivu(sql))
+            vrstice += cur.fetchall()
+        zadnji = {}
+        casi = []
+        for iban, dan, *prvi in vrstice:
+            zadnji[iban] = dan
+            casi += [cas for cas in prvi if cas is not None]
+        return zadnji, date.fromisoformat(min(casi)[:10]) if casi else None
+
+    def create_stanje_posnetki(self, do_dne=None):
+        """
+        Nočno opravilo: dopolni posnetke stanj ob koncu dneva (tabela
+        "stanje_posnetek") do vključno dneva `do_dne` (privzeto včeraj, UTC).
+
+        Vsak račun nadaljuje za svojim zadnjim posnetkom (posnetke za nazaj
+        vstavljene transakcije izbriše sprožilec le za udeležena računa).
+        Obdela le dneve s prometom, vsakega v svoji kratki pisalni
+        transakciji. Stanje računa ob koncu dneva je njegov prejšnji
+        posnetek, povečan za promet tega dne; za račun brez posnetka se
+        izračuna nazaj od trenutnega stanja.
+
+        Returns: (success: bool, message: str)
+        """
+        danes = datetime.now(timezone.utc).date()
+        do_dne = date.fromisoformat(str(do_dne)) if do_dne else danes - timedelta(days=1)
+        if do_dne >= danes:
+            return False, "Posnetke stanj je mogoče narediti le za pretekle dneve"
+        dnevi = 0
+        posnetki = 0
+        try:
+            with Kazalec() as cur:
+                zadnji, dan = self._zadnji_posnetki(cur)
+
+            while dan is not None and dan <= do_dne:
+                zacetek, konec = dnevno_okno(dan)
+                with PisalniKazalec() as cur:
+                    promet = """
+                        SELECT prejema AS IBAN, znesek AS neto FROM transakcija
+                        WHERE cas >= ? AND cas < ? AND prejema IS NOT NULL {izloci}
+                        UNION ALL
+                        SELECT posilja, -znesek FROM transakcija
+                        WHERE cas >= ? AND cas < ? AND posilja IS NOT NULL {izloci}
+                    """
+                    parametri = (zacetek, konec) * 2
+                    meja = self._meja_arhiva(cur)
+                    if meja is not None and zacetek <= meja:
+                        promet = (
+                            promet.format(izloci="")
+                            + " UNION ALL "
+                            + _v_arhivu(promet.format(izloci=_NI_V_GLAVNI))
+                        )
+                        parametri *= 2
+                    else:
+                        promet = promet.format(izloci="")
+                    cur.execute(
+                        f"""
+                        SELECT d.IBAN, d.neto, r.stanje,
+                               (SELECT p.stanje FROM stanje_posnetek p
+                                WHERE p.IBAN = d.IBAN AND p.dan < ?
+                                ORDER BY p.dan DESC LIMIT 1)
+                        FROM (SELECT IBAN, SUM(neto) AS neto FROM ({promet}) GROUP BY IBAN) AS d
+                        JOIN racun r ON r.IBAN = d.IBAN
+                    """,
+                        (dan.isoformat(), *parametri),
+                    )
+                    vrstice = []
+                    for iban, neto, stanje, prejsnji in cur.fetchall():
+                        if zadnji.get(iban) is not None and dan.isoformat() <= zadnji[iban]:
+                            continue  # račun ima posnetek tega dne že od prej
+                        if prejsnji is None:
+                            prejsnji = stanje - neto - self._promet_racuna(
+                                cur, iban, "cas >= ?", (konec,), konec
+                            )
+                        vrstice.append((iban, dan.isoformat(), prejsnji + neto))
+                    cur.executemany(
+                        "INSERT OR REPLACE INTO stanje_posnetek (IBAN, dan, stanje) VALUES (?, ?, ?)",
+                        vrstice,
+                    )
+                    posnetki += len(vrstice)
+                    dnevi += 1
+                    dan = self._naslednji_dan_prometa(cur, konec)
+        except Exception as e:
+            logging.error(f"Napaka pri posnetkih stanj: {e}")
+            return False, f"Napaka pri posnetkih stanj (obdelanih {dnevi} dni)"
+
+        return True, f"Posnetih {posnetki} stanj v {dnevi} dneh (do {do_dne.isoformat()})"
+
+    def uvozi_csv(self, tabela, pot, paket=50000, napredek=None):
+        """
+        Paketno naloži CSV datoteko `pot` v tabelo `tabela` (glej
+        `Tabela.nalozi`). Prekinjeno nalaganje se ob ponovnem klicu z isto
+        datoteko nadaljuje, že naložena datoteka pa se preskoči.
+
+        Returns: (success: bool, message: str)
+        """
+        razredi = {t.IME: t for t in Tabela.TABELE if getattr(t, "VIR", None)}
+        if tabela not in razredi:
+            return False, f"Neznana tabela (na voljo: {', '.join(razredi)})"
+        if paket < 1:
+            return False, "Velikost paketa mora biti vsaj 1"
+        try:
+            vrstic = razredi[tabela].nalozi(pot, paket, napredek)
+        except (OSError, ValueError) as e:
+            return False, str(e)
+        except Exception as e:
+            logging.error(f"Napaka pri nalaganju {pot}: {e}")
+            return False, f"Napaka pri nalaganju (ponoven zagon nadaljuje za zadnjim paketom): {e}"
+        return True, f"V tabelo {tabela} naloženih {vrstic} vrstic"
 
     def add_stranka(self, ime, priimek, naslov, datum_rojstva):
         """
@@ -757,24 +1698,10 @@ class BankService:
             ]
 
     def get_all_paketi(self):
-        """Pridobi vse pakete"""
+        """Pridobi vse pakete (iz predpomnilnika paketov)"""
         with Kazalec() as cur:
-            cur.execute("""
-                SELECT id_paket, tip, cena, osnovni_limit, dnevni_limit
-                FROM paket
-                ORDER BY id_paket
-            """)
-            rows = cur.fetchall()
-            return [
-                {
-                    "id_paket": row[0],
-                    "tip": row[1],
-                    "cena": row[2],
-                    "osnovni_limit": row[3],
-                    "dnevni_limit": row[4],
-                }
-                for row in rows
-            ]
+            cur.execute("SELECT vrednost FROM verzija WHERE ime = 'paket'")
+            return _paketi.vsi(cur, cur.fetchone()[0])
 
     def add_racun(self, iban, id_lastnik, id_paket, stanje=0):
         """
@@ -856,26 +1783,30 @@ class BankService:
         """
         iban = normaliziraj_iban(iban)
         try:
-            with get_connection():
-                with Kazalec() as cur:
-                    # Preveri, da račun obstaja
-                    cur.execute(
-                        "SELECT IBAN, stanje FROM racun WHERE IBAN = ?", (iban,)
-                    )
-                    row = cur.fetchone()
-                    if not row:
-                        return False, "Račun ne obstaja"
-
-                    # Izbriši povezane transakcije
-                    cur.execute(
-                        "DELETE FROM transakcija WHERE posilja = ? OR prejema = ?",
-                        (iban, iban),
-                    )
+            # Arhiv je ločena datoteka, v načinu WAL pa potrditev čez več
+            # datotek ni atomarna - zato se arhiv počisti v svoji transakciji
+            # pred glavno bazo. Če se brisanje vmes prekine, ostane račun
+            # z neizbrisanimi transakcijami in ponovni klic ga izbriše do konca.
+            with PisalniKazalec() as cur:
+                # Preveri, da račun obstaja
+                cur.execute("SELECT IBAN, stanje FROM racun WHERE IBAN = ?", (iban,))
+                if not cur.fetchone():
+                    return False, "Račun ne obstaja"
+                self._izbrisi_iz_arhiva(cur, "posilja = ? OR prejema = ?", (iban, iban))
+
+            with PisalniKazalec() as cur:
+                # Izbriši povezane transakcije (indeksa (posilja, cas) in (prejema, cas))
+                cur.execute(
+                    "DELETE FROM transakcija WHERE posilja = ? OR prejema = ?",
+                    (iban, iban),
+                )
+                cur.execute("DELETE FROM dnevna_poraba WHERE IBAN = ?", (iban,))
+                cur.execute("DELETE FROM stanje_posnetek WHERE IBAN = ?", (iban,))
 
-                    # Izbriši račun
-                    cur.execute("DELETE FROM racun WHERE IBAN = ?", (iban,))
+                # Izbriši račun
+                cur.execute("DELETE FROM racun WHERE IBAN = ?", (iban,))
 
-                    return True, f"Račun {iban} uspešno izbrisan"
+                return True, f"Račun {iban} uspešno izbrisan"
         except Exception as e:
             logging.error(f"Napaka pri brisanju računa: {e}")
             return False, "Napaka pri brisanju računa"
@@ -940,6 +1871,7 @@ class BankService:
                     )
 
                     id_paket = cur.lastrowid
+                    _paketi.razveljavi()
                     return True, f"Paket '{tip}' uspešno dodan", id_paket
         except Exception as e:
             logging.error(f"Napaka pri dodajanju paketa: {e}")
@@ -987,6 +1919,7 @@ class BankService:
                         ),
                     )
 
+                    _paketi.razveljavi()
                     return True, "Paket uspešno posodobljen"
         except Exception as e:
             logging.error(f"Napaka pri posodabljanju paketa: {e}")
@@ -1019,6 +1952,7 @@ class BankService:
                         )
 
                     cur.execute("DELETE FROM paket WHERE id_paket = ?", (id_paket,))
+                    _paketi.razveljavi()
                     return True, "Paket uspešno izbrisan"
         except Exception as e:
             logging.error(f"Napaka pri brisanju paketa: {e}")
@@ -1030,44 +1964,67 @@ class BankService:
 
         Returns: (success: bool, message: str)
         """
+        racuni = "SELECT IBAN FROM racun WHERE id_lastnik = ?"
         try:
-            with get_connection():
-                with Kazalec() as cur:
-                    # Preveri, če stranka obstaja
-                    cur.execute(
-                        "SELECT id_stranke FROM stranka WHERE id_stranke = ?",
-                        (id_stranke,),
-                    )
-                    if not cur.fetchone():
-                        return False, "Stranka ne obstaja"
+            # Najprej arhiv v svoji transakciji (glej `delete_racun`)
+            with PisalniKazalec() as cur:
+                # Preveri, če stranka obstaja
+                cur.execute(
+                    "SELECT id_stranke FROM stranka WHERE id_stranke = ?",
+                    (id_stranke,),
+                )
+                if not cur.fetchone():
+                    return False, "Stranka ne obstaja"
+                self._izbrisi_iz_arhiva(
+                    cur,
+                    f"posilja IN ({racuni}) OR prejema IN ({racuni})",
+                    (id_stranke, id_stranke),
+                )
 
-                    # Pridobi vse račune stranke
+            with PisalniKazalec() as cur:
+                # Izbriši vse transakcije povezane z računi stranke - en stavek,
+                # ki bere indeksa (posilja, cas) in (prejema, cas). Večina časa gre
+                # za vzdrževanje indeksov, zato ima brisanje začasno večji
+                # predpomnilnik (kot profil 'batch'), da strani indeksov ostanejo v njem.
+                cur.execute("PRAGMA cache_size")
+                (predpomnilnik,) = cur.fetchone()
+                cur.execute(f"PRAGMA cache_size = {PROFILI['batch']['cache_size']}")
+                try:
                     cur.execute(
-                        "SELECT IBAN FROM racun WHERE id_lastnik = ?", (id_stranke,)
+                        """
+                        DELETE FROM transakcija
+                        WHERE posilja IN (SELECT IBAN FROM racun WHERE id_lastnik = ?)
+                           OR prejema IN (SELECT IBAN FROM racun WHERE id_lastnik = ?)
+                    """,
+                        (id_stranke, id_stranke),
                     )
-                    ibans = [row[0] for row in cur.fetchall()]
-
-                    # Izbriši vse transakcije povezane z računi
-                    for iban in ibans:
-                        cur.execute(
-                            "DELETE FROM transakcija WHERE posilja = ? OR prejema = ?",
-                            (iban, iban),
-                        )
-
-                    # Izbriši vse račune
-                    cur.execute("DELETE FROM racun WHERE id_lastnik = ?", (id_stranke,))
+                finally:
+                    cur.execute(f"PRAGMA cache_size = {predpomnilnik}")
+
+                # Izbriši dnevno porabo, posnetke stanj in vse račune
+                cur.execute(
+                    """
+                    DELETE FROM dnevna_poraba
+                    WHERE IBAN IN (SELECT IBAN FROM racun WHERE id_lastnik = ?)
+                """,
+                    (id_stranke,),
+                )
+                cur.execute(
+                    """
+                    DELETE FROM stanje_posnetek
+                    WHERE IBAN IN (SELECT IBAN FROM racun WHERE id_lastnik = ?)
+                """,
+                    (id_stranke,),
+                )
+                cur.execute("DELETE FROM racun WHERE id_lastnik = ?", (id_stranke,))
 
-                    # Izbriši uporabnika
-                    cur.execute(
-                        "DELETE FROM uporabnik WHERE id_stranke = ?", (id_stranke,)
-                    )
+                # Izbriši uporabnika
+                cur.execute("DELETE FROM uporabnik WHERE id_stranke = ?", (id_stranke,))
 
-                    # Izbriši stranko
-                    cur.execute(
-                        "DELETE FROM stranka WHERE id_stranke = ?", (id_stranke,)
-                    )
+                # Izbriši stranko
+                cur.execute("DELETE FROM stranka WHERE id_stranke = ?", (id_stranke,))
 
-                    return True, "Stranka in vsi povezani podatki uspešno izbrisani"
+                return True, "Stranka in vsi povezani podatki uspešno izbrisani"
         except Exception as e:
             logging.error(f"Napaka pri brisanju stranke: {e}")
             return False, "Napaka pri brisanju stranke"
@@ -0,0 +1,327 @@
+"""
+Obremenitveni test pravilnosti nakazil in dvigov ob sočasnem izvajanju
+
+Skripta v začasni mapi ustvari bazo z nekaj "vročimi" računi z dnevnim
+limitom, nato iz več niti v enem ali več procesih hkrati izvaja naključna
+nakazila, dvige in pologe. Na koncu preveri:
+
+- denar je ohranjen: vsota stanj je enaka začetni vsoti, povečani za
+  uspešne pologe in zmanjšani za uspešne dvige, ki so jih našteli delavci,
+  v dnevniku pa je natanko toliko transakcij vsakega tipa (z enakimi
+  vsotami), kot so jih delavci izvedli,
+- nobeno stanje ni negativno,
+- dnevni limit nakazil in dvigov nobenega računa ni presežen, tabela
+  `dnevna_poraba` pa se ujema z dnevnikom (v obe smeri),
+- ponovno predvajan dnevnik (po vrstnem redu vpisa) da ista stanja po
+  vsaki transakciji (`stanje_posilja`, `stanje_prejema`) in na koncu
+  stanje vsakega računa, vmes pa nobeno stanje ni negativno.
+
+Izpiše dosežen TPS ter število zavrnjenih in neuspelih operacij po tipih.
+Privzeti zneski so dovolj veliki, da se računi izpraznijo in dosežejo
+dnevni limit; test spodleti tudi, če nobena operacija ni zavrnjena zaradi
+nezadostnih sredstev ali (z limitom) zaradi dnevnega limita, saj sicer
+tekme za zadnja sredstva in limit ne preizkusi.
+
+Uporaba:
+    python stress_test.py [--niti 8] [--procesi 1] [--nakazila 500] [--racuni 5]
+                          [--dvigi 0.2] [--pologi 0.2] [--dnevni-limit 1000000]
+                          [--najvecji-znesek 50000]
+"""
+
+import argparse
+import multiprocessing
+import os
+import random
+import sys
+import tempfile
+import threading
+import time
+from collections import Counter
+
+import model
+from services import BankService, izracunaj_iban_kontrolni_stev
+
+ZACETNO_STANJE = 100000  # centi na račun
+
+
+def generiraj_ibane(stevilo, rng):
+    """Vrne `stevilo` različnih veljavnih slovenskih IBAN-ov."""
+    ibani = set()
+    while len(ibani) < stevilo:
+        bban = f"{rng.randint(0, 999999999999999):015d}"
+        ibani.add(f"SI{izracunaj_iban_kontrolni_stev(bban)}{bban}")
+    return sorted(ibani)
+
+
+def pripravi_bazo(ibani, dnevni_limit):
+    """
+    Ustvari prazno bazo v začasni mapi in račune napolni s pologi,
+    tako da je stanje vsakega računa enako seštevku njegovih transakcij.
+    """
+    os.chdir(tempfile.mkdtemp(prefix="banka_stress_"))
+    with model.get_connection():
+        with model.Kazalec() as cur:
+            model.ustvari_tabele(cur=cur)
+            cur.execute(
+                "INSERT INTO stranka (id_stranke, ime, priimek, naslov, datum_rojstva) "
+                "VALUES (1, 'Marko', 'Novak', 'Dunajska 1', '1990-01-01')"
+            )
+            # Brez limita posamezne transakcije, dnevni limit 0 pomeni brez limita
+            cur.execute(
+                "INSERT INTO paket (id_paket, tip, cena, osnovni_limit, dnevni_limit) "
+                "VALUES (1, 'Stress', 0, NULL, ?)",
+                (dnevni_limit,),
+            )
+            cur.executemany(
+                "INSERT INTO racun (IBAN, id_lastnik, id_paket, stanje) VALUES (?, 1, 1, 0)",
+                [(iban,) for iban in ibani],
+            )
+    bank = BankService()
+    for iban in ibani:
+        bank.create_deposit(iban, ZACETNO_STANJE, "začetno stanje")
+
+
+def delavec(ibani, stevilo, seme, delezi, najvec, izidi, zneski, zaklep):
+    """
+    Izvede `stevilo` naključnih nakazil, dvigov in pologov (`delezi` sta
+    deleža dvigov in pologov) z zneski do `najvec` ter prešteje izide po
+    sporočilih in vsote uspešnih zneskov po tipih.
+    """
+    bank = BankService()
+    rng = random.Random(seme)
+    moji_izidi, moji_zneski = Counter(), Counter()
+    for _ in range(stevilo):
+        od, za = rng.sample(ibani, 2)
+        znesek = rng.randint(1, najvec)
+        izbira = rng.random()
+        if izbira < delezi[0]:
+            tip = "dvig"
+            success, message = bank.create_withdrawal(od, znesek)
+        elif izbira < delezi[0] + delezi[1]:
+            tip = "polog"
+            success, message = bank.create_deposit(od, znesek)
+        else:
+            tip = "nakazilo"
+            success, message = bank.create_transfer(od, za, znesek)
+        moji_izidi[(tip, "uspešno" if success else message)] += 1
+        if success:
+            moji_zneski[tip] += znesek
+    with zaklep:
+        izidi.update(moji_izidi)
+        zneski.update(moji_zneski)
+
+
+def izvedi(ibani, niti, stevilo, seme, delezi, najvec):
+    """Izvede `niti` delavcev v niteh tega procesa in vrne (izidi, zneski)."""
+    izidi, zneski = Counter(), Counter()
+    zaklep = threading.Lock()
+    seznam = [
+        threading.Thread(
+            target=delavec,
+            args=(ibani, stevilo, seme + i, delezi, najvec, izidi, zneski, zaklep),
+        )
+        for i in range(niti)
+    ]
+    for nit in seznam:
+        nit.start()
+    for nit in seznam:
+        nit.join()
+    return izidi, zneski
+
+
+def proces(mapa, ibani, niti, stevilo, seme, delezi, najvec, zacni, vrsta):
+    """Vstopna točka procesa: počaka na začetek testa in rezultat pošlje v `vrsta`."""
+    os.chdir(mapa)
+    zacni.wait()
+    vrsta.put(izvedi(ibani, niti, stevilo, seme, delezi, najvec))
+
+
+def preveri_invariante(ibani, izidi, zneski, dnevni_limit):
+    """Vrne seznam kršitev invariant (prazen seznam pomeni, da je vse v redu)."""
+    krsitve = []
+    zacetna_vsota = ZACETNO_STANJE * len(ibani)
+    with model.Kazalec() as cur:
+        cur.execute("SELECT COALESCE(SUM(stanje), 0), MIN(stanje) FROM racun")
+        skupaj, najmanj = cur.fetchone()
+        if skupaj != zacetna_vsota + zneski["polog"] - zneski["dvig"]:
+            krsitve.append(
+                f"Vsota stanj {skupaj} != {zacetna_vsota} + pologi {zneski['polog']} - dvigi {zneski['dvig']}"
+            )
+        if najmanj < 0:
+            krsitve.append(f"Negativno stanje: {najmanj}")
+
+        # Dnevnik mora vsebovati natanko uspešne operacije delavcev
+        cur.execute("SELECT tip, COUNT(*), SUM(znesek) FROM transakcija GROUP BY tip")
+        v_dnevniku = {tip: (stevilo, vsota) for tip, stevilo, vsota in cur.fetchall()}
+        pricakovano = {"polog": (len(ibani) + izidi[("polog", "uspešno")], zacetna_vsota + zneski["polog"])}
+        for tip in ("nakazilo", "dvig"):
+            if izidi[(tip, "uspešno")]:
+                pricakovano[tip] = (izidi[(tip, "uspešno")], zneski[tip])
+        if v_dnevniku != pricakovano:
+            krsitve.append(f"Dnevnik {v_dnevniku} != uspešne operacije {pricakovano}")
+
+        if dnevni_limit:
+            cur.execute(
+                """
+                SELECT posilja, tip, DATE(cas), SUM(znesek)
+                FROM transakcija
+                WHERE tip IN ('nakazilo', 'dvig')
+                GROUP BY posilja, tip, DATE(cas)
+                HAVING SUM(znesek) > ?
+            """,
+                (dnevni_limit,),
+            )
+            for iban, tip, dan, vsota in cur.fetchall():
+                krsitve.append(f"{iban}: {tip} {dan} skupaj {vsota} > dnevni limit {dnevni_limit}")
+
+        dnevnik = """
+            SELECT posilja, DATE(cas), tip, SUM(znesek)
+            FROM transakcija
+            WHERE tip IN ('nakazilo', 'dvig')
+            GROUP BY posilja, DATE(cas), tip
+        """
+        poraba = "SELECT IBAN, dan, tip, znesek FROM dnevna_poraba"
+        cur.execute(f"{dnevnik} EXCEPT {poraba}")
+        for iban, dan, tip, vsota in cur.fetchall():
+            krsitve.append(f"{iban}: dnevna_poraba za {tip} {dan} se ne ujema z dnevnikom ({vsota})")
+        # Odvečne ali zastarele vrstice v dnevna_poraba
+        cur.execute(f"{poraba} EXCEPT {dnevnik}")
+        for iban, dan, tip, vsota in cur.fetchall():
+            krsitve.append(f"{iban}: dnevna_poraba za {tip} {dan} ({vsota}) nima para v dnevniku")
+
+        # Ponovno predvajanje dnevnika po vrstnem redu vpisa
+        stanja = Counter()
+        cur.execute("""
+            SELECT id_transakcije, posilja, prejema, znesek, stanje_posilja, stanje_prejema
+            FROM transakcija
+            ORDER BY id_transakcije
+        """)
+        for id_transakcije, posilja, prejema, znesek, stanje_posilja, stanje_prejema in cur:
+            for iban, sprememba, zapisano in ((posilja, -znesek, stanje_posilja), (prejema, znesek, stanje_prejema)):
+                if iban is None:
+                    continue
+                stanja[iban] += sprememba
+                if stanja[iban] < 0:
+                    krsitve.append(f"Transakcija {id_transakcije}: stanje {iban} po njej je {stanja[iban]}")
+                if zapisano != stanja[iban]:
+                    krsitve.append(
+                        f"Transakcija {id_transakcije}: zapisano stanje {iban} {zapisano} != {stanja[iban]}"
+                    )
+
+        cur.execute("SELECT IBAN, stanje FROM racun")
+        for iban, stanje in cur.fetchall():
+            if stanje != stanja[iban]:
+                krsitve.append(f"{iban}: stanje {stanje} != predvajan dnevnik {stanja[iban]}")
+    return krsitve
+
+
+def preveri_pokritost(izidi, dnevni_limit):
+    """
+    Vrne seznam zavrnitev, ki se v testu niso zgodile (test jih torej ni
+    preizkusil); prazen seznam pomeni, da so se zgodile vse.
+    """
+    zavrnitve = ["Nezadostna sredstva"]
+    if dnevni_limit:
+        zavrnitve.append("Presežen dnevni limit")
+    return [
+        zavrnitev
+        for zavrnitev in zavrnitve
+        if not any(izid.startswith(zavrnitev) for _, izid in izidi)
+    ]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Obremenitveni test nakazil in dvigov")
+    parser.add_argument("--niti", type=int, default=8, help="niti na proces")
+    parser.add_argument("--procesi", type=int, default=1)
+    parser.add_argument("--nakazila", type=int, default=500, help="operacij na nit")
+    parser.add_argument("--racuni", type=int, default=5, help="število vročih računov")
+    parser.add_argument("--dvigi", type=float, default=0.2, help="delež dvigov med operacijami")
+    parser.add_argument("--pologi", type=float, default=0.2, help="delež pologov med operacijami")
+    parser.add_argument(
+        "--dnevni-limit",
+        type=int,
+        default=10 * ZACETNO_STANJE,
+        help="dnevni limit nakazil oz. dvigov računa v centih (0: brez limita)",
+    )
+    parser.add_argument(
+        "--najvecji-znesek",
+        type=int,
+        default=ZACETNO_STANJE // 2,
+        help="največji znesek operacije v centih (začetno stanje računa je 100000)",
+    )
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+    if args.dvigi < 0 or args.pologi < 0 or args.dvigi + args.pologi > 1:
+        parser.error("deleža dvigov in pologov morata biti nenegativna, njuna vsota največ 1")
+    if args.najvecji_znesek < 1:
+        parser.error("največji znesek mora biti vsaj 1")
+    delezi = (args.dvigi, args.pologi)
+
+    ibani = generiraj_ibane(args.racuni, random.Random(args.seed))
+    pripravi_bazo(ibani, args.dnevni_limit)
+
+    if args.procesi == 1:
+        zacetek = time.perf_counter()
+        izidi, zneski = izvedi(ibani, args.niti, args.nakazila, args.seed, delezi, args.najvecji_znesek)
+    else:
+        # Novi procesi ne podedujejo povezav iz bazena tega procesa
+        kontekst = multiprocessing.get_context("spawn")
+        zacni = kontekst.Barrier(args.procesi + 1)
+        vrsta = kontekst.Queue()
+        procesi = [
+            kontekst.Process(
+                target=proces,
+                args=(
+                    os.getcwd(), ibani, args.niti, args.nakazila, args.seed + k * args.niti,
+                    delezi, args.najvecji_znesek, zacni, vrsta,
+                ),
+            )
+            for k in range(args.procesi)
+        ]
+        for p in procesi:
+            p.start()
+        zacni.wait()
+        zacetek = time.perf_counter()
+        izidi, zneski = Counter(), Counter()
+        for _ in procesi:
+            izidi_procesa, zneski_procesa = vrsta.get()
+            izidi.update(izidi_procesa)
+            zneski.update(zneski_procesa)
+        for p in procesi:
+            p.join()
+    trajanje = time.perf_counter() - zacetek
+
+    skupaj = sum(izidi.values())
+    uspesnih = sum(stevilo for (_, izid), stevilo in izidi.items() if izid == "uspešno")
+    print(
+        f"Procesi: {args.procesi}, niti na proces: {args.niti}, operacij: {skupaj}, "
+        f"računov: {args.racuni}, dnevni limit: {args.dnevni_limit / 100:.2f} EUR"
+    )
+    print(f"Trajanje: {trajanje:.2f} s, {skupaj / trajanje:.0f} operacij/s")
+    print(f"Uspešnih: {uspesnih} ({uspesnih / trajanje:.0f} TPS)")
+    for (tip, izid), stevilo in sorted(izidi.items(), key=lambda x: (x[0][0], -x[1])):
+        print(f"  {tip}: {izid}: {stevilo}")
+
+    krsitve = preveri_invariante(ibani, izidi, zneski, args.dnevni_limit)
+    if krsitve:
+        print("\n❌ Kršene invariante:")
+        for krsitev in krsitve[:50]:
+            print(f"  {krsitev}")
+        if len(krsitve) > 50:
+            print(f"  ... in še {len(krsitve) - 50}")
+        return 1
+    manjkajo = preveri_pokritost(izidi, args.dnevni_limit)
+    if manjkajo:
+        print(f"\n❌ Nobena operacija ni bila zavrnjena z razlogom: {', '.join(manjkajo)}")
+        print("   (povečajte --najvecji-znesek ali --nakazila oz. zmanjšajte --dnevni-limit)")
+        return 1
+    print(
+        "\n✅ Denar ohranjen, brez negativnih stanj, dnevni limiti upoštevani, "
+        "stanja se ujemajo s predvajanim dnevnikom"
+    )
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())